@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.corpus import release_names
+from refiled.operations import indexer
+
+
+def run(names, processes: int) -> tuple[float, list]:
+    # Forked workers inherit the parent's token cache, so start every run cold
+    indexer._is_blocked_token.cache_clear()
+    start = time.perf_counter()
+    phrases = asyncio.run(indexer.extract_all(names, processes=processes))
+    return time.perf_counter() - start, phrases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexer phrase extraction scaling over worker processes.")
+    parser.add_argument("--count", type=int, default=200_000, help="synthetic filenames (default: 200k)")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1,
+                        help="largest pool to time (default: all cores)")
+    args = parser.parse_args()
+
+    names = release_names(args.count)
+    print(f"corpus: {len(names)} names, {os.cpu_count()} cores")
+    baseline_s, baseline = run(names, 1)
+    print(f"processes= 1: {baseline_s:.2f}s")
+    processes = 2
+    while processes <= args.max_processes:
+        elapsed, phrases = run(names, processes)
+        assert phrases == baseline, f"{processes} processes disagree with the single-process run"
+        print(f"processes={processes:>2}: {elapsed:.2f}s  speedup {baseline_s / elapsed:.2f}x")
+        processes *= 2
+    if args.max_processes > 1 and args.max_processes & (args.max_processes - 1):
+        elapsed, _ = run(names, args.max_processes)
+        print(f"processes={args.max_processes:>2}: {elapsed:.2f}s  speedup {baseline_s / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import time
+import tracemalloc
+from collections import defaultdict
+from functools import lru_cache
+
+from benchmarks.corpus import release_names
+from refiled.operations import indexer
+from refiled.utilities import is_probable_name
+
+
+@lru_cache(maxsize=None)
+def _legacy_profanity():
+    from better_profanity import profanity
+    profanity.load_censor_words()
+    return profanity
+
+
+def legacy_phrases(name: str) -> set[str]:
+    # The phrase extraction indexer.py used before the rework, kept for comparison
+    try:
+        import wordninja
+        wordninja.split(name.rsplit(".", 1)[0])
+    except ImportError:
+        pass
+    phrases = set()
+    for phrase in indexer.generate_phrases(indexer.normalize_name(name).split()):
+        words = phrase.split()
+        score = 1
+        if all(w not in indexer.STOPWORDS for w in words):
+            score += 1
+        if not _legacy_profanity().contains_profanity(phrase):
+            score += 1
+        if any(w.isdigit() for w in words) or not is_probable_name(phrase) or score < 3:
+            continue
+        phrases.add(phrase)
+    return phrases
+
+
+def build_map(names, extract) -> tuple[float, dict]:
+    start = time.perf_counter()
+    phrase_map = defaultdict(set)
+    for i, name in enumerate(names):
+        for phrase in extract(name):
+            phrase_map[phrase].add(i)
+    return time.perf_counter() - start, phrase_map
+
+
+def legacy_grouping(file_phrases) -> dict:
+    # Every phrase of every file gets a set of files, and singletons are only dropped at the end
+    phrase_map = defaultdict(set)
+    for i, phrases in enumerate(file_phrases):
+        for phrase in phrases:
+            phrase_map[phrase].add(i)
+    return {p: fs for p, fs in phrase_map.items() if len(fs) >= 2}
+
+
+def measure(fn, *args) -> tuple[float, float, object]:
+    # Timed and traced separately: tracemalloc slows allocation-heavy code down several times
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexer phrase extraction: legacy vs current.")
+    parser.add_argument("--count", type=int, default=100_000, help="synthetic filenames (default: 100k)")
+    parser.add_argument("--legacy-sample", type=int, default=2_000,
+                        help="filenames timed with the legacy pipeline, extrapolated to --count (it needs minutes otherwise)")
+    args = parser.parse_args()
+
+    names = release_names(args.count)
+    sample = names[:args.legacy_sample]
+
+    legacy_s, legacy_map = build_map(sample, legacy_phrases)
+    _, current_sample_map = build_map(sample, indexer.extract_phrases)
+    assert legacy_map == current_sample_map, "current pipeline disagrees with the legacy one"
+
+    indexer._is_blocked_token.cache_clear()
+    current_s, phrase_map = build_map(names, indexer.extract_phrases)
+    legacy_est = legacy_s * len(names) / len(sample)
+
+    print(f"corpus: {len(names)} names, {len(phrase_map)} distinct phrases")
+    print(f"legacy : {legacy_s * 1000:.1f}ms for {len(sample)} names -> ~{legacy_est:.1f}s for {len(names)} (extrapolated)")
+    print(f"current: {current_s:.2f}s for {len(names)} names")
+    print(f"speedup: ~{legacy_est / current_s:.0f}x")
+
+    file_phrases = [indexer.extract_phrases(name) for name in names]
+    set_s, set_mb, groups = measure(legacy_grouping, file_phrases)
+    mined_s, mined_mb, mined = measure(indexer.mine_phrases, file_phrases)
+    for phrase in groups:
+        reverse = " ".join(reversed(phrase.split()))
+        assert phrase in mined or reverse in mined, f"grouping lost {phrase!r}"
+    print(f"grouping, phrase sets : {set_s * 1000:.0f}ms, peak {set_mb:.1f} MiB, {len(groups)} groups")
+    print(f"grouping, counted     : {mined_s * 1000:.0f}ms, peak {mined_mb:.1f} MiB, {len(mined)} groups")
+
+    fuzzy_s, fuzzy_mb, token_map = measure(indexer.fuzzy_token_map, file_phrases)
+    print(f"fuzzy spelling map    : {fuzzy_s * 1000:.0f}ms, peak {fuzzy_mb:.1f} MiB, {len(token_map)} words folded")
+
+
+if __name__ == "__main__":
+    main()
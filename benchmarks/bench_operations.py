@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.corpus import release_names
+
+SIZES = [1_000, 10_000, 100_000]
+
+# Audit events counted as a stand-in for syscalls (os.stat and friends raise no audit event)
+COUNTED_EVENTS = ["os.rename", "os.scandir", "os.listdir", "open", "os.mkdir", "os.rmdir", "sqlite3.connect"]
+
+
+def _scan(folder: Path):
+    from refiled.filesystem.snapshot import DirectorySnapshot
+    return DirectorySnapshot.scan(folder)
+
+
+async def _undo(snapshot, screenshots):
+    from refiled.operations import undo
+    return await undo.undo_last_change_set()
+
+
+async def _prepare_undo(snapshot, screenshots):
+    # Untimed: gives undo a journaled batch the size of the folder to revert
+    from refiled.operations import pirate
+    await pirate.pirate_format(snapshot)
+
+
+def _operations() -> dict:
+    from refiled.operations import (
+        add_remove, convert, indexer, low_caps, move, pirate, prefix, remove_brackets, screenshot_parser,
+    )
+    # name -> (coroutine factory, untimed setup or None)
+    return {
+        "add_text": (lambda s, _: add_remove.add_text(s, "PROPER", "end"), None),
+        "remove_text": (lambda s, _: add_remove.remove_text(s, "1080p"), None),
+        "move_text": (lambda s, _: move.move_text(s, "x264", "start"), None),
+        "prefix": (lambda s, _: prefix.add_prefix(s, "NEW_"), None),
+        "pirate": (lambda s, _: pirate.pirate_format(s), None),
+        "low_caps": (lambda s, _: low_caps.convert_to_all_lower(s), None),
+        "remove_brackets": (lambda s, _: remove_brackets.remove_brackets(s), None),
+        "convert": (lambda s, _: convert.convert_files(s, ".mkv"), None),
+        "indexer": (lambda s, _: indexer.index_repeated_keywords(s), None),
+        "screenshot_parser": (lambda s, shots: screenshot_parser.match_and_rename(s, _scan(shots)), None),
+        "undo": (_undo, _prepare_undo),
+    }
+
+
+OPERATIONS = [
+    "add_text", "remove_text", "move_text", "prefix", "pirate", "low_caps",
+    "remove_brackets", "convert", "indexer", "screenshot_parser", "undo",
+]
+
+
+def _populate(root: Path, size: int) -> tuple[Path, Path]:
+    videos, screenshots = root / "videos", root / "screenshots"
+    videos.mkdir()
+    screenshots.mkdir()
+    for i, name in enumerate(release_names(size)):
+        (videos / name).touch()
+        (screenshots / f"Screenshot {i:06d}.png").touch()
+    return videos, screenshots
+
+
+def run_worker(operation: str, size: int) -> dict:
+    """
+    Run one operation on a fresh synthetic folder inside this process and measure it.
+    Called in a subprocess per (operation, size) so peak RSS is not polluted by earlier runs.
+    """
+    root = Path(os.environ["REFILED_BENCH_ROOT"])
+    videos, screenshots = _populate(root, size)
+    factory, prepare = _operations()[operation]
+    if prepare is not None:
+        asyncio.run(prepare(_scan(videos), screenshots))
+
+    events = Counter()
+
+    def hook(event, _args):
+        if event in COUNTED_EVENTS:
+            events[event] += 1
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.addaudithook(hook)
+    start = time.perf_counter()
+    snapshot = _scan(videos)
+    scanned = time.perf_counter()
+    changes = asyncio.run(factory(snapshot, screenshots))
+    end = time.perf_counter()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "operation": operation,
+        "size": size,
+        "renamed": len(changes),
+        "scan_ms": (scanned - start) * 1000,
+        "total_ms": (end - start) * 1000,
+        "files_per_s": size / (end - start),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_mb": rss_after / (2**20 if sys.platform == "darwin" else 2**10),
+        "rss_growth_mb": (rss_after - rss_before) / (2**20 if sys.platform == "darwin" else 2**10),
+        "events": dict(events),
+    }
+
+
+def run_isolated(operation: str, size: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="refiled-bench-") as tmp:
+        env = dict(
+            os.environ,
+            REFILED_BENCH_ROOT=tmp,
+            REFILED_JOURNAL=str(Path(tmp) / "journal.db"),
+            REFILED_INDEX=str(Path(tmp) / "index.db"),
+            REFILED_LEXICON_CACHE=str(Path(tmp) / "lexicon.pickle"),
+        )
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_operations", "--worker", operation, str(size)],
+            capture_output=True, text=True, env=env, check=True,
+        )
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def _delta(result: dict, baseline: dict | None) -> str:
+    if not baseline:
+        return ""
+    change = (result["total_ms"] - baseline["total_ms"]) / baseline["total_ms"] * 100
+    return f"  {change:+6.1f}%"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Throughput, peak RSS and syscall counts for every rename operation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="files per synthetic folder")
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=OPERATIONS, help="operations to run")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="earlier --json output to compare total time against")
+    parser.add_argument("--worker", nargs=2, metavar=("OP", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker[0], int(args.worker[1]))))
+        return 0
+
+    baseline = {}
+    if args.baseline:
+        baseline = {(r["operation"], r["size"]): r for r in json.loads(Path(args.baseline).read_text())}
+
+    results = []
+    print(f"{'operation':<18} {'files':>7} {'renamed':>7} {'total':>10} {'files/s':>9} {'peak RSS':>9} "
+          f"{'renames':>7} {'scandir':>7} {'open':>6}")
+    for size in args.sizes:
+        for operation in args.ops:
+            result = run_isolated(operation, size)
+            results.append(result)
+            events = result["events"]
+            print(
+                f"{operation:<18} {size:>7} {result['renamed']:>7} {result['total_ms']:>8.1f}ms "
+                f"{result['files_per_s']:>9.0f} {result['peak_rss_mb']:>7.1f}MB "
+                f"{events.get('os.rename', 0):>7} {events.get('os.scandir', 0):>7} {events.get('open', 0):>6}"
+                + _delta(result, baseline.get((operation, size)))
+            )
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
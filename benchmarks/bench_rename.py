@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import release_names
+from refiled import executor
+
+
+def _populate(root: Path, names: list[str], depth: int) -> list[tuple[Path, Path]]:
+    folder = Path(tempfile.mkdtemp(prefix="refiled-bench-", dir=root))
+    # Media libraries sit a few levels down (/mnt/media/Movies/2024/...): every level is a lookup per path rename
+    for level in range(depth):
+        folder = folder / f"level {level}"
+    folder.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (folder / name).touch()
+    return [(folder / name, folder / f"renamed {name}") for name in names]
+
+
+async def safe_rename(old_path: Path, new_path: Path) -> bool:
+    # Verbatim copy of the per-file rename helper the operations used before the shared executor
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, old_path.rename, new_path)
+        return True
+    except Exception as e:
+        print(f"⚠️ Failed to rename {old_path} -> {new_path}: {e}")
+        return False
+
+
+async def per_file(pairs):
+    # What the operations did before the shared executor: one run_in_executor job per file
+    return await asyncio.gather(*(safe_rename(src, dst) for src, dst in pairs))
+
+
+async def batched(pairs, dir_fd: bool):
+    executor.USE_DIR_FD = dir_fd
+    return await executor.RenameExecutor().rename_all(pairs)
+
+
+def measure(root: Path, names: list[str], depth: int, strategy) -> float:
+    pairs = _populate(root, names, depth)
+    try:
+        start = time.perf_counter()
+        asyncio.run(strategy(pairs))
+        elapsed = time.perf_counter() - start
+        assert all(dst.exists() for _, dst in pairs), "not every file was renamed"
+        return elapsed
+    finally:
+        shutil.rmtree(pairs[0][0].parents[depth])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rename throughput: per-file executor jobs vs batched, path vs dir fd.")
+    parser.add_argument("--count", type=int, default=20_000, help="files per run (default: 20k)")
+    parser.add_argument("--dir", dest="dirs", action="append", metavar="DIR",
+                        help="filesystem to test on (repeatable; default: /dev/shm and the system temp dir)")
+    parser.add_argument("--depth", type=int, default=6, help="folder levels below DIR (default: 6)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per strategy, best is reported (default: 3)")
+    args = parser.parse_args()
+
+    names = sorted(set(release_names(args.count)))
+    roots = [Path(d) for d in args.dirs or ["/dev/shm", tempfile.gettempdir()] if Path(d).is_dir()]
+    strategies = {
+        "per-file run_in_executor": per_file,
+        "batched, full paths": lambda pairs: batched(pairs, dir_fd=False),
+        "batched, dir fd": lambda pairs: batched(pairs, dir_fd=True),
+    }
+    for root in roots:
+        print(f"{root} ({len(names)} files, {args.depth} levels down)")
+        baseline = None
+        for label, strategy in strategies.items():
+            best = min(measure(root, names, args.depth, strategy) for _ in range(args.repeat))
+            baseline = baseline or best
+            print(f"  {label:<26} {best * 1000:8.1f}ms  {len(names) / best:9.0f} files/s  {baseline / best:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import random
+import time
+from pathlib import Path
+
+from benchmarks.corpus import release_names
+from refiled.filesystem.snapshot import FileEntry
+from refiled.operations.screenshot_parser import pair_screenshots
+
+
+def _entry(folder: Path, name: str) -> FileEntry:
+    path = folder / name
+    return FileEntry(path=path, name=name, stem=path.stem, suffix=path.suffix, inode=0, size=0, mtime=0.0,
+                     is_file=True, is_dir=False, is_symlink=False)
+
+
+def screenshot_name(video: FileEntry, rng: random.Random) -> str:
+    # The shapes screenshot names take in practice: player snapshots, renamed stems, hand-shortened titles
+    style = rng.random()
+    if style < 0.4:
+        return f"{video.name}_snapshot_00.{rng.randint(10, 59)}.{rng.randint(10, 59)}.png"
+    if style < 0.7:
+        return f"{video.stem}.jpg"
+    words = video.stem.split()
+    if len(words) > 3:
+        words.pop(rng.randrange(len(words)))
+    return " ".join(words) + ".png"
+
+
+def corpus(count: int, missing: float, seed: int = 3):
+    """
+    Videos, and screenshots for all but a `missing` share of them, with the true pairing.
+    """
+    rng = random.Random(seed)
+    videos = sorted((_entry(Path("/videos"), n) for n in dict.fromkeys(release_names(count))), key=lambda f: f.name.lower())
+    truth = {}
+    for video in videos:
+        if rng.random() >= missing:
+            truth[screenshot_name(video, rng)] = video.name
+    shots = sorted((_entry(Path("/shots"), name) for name in truth), key=lambda f: f.name.lower())
+    return videos, shots, truth
+
+
+def alphabetical(videos, shots):
+    # The previous matcher: both listings sorted and zipped
+    return list(zip(shots, videos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screenshot pairing accuracy and speed: alphabetical zip vs blocked index.")
+    parser.add_argument("--count", type=int, default=20_000, help="synthetic videos (default: 20k)")
+    parser.add_argument("--missing", type=float, default=0.1, help="share of videos without a screenshot (default: 0.1)")
+    args = parser.parse_args()
+
+    videos, shots, truth = corpus(args.count, args.missing)
+    print(f"corpus: {len(videos)} videos, {len(shots)} screenshots")
+    for label, pair in (("alphabetical zip:", alphabetical), ("blocked index:", lambda v, s: list(pair_screenshots(v, s)))):
+        start = time.perf_counter()
+        pairs = pair(videos, shots)
+        elapsed = time.perf_counter() - start
+        correct = sum(1 for shot, video in pairs if truth[shot.name] == video.name)
+        print(f"{label:<18} {elapsed:6.2f}s  {len(pairs):>7} paired  {correct / len(shots):7.2%} correct")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import subprocess
+import sys
+
+# Cold-start budgets in ms for the cumulative import time of each entry point
+BUDGETS = {
+    "refiled.batch": 250,
+    "refiled.cli": 600,
+}
+
+HEAVY_MODULES = {"nltk", "better_profanity", "wordninja", "rapidfuzz", "rich", "InquirerPy"}
+
+
+def import_times(module: str) -> list[tuple[int, int, str]]:
+    """
+    Run `python -X importtime -c "import <module>"` in a fresh interpreter and return
+    (cumulative_us, depth, module) for every imported module.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative), depth, name.strip()))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import-time report for refiled entry points (python -X importtime).")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="take the best of N runs")
+    args = parser.parse_args()
+
+    status = 0
+    for module, budget_ms in BUDGETS.items():
+        runs = [import_times(module) for _ in range(args.runs)]
+        best = min(runs, key=lambda rows: next(us for us, _, name in rows if name == module))
+        total_us, depth = next((us, d) for us, d, name in best if name == module)
+        total_ms = total_us / 1000
+        verdict = "ok" if total_ms <= budget_ms else "OVER BUDGET"
+        if total_ms > budget_ms:
+            status = 1
+        print(f"{module}: {total_ms:.1f}ms (budget {budget_ms}ms) {verdict}")
+        # Direct imports of the entry point are the ones worth making lazy
+        direct = [(us, name) for us, d, name in best if d == depth + 1]
+        for us, name in sorted(direct, reverse=True)[:args.top]:
+            print(f"    {us / 1000:8.1f}ms  {name}")
+        heavy = [name for _, _, name in best if name in HEAVY_MODULES]
+        if heavy:
+            print(f"    heavy modules loaded: {', '.join(sorted(set(heavy)))}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
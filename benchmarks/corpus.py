@@ -0,0 +1,51 @@
+import random
+
+TITLE_WORDS = [
+    "fight", "club", "dark", "knight", "blade", "runner", "star", "wars", "return", "empire",
+    "lost", "city", "night", "crawler", "mad", "max", "fury", "road", "grand", "budapest",
+    "hotel", "inside", "out", "silent", "hill", "iron", "man", "black", "swan", "green",
+    "mile", "pulp", "fiction", "good", "will", "hunting", "big", "lebowski", "blue", "velvet",
+    "lord", "rings", "fellowship", "two", "towers", "king", "hidden", "dragon", "matrix", "reloaded",
+]
+QUALITY = ["1080p", "720p", "2160p", "480p", "WEBRip", "BluRay", "HDTV", "WEB-DL"]
+CODECS = ["x264", "x265", "HEVC", "AAC", "DTS", "H.264"]
+GROUPS = ["YIFY", "RARBG", "EVO", "NTb", "FGT", "SPARKS", "GalaxyRG"]
+EXTENSIONS = [".mp4", ".mkv", ".avi", ".mov"]
+
+
+def release_name(rng: random.Random) -> str:
+    """
+    One realistic release-style filename: title words, year, quality tags,
+    brackets, dots and mixed case.
+    """
+    words = rng.sample(TITLE_WORDS, rng.randint(2, 5))
+    style = rng.random()
+    if style < 0.3:
+        title = ".".join(w.capitalize() for w in words)
+    elif style < 0.5:
+        title = " ".join(w.upper() if rng.random() < 0.2 else w for w in words)
+    else:
+        title = " ".join(w.capitalize() for w in words)
+    parts = [title, f"({rng.randint(1960, 2024)})", f"[{rng.choice(QUALITY)}]"]
+    if rng.random() < 0.5:
+        parts.append(rng.choice(CODECS))
+    if rng.random() < 0.4:
+        parts.append(f"{{{rng.choice(GROUPS)}}}")
+    if rng.random() < 0.2:
+        parts.append(f"S{rng.randint(1, 9):02d}E{rng.randint(1, 24):02d}")
+    sep = "." if style < 0.3 else " "
+    return sep.join(parts) + rng.choice(EXTENSIONS)
+
+
+def release_names(count: int, seed: int = 42) -> list[str]:
+    """
+    `count` unique release-style filenames, reproducible for a given seed.
+    """
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        name = release_name(rng)
+        if name in names:
+            name = f"{name.rsplit('.', 1)[0]} v{len(names)}.{name.rsplit('.', 1)[1]}"
+        names.add(name)
+    return sorted(names)
@@ -1,13 +1,18 @@
 
-
 import asyncio
-from refiled.cli import run_cli
+import sys
 
 def run():
+    if len(sys.argv) > 1:
+        # Headless batch mode: skip the interactive UI and its imports entirely
+        from refiled.batch import main
+        sys.exit(main(sys.argv[1:]))
+
+    from refiled.cli import run_cli
     try:
         asyncio.run(run_cli())
     except KeyboardInterrupt:
         print("\n👋 Exiting gracefully...")
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
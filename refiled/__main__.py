@@ -0,0 +1,5 @@
+import sys
+
+from refiled.batch import main
+
+sys.exit(main())
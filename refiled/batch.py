@@ -0,0 +1,409 @@
+import argparse
+import asyncio
+import contextlib
+import sys
+import time
+from pathlib import Path
+
+from refiled import executor, journal, matcher, metrics, planner, preview
+from refiled.filesystem.index import best_effort, get_index
+from refiled.filesystem.snapshot import DirectorySnapshot, stream_snapshots
+from refiled.filesystem.validator import validate_path
+
+
+def _filter_kwargs(args) -> dict:
+    return {
+        "filter_mode": "specific" if args.filter else "all",
+        "filter_term": args.filter,
+    }
+
+
+async def _run_text(args, snapshot):
+    from refiled.operations import add_remove
+    if args.mode == "add":
+        return await add_remove.add_text(snapshot, args.text, args.position, args.fuzzy, args.reversed, **_filter_kwargs(args), dry_run=args.dry_run)
+    return await add_remove.remove_text(snapshot, args.text, args.fuzzy, args.reversed, **_filter_kwargs(args), dry_run=args.dry_run)
+
+
+async def _run_move(args, snapshot):
+    from refiled.operations import move
+    return await move.move_text(snapshot, args.text, args.position, args.fuzzy, args.reversed, **_filter_kwargs(args), dry_run=args.dry_run)
+
+
+async def _run_prefix(args, snapshot):
+    from refiled.operations import prefix
+    if args.mode == "add":
+        return await prefix.add_prefix(snapshot, args.text, position=args.position, **_filter_kwargs(args), dry_run=args.dry_run)
+    return await prefix.remove_prefix(snapshot, args.text, position=args.position, **_filter_kwargs(args), dry_run=args.dry_run)
+
+
+async def _run_brackets(args, snapshot):
+    from refiled.operations import remove_brackets
+    return await remove_brackets.remove_brackets(snapshot, dry_run=args.dry_run)
+
+
+async def _run_pirate(args, snapshot):
+    from refiled.operations import pirate
+    return await pirate.pirate_format(snapshot, capitalized=args.capitalized, dry_run=args.dry_run)
+
+
+async def _run_normalize(args, snapshot):
+    from refiled.operations import pirate
+    return await pirate.normalize_format(snapshot, dry_run=args.dry_run)
+
+
+async def _run_caps(args, snapshot):
+    from refiled.operations import low_caps
+    if args.mode == "upper":
+        return await low_caps.convert_to_all_caps(snapshot, dry_run=args.dry_run)
+    return await low_caps.convert_to_all_lower(snapshot, dry_run=args.dry_run)
+
+
+async def _run_convert(args, snapshot):
+    from refiled.operations import convert
+    return await convert.convert_files(snapshot, args.to, dry_run=args.dry_run)
+
+
+async def _run_index(args, snapshot):
+    from refiled.operations import indexer
+    timings = {}
+    changes = await indexer.index_repeated_keywords(
+        snapshot, fuzzy=args.fuzzy, timings=timings, max_n=args.max_ngram, min_support=args.min_support,
+        processes=args.processes or indexer.DEFAULT_PROCESSES, dry_run=args.dry_run,
+    )
+    if args.verbose:
+        print("  " + "  ".join(f"{stage}={ms:.1f}ms" for stage, ms in timings.items()))
+    return changes
+
+
+async def _run_screenshots(args, snapshot):
+    from refiled.operations import screenshot_parser
+    screenshots = validate_path(args.screenshots)
+    if screenshots is None:
+        raise ValueError(f"Invalid screenshot folder: {args.screenshots}")
+    return await screenshot_parser.match_and_rename(snapshot, DirectorySnapshot.scan(screenshots), dry_run=args.dry_run)
+
+
+async def _run_pipeline(args, snapshot):
+    from refiled.operations import pipeline
+    return await pipeline.run_pipeline(snapshot, args.steps, args.fuzzy, args.reversed, **_filter_kwargs(args), dry_run=args.dry_run)
+
+
+async def _run_rules(args, snapshot):
+    from refiled.operations import rules
+    return await rules.apply_rules(snapshot, args.ruleset, args.fuzzy, args.reversed, **_filter_kwargs(args), dry_run=args.dry_run)
+
+
+def _add_filter_options(parser: argparse.ArgumentParser, matching: bool = True):
+    parser.add_argument("--filter", metavar="TERM", help="only rename files matching TERM")
+    if matching:
+        parser.add_argument("--fuzzy", action="store_true", help="fuzzy-match the filter term")
+        parser.add_argument("--reversed", action="store_true", help="also match the reversed name")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dir", dest="dirs", action="append", required=True, metavar="DIR",
+                        help="folder to process (repeat for several folders)")
+    common.add_argument("--workers", type=int, help="rename worker threads (default: REFILED_RENAME_WORKERS or 4)")
+    common.add_argument("--batch-size", type=int, help="renames per executor job (default: REFILED_RENAME_BATCH or 64)")
+    common.add_argument("-r", "--recursive", action="store_true", help="also process every folder below --dir")
+    common.add_argument("--indexed", action="store_true",
+                        help="with --filter, only visit folders the filename index lists as matching")
+    common.add_argument("-n", "--dry-run", action="store_true", help="show the planned renames as a diff, change nothing")
+    common.add_argument("--export", metavar="FILE",
+                        help="write the planned renames to FILE (.json or .csv) for `apply`; implies --dry-run")
+    common.add_argument("--transactional", action="store_true",
+                        help="rename through temporary names and roll everything back if any rename fails")
+    common.add_argument("--normalize", choices=matcher.FORMS,
+                        help="Unicode-normalise names and search text before matching (default: REFILED_NORMALIZE)")
+    common.add_argument("--metrics-jsonl", metavar="FILE", help="append timings and counters to FILE as JSON lines")
+    common.add_argument("--metrics-prom", metavar="FILE", help="write a Prometheus textfile with timings and counters")
+    common.add_argument("-v", "--verbose", action="store_true", help="print every rename")
+
+    parser = argparse.ArgumentParser(prog="refiled", description="Batch file renaming without the interactive menus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def command(name: str, **kwargs) -> argparse.ArgumentParser:
+        return sub.add_parser(name, parents=[common], **kwargs)
+
+    text = command("text", help="add or remove text")
+    text.add_argument("mode", choices=["add", "remove"])
+    text.add_argument("--text", required=True)
+    text.add_argument("--position", choices=["start", "end"], default="end")
+    _add_filter_options(text)
+    text.set_defaults(handler=_run_text)
+
+    move = command("move", help="move text to the start or end of names")
+    move.add_argument("--text", required=True)
+    move.add_argument("--position", choices=["start", "end"], default="start")
+    _add_filter_options(move)
+    move.set_defaults(handler=_run_move)
+
+    prefix = command("prefix", help="add or remove a prefix")
+    prefix.add_argument("mode", choices=["add", "remove"])
+    prefix.add_argument("--text", required=True)
+    prefix.add_argument("--position", choices=["start", "end"], default="start")
+    _add_filter_options(prefix, matching=False)
+    prefix.set_defaults(handler=_run_prefix)
+
+    command("brackets", help="remove brackets").set_defaults(handler=_run_brackets)
+
+    pirate = command("pirate", help="pirate.style.names")
+    pirate.add_argument("--capitalized", action="store_true", help="Start.With.Capital.Letters")
+    pirate.set_defaults(handler=_run_pirate)
+
+    command("normalize", help="turn pirate.style names back into Title Case").set_defaults(handler=_run_normalize)
+
+    caps = command("caps", help="ALL CAPS or all lowered names")
+    caps.add_argument("mode", choices=["upper", "lower"])
+    caps.set_defaults(handler=_run_caps)
+
+    convert = command("convert", help="convert .mp4 <-> .mkv extensions")
+    convert.add_argument("--to", choices=[".mp4", ".mkv"], required=True)
+    convert.set_defaults(handler=_run_convert)
+
+    index = command("index", help="group repeated phrases into [indexed]/ folders")
+    index.add_argument("--max-ngram", type=int, default=3, metavar="N", help="longest phrase in words (default: 3)")
+    index.add_argument("--min-support", type=int, default=2, metavar="N",
+                       help="files needed to start a new group (default: 2)")
+    index.add_argument("--fuzzy", action="store_true", help="group spelling variants and typos together")
+    index.add_argument("--processes", type=int, metavar="N",
+                       help="worker processes for phrase extraction (default: REFILED_INDEX_PROCESSES or 1)")
+    index.set_defaults(handler=_run_index)
+
+    screenshots = command("screenshots", help="rename screenshots after the videos in --dir")
+    screenshots.add_argument("--screenshots", required=True, metavar="DIR")
+    screenshots.set_defaults(handler=_run_screenshots)
+
+    pipe = command("pipeline", help="chain several text operations, renaming each file once")
+    pipe.add_argument("--step", dest="step_specs", action="append", default=[], metavar="STEP",
+                      help="e.g. brackets, normalize, 'prefix prefix=NEW position=end' (repeat, applied in order)")
+    pipe.add_argument("--name", help="run the pipeline saved under NAME (further --step options are appended)")
+    pipe.add_argument("--save", metavar="NAME", help="save the steps as NAME for later runs")
+    _add_filter_options(pipe)
+    pipe.set_defaults(handler=_run_pipeline)
+
+    rules = command("rules", help="regex substitutions, templates and bulk removals, compiled once")
+    rules.add_argument("--rules", dest="rules_files", action="append", default=[], metavar="FILE",
+                       help="JSON list of rules (repeatable)")
+    rules.add_argument("--sub", nargs=2, action="append", default=[], metavar=("PATTERN", "REPL"),
+                       help=r"regex substitution, REPL may use \1 or \g<name>")
+    rules.add_argument("--template", nargs=2, action="append", default=[], metavar=("PATTERN", "TEMPLATE"),
+                       help="rebuild names from named groups, e.g. '{title} ({year}) [{res}]'")
+    rules.add_argument("--remove", action="append", default=[], metavar="TEXT",
+                       help="literal to delete, all of them in one pass (repeatable)")
+    rules.add_argument("--whole-words", action="store_true", help="only remove --remove literals standing alone")
+    rules.add_argument("--case-sensitive", action="store_true", help="match --sub, --template and --remove exactly")
+    _add_filter_options(rules)
+    rules.set_defaults(handler=_run_rules)
+
+    search = sub.add_parser("search", help="find files by name across folders using the filename index")
+    search.add_argument("term")
+    search.add_argument("--dir", dest="dirs", action="append", metavar="DIR", help="limit to folders under DIR")
+    search.add_argument("--fuzzy", action="store_true")
+    search.add_argument("--threshold", type=float, default=70, help="fuzzy score cutoff (default: 70)")
+    search.add_argument("--limit", type=int)
+    search.add_argument("--refresh", action="store_true", help="rescan the --dir trees into the index first")
+    search.set_defaults(run=run_search, workers=None, batch_size=None, transactional=False)
+
+    apply = sub.add_parser("apply", help="apply a plan written with --export, as-is")
+    apply.add_argument("plan", metavar="FILE")
+    apply.add_argument("-n", "--dry-run", action="store_true", help="show what would still apply, change nothing")
+    apply.add_argument("--transactional", action="store_true", help="all-or-nothing, see the rename commands")
+    apply.add_argument("-v", "--verbose", action="store_true", help="print every rename")
+    apply.set_defaults(run=run_apply, workers=None, batch_size=None)
+
+    undo = sub.add_parser("undo", help="revert the last journaled batches (works across sessions)")
+    undo.add_argument("--steps", type=int, default=1, help="number of batches to undo (default: 1)")
+    undo.add_argument("--list", action="store_true", help="show the journal history instead")
+    undo.set_defaults(run=run_undo, workers=None, batch_size=None, transactional=False)
+
+    parser.set_defaults(run=run_batch)
+    return parser
+
+
+async def _snapshots(args, folder: Path):
+    roots = None
+    if args.indexed and args.filter:
+        # Only scan folders the filename index says hold a match, instead of walking the tree
+        roots = best_effort("folders_matching", args.filter, roots=[folder], fuzzy=getattr(args, "fuzzy", False),
+                            reversed=getattr(args, "reversed", False))
+    if roots is not None:
+        folders = [f for f in roots if f == folder or args.recursive]
+        scans = (DirectorySnapshot.scan(f) for f in folders if f.is_dir())
+    elif args.recursive:
+        scans = None
+    else:
+        scans = iter([DirectorySnapshot.scan(folder)])
+
+    if scans is None:
+        async for snapshot in stream_snapshots(folder):
+            best_effort("update", snapshot)
+            yield snapshot
+    else:
+        for snapshot in scans:
+            best_effort("update", snapshot)
+            yield snapshot
+
+
+def _resolve_pipeline(args):
+    # Turn --name/--step into args.steps once, before any folder is touched
+    from refiled.operations import pipeline
+    steps = []
+    if args.name:
+        saved = pipeline.load_pipelines()
+        if args.name not in saved:
+            raise ValueError(f"No saved pipeline named {args.name!r} in {pipeline.PIPELINES_FILE}")
+        steps = list(saved[args.name])
+    steps += [pipeline.parse_step(spec) for spec in args.step_specs]
+    if not steps:
+        raise ValueError("Give at least one --step or a saved --name")
+    args.steps = pipeline.compile_pipeline(steps)
+    if args.save:
+        pipeline.save_pipeline(args.save, steps)
+        print(f"💾 Saved pipeline {args.save}: {pipeline.describe(steps)}")
+
+
+def _resolve_rules(args):
+    # Rules files first, then --sub and --template in order, then the --remove literals
+    from refiled.operations import rules
+    ignore_case = not args.case_sensitive
+    ruleset = [rule for path in args.rules_files for rule in rules.load_rules(path)]
+    ruleset += [{"pattern": p, "replace": r, "ignore_case": ignore_case} for p, r in args.sub]
+    ruleset += [{"pattern": p, "template": t, "ignore_case": ignore_case} for p, t in args.template]
+    if args.remove:
+        ruleset.append({"remove": args.remove, "whole_words": args.whole_words, "ignore_case": ignore_case})
+    if not ruleset:
+        raise ValueError("Give --rules, --sub, --template or --remove")
+    args.ruleset = rules.compile_rules(ruleset)
+
+
+async def run_batch(args) -> int:
+    resolve = {_run_pipeline: _resolve_pipeline, _run_rules: _resolve_rules}.get(args.handler)
+    if resolve is not None:
+        try:
+            resolve(args)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ {e}", file=sys.stderr)
+            return 1
+    if args.export:
+        args.dry_run = True
+    status = 0
+    total = 0
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(preview.PlanWriter(args.export)) if args.export else None
+        if not args.dry_run:
+            # Every folder is its own journal batch; one run ties them together for undo
+            stack.enter_context(journal.get_journal().run())
+        for raw in args.dirs:
+            folder = validate_path(raw)
+            if folder is None:
+                print(f"⚠️ Invalid path, skipping: {raw}", file=sys.stderr)
+                status = 1
+                continue
+            # Folders are walked, planned and renamed one at a time, so memory stays flat on big trees
+            async for snapshot in _snapshots(args, folder):
+                try:
+                    changes = await args.handler(args, snapshot)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ {snapshot.path}: {e}", file=sys.stderr)
+                    status = 1
+                    continue
+                if writer is not None:
+                    writer.write(changes)
+                elif args.dry_run:
+                    for line in preview.diff_lines(changes):
+                        print(line)
+                else:
+                    best_effort("record_renames", changes)
+                    if args.verbose:
+                        for old, new in changes:
+                            print(f"{old} -> {new}")
+                if (changes or not args.recursive) and not args.dry_run:
+                    print(f"{snapshot.path}: {len(changes)} renamed")
+                total += len(changes)
+    duration_ms = (time.perf_counter() - start) * 1000
+    if args.export:
+        print(f"📝 {total} planned renames written to {args.export} in {duration_ms:.2f}ms")
+    elif args.dry_run:
+        print(f"📝 {total} planned renames (dry run) in {duration_ms:.2f}ms")
+    else:
+        print(f"✅ {total} renamed in {duration_ms:.2f}ms")
+    return status
+
+
+async def run_apply(args) -> int:
+    start = time.perf_counter()
+    try:
+        changes = await preview.apply_file(Path(args.plan), dry_run=args.dry_run)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Cannot read plan {args.plan}: {e}", file=sys.stderr)
+        return 1
+    duration_ms = (time.perf_counter() - start) * 1000
+    if args.dry_run:
+        for line in preview.diff_lines(changes):
+            print(line)
+        print(f"📝 {len(changes)} renames would apply ({duration_ms:.2f}ms)")
+        return 0
+    best_effort("record_renames", changes)
+    if args.verbose:
+        for old, new in changes:
+            print(f"{old} -> {new}")
+    print(f"✅ {len(changes)} renamed in {duration_ms:.2f}ms")
+    return 0
+
+
+async def run_search(args) -> int:
+    index = get_index()
+    roots = [validate_path(d) for d in args.dirs or []]
+    if None in roots:
+        print("⚠️ Invalid path in --dir", file=sys.stderr)
+        return 1
+    if args.refresh:
+        for root in roots:
+            async for snapshot in stream_snapshots(root):
+                index.update(snapshot)
+    start = time.perf_counter()
+    paths = index.search(args.term, roots, fuzzy=args.fuzzy, threshold=args.threshold, limit=args.limit)
+    duration_ms = (time.perf_counter() - start) * 1000
+    for path in paths:
+        print(path)
+    print(f"✅ {len(paths)} matches in {duration_ms:.2f}ms", file=sys.stderr)
+    return 0
+
+
+async def run_undo(args) -> int:
+    from refiled.operations import undo
+    if args.list:
+        for batch_id, created, kind, status, steps in journal.get_journal().history():
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+            print(f"#{batch_id}  {stamp}  {kind:<5}  {status:<11}  {steps} renames")
+        return 0
+    for _ in range(args.steps):
+        changes = await undo.undo_last_change_set()
+        if not changes:
+            print("⚠️ Nothing to undo.")
+            break
+        print(f"↩️ Undid {len(changes)} changes.")
+    return 0
+
+
+def main(argv=None) -> int:
+    """
+    Entry point for `python main.py <command> ...` and `python -m refiled <command> ...`.
+    Never imports InquirerPy or rich, so it is safe to run from cron or a job scheduler.
+    """
+    args = build_parser().parse_args(argv)
+    if args.workers or args.batch_size:
+        executor.configure(max_workers=args.workers, batch_size=args.batch_size)
+    if args.transactional:
+        planner.TRANSACTIONAL = True
+    if getattr(args, "normalize", None):
+        matcher.NORMALIZATION = args.normalize
+    metrics.configure(jsonl=getattr(args, "metrics_jsonl", None), prometheus=getattr(args, "metrics_prom", None))
+    reverted = journal.recover()
+    if reverted:
+        print(f"↩️ Rolled back {reverted} renames left over from an interrupted batch.", file=sys.stderr)
+    return asyncio.run(args.run(args))
@@ -2,10 +2,12 @@ import asyncio
 import time
 from pathlib import Path
 from InquirerPy import inquirer
-from refiled.utilities import is_video_file
 from rich.console import Console
 
+from refiled import journal, metrics, preview
 from refiled.filesystem.navigator import choose_folder, choose_two_folders
+from refiled.filesystem.index import best_effort
+from refiled.filesystem.snapshot import DirectorySnapshot
 from refiled.operations import (
     add_remove,
     move,
@@ -13,16 +15,25 @@ from refiled.operations import (
     prefix,
     remove_brackets,
     convert,
-    indexer,
     undo,
 )
 
 console = Console()
 
-async def run_cli():
-    undo_stack = []
 
+def _scan(folder) -> DirectorySnapshot:
+    # Every folder the user opens also refreshes the filename index used by `search`
+    snapshot = DirectorySnapshot.scan(folder)
+    best_effort("update", snapshot)
+    return snapshot
+
+
+async def run_cli():
     console.print("Starting...", style="bold white")
+    metrics.configure()
+    reverted = journal.recover()
+    if reverted:
+        console.print(f"↩️ Rolled back {reverted} renames left over from an interrupted batch.", style="yellow")
     console.print(
         "The people who are crazy enough to think they can change the world are the ones who do!",
         style="bold blue",
@@ -37,6 +48,8 @@ async def run_cli():
                 "👉 Screenshot Parser",
                 "👉 Index Repeated Files",
                 "👉 Convert Files (.mp4 <-> .mkv)",
+                "👉 Apply Saved Plan",
+                "👉 Undo Last Change",
                 "👉 Exit",
             ],
         ).execute_async()
@@ -47,7 +60,32 @@ async def run_cli():
             console.print("Every End Is a New Beginning!", style="yellow")
             return
 
-        if choice == "👉 Text Editing":
+        if choice == "👉 Apply Saved Plan":
+            plan_file = await inquirer.filepath(
+                message="Plan file (.json or .csv, written with --export):",
+                validate=lambda p: Path(p).expanduser().is_file(),
+                invalid_message="Not a file",
+            ).execute_async()
+            changes = await preview.apply_file(Path(plan_file).expanduser(), dry_run=True)
+            if not changes:
+                console.print("⚠️ Nothing in this plan can still be applied.")
+                continue
+            if not await review_changes(changes):
+                continue
+            start = time.perf_counter()
+            changes = await preview.apply_changes(changes)
+            duration_ms = (time.perf_counter() - start) * 1000
+            console.print(f"✅ Renamed {len(changes)} files.")
+            console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
+
+        elif choice == "👉 Undo Last Change":
+            changes = await undo.undo_last_change_set()
+            if changes:
+                console.print(f"↩️ Undid {len(changes)} changes.")
+            else:
+                console.print("⚠️ Nothing to undo.")
+
+        elif choice == "👉 Text Editing":
             text_choice = await inquirer.select(
                 message="? Choose a text editing menu:",
                 choices=[
@@ -57,6 +95,7 @@ async def run_cli():
                     "👉 Remove brackets from filenames",
                     "👉 Formatting Pirate/Normalize",
                     "👉 Formatting All Caps / Lowered",
+                    "👉 Run a Pipeline (several steps, one rename)",
                     "👉 Back to main menu",
                 ],
             ).execute_async()
@@ -67,20 +106,22 @@ async def run_cli():
             folder = await choose_folder()
             if folder == "__BACK__":
                 continue
-            files = [f for f in folder.iterdir() if is_video_file(f)]
+            snapshot = _scan(folder)
 
-            await handle_text_edit_menu(files, undo_stack, preselected_choice=text_choice)
+            await handle_text_edit_menu(snapshot, preselected_choice=text_choice)
 
         elif choice == "👉 Index Repeated Files":
             folder = await choose_folder()
             if folder == "__BACK__":
                 continue
+            from refiled.operations import indexer
+
+            fuzzy = await inquirer.confirm(message="Group spelling variants and typos together?").execute_async()
+
             start = time.perf_counter()
-            changes = await indexer.index_repeated_keywords(folder)
+            changes = await indexer.index_repeated_keywords(_scan(folder), fuzzy=fuzzy)
             duration_ms = (time.perf_counter() - start) * 1000
             if changes:
-                undo.add_change_set(changes)
-                undo_stack.append(changes)
                 console.print(f"✅ Indexed and moved {len(changes)} files.")
                 console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
                 undo_prompt = await inquirer.select(
@@ -90,7 +131,7 @@ async def run_cli():
                 ).execute_async()
                 undo_prompt = undo_prompt == "Y"
                 if undo_prompt:
-                    changes = await undo.undo_last_change_set()
+                    changes = await undo.undo_own_change_set()
                     console.print(f"↩️ Undid {len(changes)} changes.")
             else:
                 console.print("⚠️ No repeated keywords found.")
@@ -119,12 +160,12 @@ async def run_cli():
                 continue
 
             start = time.perf_counter()
-            changes = await screenshot_parser.match_and_rename(video_folder, screenshot_folder)
+            changes = await screenshot_parser.match_and_rename(
+                _scan(video_folder), _scan(screenshot_folder)
+            )
             duration_ms = (time.perf_counter() - start) * 1000
 
             if changes:
-                undo.add_change_set(changes)
-                undo_stack.append(changes)
                 console.print(f"✅ Renamed {len(changes)} screenshot files.")
                 console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
 
@@ -135,7 +176,7 @@ async def run_cli():
                 ).execute_async()
                 undo_prompt = undo_prompt == "Y"
                 if undo_prompt:
-                    changes = await undo.undo_last_change_set()
+                    changes = await undo.undo_own_change_set()
                     console.print(f"↩️ Undid {len(changes)} changes.")
             else:
                 console.print("⚠️ No matching screenshots found.")
@@ -144,7 +185,7 @@ async def run_cli():
             folder = await choose_folder()
             if folder == "__BACK__":
                 continue
-            files = [f for f in folder.iterdir() if is_video_file(f)]
+            snapshot = _scan(folder)
 
             convert_ext = await inquirer.select(
                 message="Choose conversion format:",
@@ -153,11 +194,9 @@ async def run_cli():
 
             to_ext = ".mkv" if convert_ext == ".mp4 to .mkv" else ".mp4"
             start = time.perf_counter()
-            changes = await convert.convert_files(files, to_ext)
+            changes = await convert.convert_files(snapshot, to_ext)
             duration_ms = (time.perf_counter() - start) * 1000
             if changes:
-                undo.add_change_set(changes)
-                undo_stack.append(changes)
                 console.print(f"✅ Converted {len(changes)} files to {to_ext}.")
                 console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
                 undo_prompt = await inquirer.select(
@@ -167,12 +206,27 @@ async def run_cli():
                 ).execute_async()
                 undo_prompt = undo_prompt == "Y"
                 if undo_prompt:
-                    changes = await undo.undo_last_change_set()
+                    changes = await undo.undo_own_change_set()
                     console.print(f"↩️ Undid {len(changes)} changes.")
             else:
                 console.print(f"⚠️ No {to_ext} conversion candidates found.")
 
-async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
+async def review_changes(changes) -> bool:
+    """
+    Page through the diff of planned changes; returns True if the user chooses to apply them.
+    """
+    styles = {"-": "red", "+": "green"}
+    for number, page in enumerate(preview.pages(changes), start=1):
+        for line in page:
+            console.print(line, style=styles.get(line[0], "bold"), markup=False, highlight=False)
+        shown = min(number * preview.PAGE_SIZE, len(changes))
+        choices = ["Apply", "Cancel"] if shown >= len(changes) else ["Next page", "Apply", "Cancel"]
+        action = await inquirer.select(message=f"{shown}/{len(changes)} renames shown", choices=choices).execute_async()
+        if action != "Next page":
+            return action == "Apply"
+    return False
+
+async def handle_text_edit_menu(snapshot, preselected_choice=None):
     if preselected_choice is None:
         text_choice = await inquirer.select(
             message="? Choose a text editing menu:",
@@ -183,6 +237,7 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
                 "👉 Remove brackets from filenames",
                 "👉 Formatting Pirate/Normalize",
                 "👉 Formatting All Caps / Lowered",
+                "👉 Run a Pipeline (several steps, one rename)",
                 "👉 Back to main menu",
             ],
         ).execute_async()
@@ -210,14 +265,12 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
 
         start = time.perf_counter()
         if mode == "add":
-            changes = await add_remove.add_text(files, text, position, fuzzy, reversed_match, filter_mode, filter_term)
+            changes = await add_remove.add_text(snapshot, text, position, fuzzy, reversed_match, filter_mode, filter_term)
         else:
-            changes = await add_remove.remove_text(files, text, fuzzy, reversed_match, filter_mode, filter_term)
+            changes = await add_remove.remove_text(snapshot, text, fuzzy, reversed_match, filter_mode, filter_term)
         duration_ms = (time.perf_counter() - start) * 1000
 
         if changes:
-            undo.add_change_set(changes)
-            undo_stack.append(changes)
             console.print(f"✅ Renamed {len(changes)} files.")
             console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
             undo_prompt = await inquirer.select(
@@ -227,7 +280,7 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
             ).execute_async()
             undo_prompt = undo_prompt == "Y"
             if undo_prompt:
-                changes = await undo.undo_last_change_set()
+                changes = await undo.undo_own_change_set()
                 console.print(f"↩️ Undid {len(changes)} changes.")
         else:
             console.print("⚠️ No changes made.")
@@ -246,12 +299,10 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
         fuzzy = await inquirer.confirm(message="Enable fuzzy matching?").execute_async()
 
         start = time.perf_counter()
-        changes = await move.move_text(files, text, position, fuzzy, reversed_match, filter_mode, filter_term)
+        changes = await move.move_text(snapshot, text, position, fuzzy, reversed_match, filter_mode, filter_term)
         duration_ms = (time.perf_counter() - start) * 1000
 
         if changes:
-            undo.add_change_set(changes)
-            undo_stack.append(changes)
             console.print(f"✅ Moved text in {len(changes)} files.")
             console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
             undo_prompt = await inquirer.select(
@@ -261,7 +312,7 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
             ).execute_async()
             undo_prompt = undo_prompt == "Y"
             if undo_prompt:
-                changes = await undo.undo_last_change_set()
+                changes = await undo.undo_own_change_set()
                 console.print(f"↩️ Undid {len(changes)} changes.")
         else:
             console.print("⚠️ No changes made.")
@@ -282,14 +333,12 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
 
         start = time.perf_counter()
         if action == "pirate":
-            changes = await pirate.pirate_format(files, fuzzy, reversed_match, capitalized=capitalized)
+            changes = await pirate.pirate_format(snapshot, fuzzy, reversed_match, capitalized=capitalized)
         else:
-            changes = await pirate.normalize_format(files, fuzzy, reversed_match)
+            changes = await pirate.normalize_format(snapshot, fuzzy, reversed_match)
         duration_ms = (time.perf_counter() - start) * 1000
 
         if changes:
-            undo.add_change_set(changes)
-            undo_stack.append(changes)
             console.print(f"✅ Renamed {len(changes)} files.")
             console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
             undo_prompt = await inquirer.select(
@@ -299,7 +348,7 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
             ).execute_async()
             undo_prompt = undo_prompt == "Y"
             if undo_prompt:
-                changes = await undo.undo_last_change_set()
+                changes = await undo.undo_own_change_set()
                 console.print(f"↩️ Undid {len(changes)} changes.")
         else:
             console.print("⚠️ No changes made.")
@@ -316,14 +365,12 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
         start = time.perf_counter()
         if mode == "add":
             position = await inquirer.select(message="Position?", choices=["start", "end"]).execute_async()
-            changes = await prefix.add_prefix(files, prefix_value, position=position, filter_mode=filter_mode, filter_term=filter_term)
+            changes = await prefix.add_prefix(snapshot, prefix_value, position=position, filter_mode=filter_mode, filter_term=filter_term)
         else:
-            changes = await prefix.remove_prefix(files, prefix_value, filter_mode=filter_mode, filter_term=filter_term)
+            changes = await prefix.remove_prefix(snapshot, prefix_value, filter_mode=filter_mode, filter_term=filter_term)
         duration_ms = (time.perf_counter() - start) * 1000
 
         if changes:
-            undo.add_change_set(changes)
-            undo_stack.append(changes)
             console.print(f"✅ Renamed {len(changes)} files.")
             console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
             undo_prompt = await inquirer.select(
@@ -333,18 +380,16 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
             ).execute_async()
             undo_prompt = undo_prompt == "Y"
             if undo_prompt:
-                changes = await undo.undo_last_change_set()
+                changes = await undo.undo_own_change_set()
                 console.print(f"↩️ Undid {len(changes)} changes.")
         else:
             console.print("⚠️ No changes made.")
 
     elif text_choice == "👉 Remove brackets from filenames":
         start = time.perf_counter()
-        changes = await remove_brackets.remove_brackets(files)
+        changes = await remove_brackets.remove_brackets(snapshot)
         duration_ms = (time.perf_counter() - start) * 1000
         if changes:
-            undo.add_change_set(changes)
-            undo_stack.append(changes)
             console.print(f"✅ Renamed {len(changes)} files.")
             console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
             undo_prompt = await inquirer.select(
@@ -354,7 +399,7 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
             ).execute_async()
             undo_prompt = undo_prompt == "Y"
             if undo_prompt:
-                changes = await undo.undo_last_change_set()
+                changes = await undo.undo_own_change_set()
                 console.print(f"↩️ Undid {len(changes)} changes.")
         else:
             console.print("⚠️ No changes made.")
@@ -368,14 +413,12 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
 
         start = time.perf_counter()
         if transformation == "ALL CAPS":
-            changes = await low_caps.convert_to_all_caps(files)
+            changes = await low_caps.convert_to_all_caps(snapshot)
         else:
-            changes = await low_caps.convert_to_all_lower(files)
+            changes = await low_caps.convert_to_all_lower(snapshot)
         duration_ms = (time.perf_counter() - start) * 1000
 
         if changes:
-            undo.add_change_set(changes)
-            undo_stack.append(changes)
             console.print(f"✅ Renamed {len(changes)} files.")
             console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
             undo_prompt = await inquirer.select(
@@ -384,10 +427,88 @@ async def handle_text_edit_menu(files, undo_stack, preselected_choice=None):
                 default="Y"
             ).execute_async()
             if undo_prompt == "Y":
-                changes = await undo.undo_last_change_set()
+                changes = await undo.undo_own_change_set()
+                console.print(f"↩️ Undid {len(changes)} changes.")
+        else:
+            console.print("⚠️ No changes made.")
+
+    elif text_choice == "👉 Run a Pipeline (several steps, one rename)":
+        from refiled.operations import pipeline
+        steps = await choose_pipeline_steps()
+        if not steps:
+            return
+
+        start = time.perf_counter()
+        changes = await pipeline.run_pipeline(snapshot, steps)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if changes:
+            console.print(f"✅ Renamed {len(changes)} files.")
+            console.print(f"✅ Operation completed in {duration_ms:.2f}ms", style="cyan")
+            undo_prompt = await inquirer.select(
+                message="Do you want to undo the changes?",
+                choices=["Y", "N"],
+                default="Y"
+            ).execute_async()
+            if undo_prompt == "Y":
+                changes = await undo.undo_own_change_set()
                 console.print(f"↩️ Undid {len(changes)} changes.")
         else:
             console.print("⚠️ No changes made.")
 
     elif text_choice == "👉 Back to main menu":
-        return
\ No newline at end of file
+        return
+
+async def choose_pipeline_steps() -> list[dict]:
+    """
+    Pick a saved pipeline or build a new one step by step; new pipelines can be saved for later.
+    """
+    from refiled.operations import pipeline
+    saved = pipeline.load_pipelines()
+    if saved:
+        choice = await inquirer.select(
+            message="Choose a pipeline:",
+            choices=[{"name": f"{name}: {pipeline.describe(steps)}", "value": name} for name, steps in saved.items()]
+            + [{"name": "➕ Build a new pipeline", "value": None}],
+        ).execute_async()
+        if choice is not None:
+            return saved[choice]
+
+    steps = []
+    while True:
+        op = await inquirer.select(
+            message=f"Add step {len(steps) + 1}" + (f" (so far: {pipeline.describe(steps)})" if steps else ""),
+            choices=[
+                {"name": "Remove brackets", "value": "brackets"},
+                {"name": "Normalize (dots to spaces, Title Case)", "value": "normalize"},
+                {"name": "Pirate format", "value": "pirate"},
+                {"name": "Add text", "value": "add"},
+                {"name": "Remove text", "value": "remove"},
+                {"name": "Move text", "value": "move"},
+                {"name": "Add prefix", "value": "prefix"},
+                {"name": "Remove prefix", "value": "unprefix"},
+                {"name": "ALL CAPS / all lowered", "value": "caps"},
+                {"name": "✅ Done", "value": None},
+            ],
+        ).execute_async()
+        if op is None:
+            break
+        step = {"op": op}
+        if op in {"add", "remove", "move"}:
+            step["text"] = await inquirer.text(message=f"Enter text to {op}:").execute_async()
+        if op in {"prefix", "unprefix"}:
+            step["prefix"] = await inquirer.text(message="Enter prefix:").execute_async()
+        if op in {"add", "move", "prefix", "unprefix"}:
+            step["position"] = await inquirer.select(message="Position?", choices=["start", "end"]).execute_async()
+        if op == "pirate":
+            step["capitalized"] = await inquirer.confirm(message="Start words with capital letters?").execute_async()
+        if op == "caps":
+            step["mode"] = await inquirer.select(message="Choose transformation:", choices=["upper", "lower"]).execute_async()
+        steps.append(step)
+
+    if steps:
+        name = await inquirer.text(message="Save this pipeline as (leave empty to skip):").execute_async()
+        if name.strip():
+            pipeline.save_pipeline(name.strip(), steps)
+            console.print(f"💾 Saved pipeline {name.strip()}.")
+    return steps
@@ -0,0 +1,142 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from refiled import metrics
+
+DEFAULT_WORKERS = int(os.environ.get("REFILED_RENAME_WORKERS", "4"))
+DEFAULT_BATCH_SIZE = int(os.environ.get("REFILED_RENAME_BATCH", "64"))
+
+
+# Renames in one batch nearly always share a folder: open it once and rename by bare name,
+# so the kernel does not walk the full path again for every file
+USE_DIR_FD = os.rename in os.supports_dir_fd
+
+
+def _split(path: Path) -> tuple[str, str]:
+    # Plain string splitting: Path.parent / Path.name cost more than the syscall saves
+    folder, _, name = os.fspath(path).rpartition(os.sep)
+    return folder or os.sep, name
+
+
+def _open_dir(fds: dict, folder: str) -> int:
+    fd = fds.get(folder)
+    if fd is None:
+        fd = fds[folder] = os.open(folder, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    return fd
+
+
+def _rename_batch(batch: list[tuple[Path, Path]]) -> list[bool]:
+    """
+    Rename every pair of a batch inside one worker thread.
+    """
+    split = [(_split(src), _split(dst)) for src, dst in batch] if USE_DIR_FD else None
+    # Opening a folder only pays off when several renames share it (not when the indexer fans out into many)
+    if split and len({folder for pair in split for folder, _ in pair}) * 4 > len(batch):
+        split = None
+    outcomes = []
+    fds = {}
+    try:
+        for i, (src, dst) in enumerate(batch):
+            try:
+                if split:
+                    (src_dir, src_name), (dst_dir, dst_name) = split[i]
+                    os.rename(src_name, dst_name, src_dir_fd=_open_dir(fds, src_dir), dst_dir_fd=_open_dir(fds, dst_dir))
+                else:
+                    os.rename(src, dst)
+                outcomes.append(True)
+            except Exception as e:
+                print(f"⚠️ Failed to rename {src} -> {dst}: {e}")
+                outcomes.append(False)
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+    return outcomes
+
+
+def _chunks(pairs, size: int):
+    it = iter(pairs)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+async def _wait_any(pending: dict) -> list[tuple[Path, Path, bool]]:
+    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    outcomes = []
+    for fut in done:
+        batch = pending.pop(fut)
+        outcomes.extend((src, dst, ok) for (src, dst), ok in zip(batch, fut.result()))
+    return outcomes
+
+
+class RenameExecutor:
+    """
+    Shared, bounded rename executor.
+    Renames are grouped into batches of `batch_size` per thread-pool job and at most
+    `max_pending` batches are in flight, so memory stays flat whatever the batch length.
+    Use few workers on network mounts (SMB/NFS) and more on local SSDs.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, batch_size: int = DEFAULT_BATCH_SIZE, max_pending: int | None = None):
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max_pending or self.max_workers * 2
+        self._pool = None
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="refiled-rename")
+        return self._pool
+
+    async def stream(self, pairs):
+        """
+        Rename (old_path, new_path) pairs from any iterable, yielding (old_path, new_path, success)
+        as batches complete. Pulling from `pairs` pauses while `max_pending` batches are running.
+        """
+        loop = asyncio.get_running_loop()
+        pending = {}
+        for batch in _chunks(pairs, self.batch_size):
+            pending[loop.run_in_executor(self.pool, _rename_batch, batch)] = batch
+            metrics.gauge("executor.queue_depth", len(pending))
+            if len(pending) >= self.max_pending:
+                for outcome in await _wait_any(pending):
+                    yield outcome
+        while pending:
+            for outcome in await _wait_any(pending):
+                yield outcome
+
+    async def rename_all(self, pairs) -> list[tuple[Path, Path, bool]]:
+        return [outcome async for outcome in self.stream(pairs)]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_executor = None
+
+
+def get_executor() -> RenameExecutor:
+    global _executor
+    if _executor is None:
+        _executor = RenameExecutor()
+    return _executor
+
+
+def configure(max_workers: int | None = None, batch_size: int | None = None, max_pending: int | None = None) -> RenameExecutor:
+    """
+    Replace the shared executor, e.g. with fewer workers for an SMB share.
+    """
+    global _executor
+    current = get_executor()
+    _executor = RenameExecutor(
+        max_workers=max_workers or current.max_workers,
+        batch_size=batch_size or current.batch_size,
+        max_pending=max_pending,
+    )
+    current.shutdown()
+    return _executor
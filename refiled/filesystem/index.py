@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from refiled.filesystem.snapshot import DirectorySnapshot
+
+DEFAULT_INDEX = Path(os.environ.get("REFILED_INDEX", Path.home() / ".refiled" / "index.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_folder ON files(folder);
+CREATE TABLE IF NOT EXISTS phrases (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    key TEXT NOT NULL,
+    phrases TEXT NOT NULL,
+    PRIMARY KEY (folder, name)
+);
+"""
+# Substring index over stems; FTS5 with the trigram tokenizer needs SQLite 3.34+
+STEMS = "CREATE VIRTUAL TABLE IF NOT EXISTS stems USING fts5(stem, tokenize='trigram')"
+
+
+def _like_prefix(folder: Path) -> str:
+    escaped = str(folder).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.rstrip(os.sep) + os.sep + "%"
+
+
+class FilenameIndex:
+    """
+    On-disk filename index (SQLite + FTS5 trigram) keyed by path, inode and mtime.
+    Every directory scan can be fed in with update(); only added, changed or removed
+    entries are written, and searches across many folders never touch the disk.
+    Without trigram support in the SQLite build, substring searches scan the indexed stems instead.
+    """
+
+    def __init__(self, path: Path = DEFAULT_INDEX):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.trigram = self._create_stems()
+
+    def _create_stems(self) -> bool:
+        try:
+            self.conn.execute(STEMS)
+            self.conn.execute("SELECT rowid FROM stems LIMIT 0")
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def update(self, snapshot: DirectorySnapshot) -> tuple[int, int]:
+        """
+        Bring the index in line with one folder snapshot. Returns (written, removed) counts.
+        """
+        folder = str(snapshot.path)
+        known = {
+            path: (row_id, inode, mtime)
+            for row_id, path, inode, mtime in self.conn.execute(
+                "SELECT id, path, inode, mtime FROM files WHERE folder = ?", (folder,)
+            )
+        }
+        written = 0
+        with self.conn:
+            self.conn.execute("BEGIN")
+            for entry in snapshot.files():
+                path = str(entry.path)
+                row = known.pop(path, None)
+                if row is not None and row[1:] == (entry.inode, entry.mtime):
+                    continue
+                if row is not None:
+                    self._delete(row[0])
+                cur = self.conn.execute(
+                    "INSERT INTO files (path, folder, name, stem, inode, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, folder, entry.name, entry.stem, entry.inode, entry.size, entry.mtime),
+                )
+                if self.trigram:
+                    self.conn.execute("INSERT INTO stems (rowid, stem) VALUES (?, ?)", (cur.lastrowid, entry.stem))
+                written += 1
+            for row_id, _, _ in known.values():
+                self._delete(row_id)
+        return written, len(known)
+
+    def record_renames(self, changes: list[tuple[Path, Path]]):
+        """
+        Follow applied renames without rescanning; inode and mtime survive a rename.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN")
+            moves = []
+            for old, new in changes:
+                row = self.conn.execute("SELECT id FROM files WHERE path = ?", (str(old),)).fetchone()
+                if row is not None:
+                    moves.append((row[0], new))
+            moving = {row_id for row_id, _ in moves}
+            # Stale rows at a target path go, from both tables; rows that are moving away themselves stay
+            for _, new in moves:
+                row = self.conn.execute("SELECT id FROM files WHERE path = ?", (str(new),)).fetchone()
+                if row is not None and row[0] not in moving:
+                    self._delete(row[0])
+            if {str(old) for old, _ in changes} & {str(new) for _, new in moves}:
+                # Swaps and chains: park the moving rows first so the UNIQUE path never clashes midway
+                self.conn.executemany("UPDATE files SET path = ? WHERE id = ?", ((f"\0{i}", i) for i in moving))
+            for row_id, new in moves:
+                self.conn.execute(
+                    "UPDATE files SET path = ?, folder = ?, name = ?, stem = ? WHERE id = ?",
+                    (str(new), str(new.parent), new.name, new.stem, row_id),
+                )
+                if self.trigram:
+                    self.conn.execute("UPDATE stems SET stem = ? WHERE rowid = ?", (new.stem, row_id))
+
+    def _delete(self, row_id: int):
+        self.conn.execute("DELETE FROM files WHERE id = ?", (row_id,))
+        if self.trigram:
+            self.conn.execute("DELETE FROM stems WHERE rowid = ?", (row_id,))
+
+    def _scope(self, roots) -> tuple[str, list]:
+        if not roots:
+            return "", []
+        clauses, params = [], []
+        for root in roots:
+            clauses.append("(f.folder = ? OR f.folder LIKE ? ESCAPE '\\')")
+            params += [str(root), _like_prefix(Path(root))]
+        return " AND (" + " OR ".join(clauses) + ")", params
+
+    def search(self, term: str, roots=None, fuzzy: bool = False, threshold: float = 70, limit: int | None = None,
+               reversed: bool = False) -> list[Path]:
+        """
+        Paths whose stem contains `term` (case-insensitive), optionally restricted to folders under `roots`.
+        Fuzzy searches score every indexed stem in scope with rapidfuzz, still without walking the disk.
+        With `reversed`, the term is looked for in the reversed stems, like filter_files(reversed=True).
+        """
+        scope, params = self._scope(roots)
+        if fuzzy:
+            from refiled.matcher import fold
+            from refiled.operations.search import fuzzy_matches
+            rows = self.conn.execute(f"SELECT f.path, f.stem FROM files f WHERE 1 = 1{scope}", params).fetchall()
+            keys = [fold(stem)[::-1] if reversed else fold(stem) for _, stem in rows]
+            matches = fuzzy_matches(fold(term), keys, threshold, limit)
+            return [Path(rows[i][0]) for i, _ in matches]
+
+        # A reversed stem contains the term exactly when the stem contains the reversed term
+        term = term[::-1] if reversed else term
+        if len(term) >= 3 and self.trigram:
+            # The trigram tokenizer answers substring queries of 3+ characters from the index
+            query = '"' + term.replace('"', '""') + '"'
+            sql = f"SELECT f.path FROM stems s JOIN files f ON f.id = s.rowid WHERE stems MATCH ?{scope} ORDER BY f.path"
+            params = [query] + params
+        else:
+            sql = f"SELECT f.path FROM files f WHERE instr(lower(f.stem), ?) > 0{scope} ORDER BY f.path"
+            params = [term.lower()] + params
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [Path(p) for (p,) in self.conn.execute(sql, params)]
+
+    def folders_matching(self, term: str, roots=None, fuzzy: bool = False, threshold: float = 70,
+                         reversed: bool = False) -> list[Path]:
+        """
+        Folders that hold at least one file matching `term`, so a batch only needs to scan those.
+        """
+        return sorted({p.parent for p in self.search(term, roots, fuzzy=fuzzy, threshold=threshold, reversed=reversed)})
+
+    def cached_phrases(self, folder: Path, key: str) -> dict[str, tuple[float, list[str]]]:
+        """
+        Phrases the indexer extracted earlier for the files of `folder`, as {name: (mtime, phrases)}.
+        Rows written under another `key` (older extraction rules) are left out.
+        """
+        rows = self.conn.execute(
+            "SELECT name, mtime, key, phrases FROM phrases WHERE folder = ?", (str(folder),)
+        )
+        return {name: (mtime, json.loads(phrases)) for name, mtime, row_key, phrases in rows if row_key == key}
+
+    def store_phrases(self, folder: Path, key: str, fresh: dict[str, tuple[float, list[str]]], removed=()):
+        if not fresh and not removed:
+            return
+        folder = str(folder)
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "DELETE FROM phrases WHERE folder = ? AND name = ?", ((folder, name) for name in removed)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO phrases (folder, name, mtime, key, phrases) VALUES (?, ?, ?, ?, ?)",
+                ((folder, name, mtime, key, json.dumps(sorted(phrases))) for name, (mtime, phrases) in fresh.items()),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+_index = None
+# First error the index raised in this process; it is not tried again after that
+_failed = None
+
+
+def get_index() -> FilenameIndex:
+    global _index
+    if _index is None:
+        _index = FilenameIndex()
+    return _index
+
+
+def best_effort(method: str, *args, default=None, **kwargs):
+    """
+    Call get_index().<method>(*args, **kwargs) for the scans and renames that feed or consult the index,
+    returning `default` instead of failing the operation when the index is locked, read-only or broken.
+    """
+    global _failed
+    if _failed is not None:
+        return default
+    try:
+        return getattr(get_index(), method)(*args, **kwargs)
+    except (sqlite3.Error, OSError) as e:
+        _failed = e
+        print(f"⚠️ Filename index unavailable, continuing without it: {e}", file=sys.stderr)
+        return default
@@ -1,41 +1,130 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from InquirerPy import inquirer
 
-def list_subfolders(path: Path) -> list:
+from refiled import metrics
+
+# Listings kept in memory, least recently used evicted first
+CACHE_SIZE = int(os.environ.get("REFILED_NAVIGATOR_CACHE", "256"))
+# Subfolders shown per page; huge folders are paged instead of building one giant choices list
+PAGE_SIZE = int(os.environ.get("REFILED_NAVIGATOR_PAGE", "200"))
+# Children of the current folder listed in the background so stepping into them is instant
+PREFETCH = int(os.environ.get("REFILED_NAVIGATOR_PREFETCH", "8"))
+
+VISIBLE_HIDDEN = {"Downloads", "Desktop", "Documents"}
+
+# (path, mtime_ns) -> sorted subfolder names; a folder's mtime changes whenever an entry is added, removed or renamed
+_listings = OrderedDict()
+_listings_lock = threading.Lock()
+# path -> future of a listing already being read, shared by prefetch and foreground requests
+_inflight = {}
+
+
+def _sort_key(name: str):
+    return (not name[0].isdigit(), name.lower())
+
+
+def _read_subfolders(path: str) -> list[str]:
+    """
+    Sorted names of the visible subfolders of `path`, served from the cache while its mtime is unchanged.
+    One os.scandir pass; is_dir() comes from the directory entry itself on most filesystems, so no stat per entry.
+    """
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return []
+    with _listings_lock:
+        names = _listings.get(key)
+        if names is not None:
+            _listings.move_to_end(key)
+            metrics.count("navigator.cache", hit="1")
+            return names
+    metrics.count("navigator.cache", hit="0")
     try:
-        return sorted(
-            [f for f in path.iterdir() if f.is_dir() and (not f.name.startswith(".") or f.name in {"Downloads", "Desktop", "Documents"})],
-            key=lambda x: (not x.name[0].isdigit(), x.name.lower())
-        )
-    except Exception:
+        with metrics.span("navigator.list"), os.scandir(path) as it:
+            names = [
+                e.name for e in it
+                if (not e.name.startswith(".") or e.name in VISIBLE_HIDDEN) and e.is_dir()
+            ]
+    except OSError:
         return []
+    names.sort(key=_sort_key)
+    with _listings_lock:
+        _listings[key] = names
+        while len(_listings) > CACHE_SIZE:
+            _listings.popitem(last=False)
+    return names
+
+
+def _schedule(key: str) -> asyncio.Future:
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.get_running_loop().run_in_executor(None, _read_subfolders, key)
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    return future
 
-def build_folder_choices(current_path: Path) -> list:
+
+async def list_subfolders(path: Path) -> list[Path]:
+    """
+    List the subfolders of `path` off the event loop, so the UI stays responsive on slow or network drives.
+    """
+    return [path / name for name in await asyncio.shield(_schedule(str(path)))]
+
+
+def prefetch(folders: list[Path]):
+    # Fire-and-forget: warm the cache for the folders the user is most likely to open next
+    for folder in folders[:PREFETCH]:
+        _schedule(str(folder))
+
+
+def common_folders() -> list[Path]:
+    home = Path.home()
+    return [f for f in (home / "Downloads", home / "Desktop", home / "Movies", home / "Documents") if f.exists()]
+
+
+def build_folder_choices(current_path: Path, subfolders: list[Path], page: int = 0) -> list:
     home = Path.home()
-    common_folders = [home / "Downloads", home / "Desktop", home / "Movies", home / "Documents"]
-    subfolders = list_subfolders(current_path)
     choices = []
 
     choices.append({"name": "⬆️ Go Up", "value": current_path.parent})
     choices.append({"name": f"🗂️ Select This Folder [{current_path.name}]", "value": current_path})
 
     if current_path == home:
-        for folder in [f for f in common_folders if f.exists()]:
+        for folder in common_folders():
             choices.append({"name": f"📂 {folder.name}", "value": folder})
         choices.append({"name": "📁 Enter Custom Path", "value": "custom"})
         choices.append({"name": "🚧 Exit to Main Menu", "value": "__BACK__"})
 
     if current_path != home:
-        for folder in sorted(subfolders, key=lambda x: (not x.name[0].isdigit(), x.name.lower())):
+        start = page * PAGE_SIZE
+        end = min(start + PAGE_SIZE, len(subfolders))
+        if page > 0:
+            choices.append({"name": "⬅️ Previous Page", "value": "__PREV__"})
+        for folder in subfolders[start:end]:
             choices.append({"name": f"📂 {folder.name}", "value": folder})
+        if end < len(subfolders):
+            choices.append({"name": f"➡️ Next Page [{start + 1}-{end} of {len(subfolders)}]", "value": "__NEXT__"})
 
     return choices
 
+
 async def choose_folder(start_path: Path = None) -> Path | str:
     current_path = start_path or Path.home()
+    page = 0
 
     while True:
-        choices = build_folder_choices(current_path)
+        # The home screen only offers the common folders, so there is nothing to list there
+        if current_path == Path.home():
+            subfolders = []
+            prefetch(common_folders())
+        else:
+            subfolders = await list_subfolders(current_path)
+            prefetch([current_path.parent] + subfolders[page * PAGE_SIZE:(page + 1) * PAGE_SIZE])
+        choices = build_folder_choices(current_path, subfolders, page)
 
         selected = await inquirer.select(
             message=f"? Current folder: {current_path}",
@@ -44,6 +133,14 @@ async def choose_folder(start_path: Path = None) -> Path | str:
             qmark="📁"
         ).execute_async()
 
+        if selected == "__NEXT__":
+            page += 1
+            continue
+        if selected == "__PREV__":
+            page -= 1
+            continue
+        page = 0
+
         if selected == "custom":
             new_path_str = await inquirer.text(message="Enter custom path:").execute_async()
             if not new_path_str.strip():
@@ -73,4 +170,4 @@ async def choose_two_folders(label1: str, label2: str) -> tuple[Path, Path] | st
     if folder2 == "__BACK__":
         return "__BACK__"
 
-    return folder1, folder2
\ No newline at end of file
+    return folder1, folder2
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import uuid
+from functools import cached_property
+from itertools import islice
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from refiled import metrics
+from refiled.utilities import VIDEO_EXTENSIONS
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+
+@dataclass(frozen=True, slots=True)
+class FileEntry:
+    """
+    One directory entry as seen by a single os.scandir pass.
+    Exposes the Path-like attributes the operations use (name, stem, suffix) without further stat calls.
+    """
+    path: Path
+    name: str
+    stem: str
+    suffix: str
+    inode: int
+    size: int
+    mtime: float
+    is_file: bool
+    is_dir: bool
+    is_symlink: bool
+
+    @classmethod
+    def from_dir_entry(cls, folder: Path, entry: os.DirEntry) -> "FileEntry":
+        is_dir = entry.is_dir()
+        try:
+            st = entry.stat(follow_symlinks=False)
+            size, mtime = st.st_size, st.st_mtime
+        except OSError:
+            size, mtime = 0, 0.0
+        path = folder / entry.name
+        return cls(
+            path=path,
+            name=entry.name,
+            stem=path.stem,
+            suffix=path.suffix,
+            inode=entry.inode(),
+            size=size,
+            mtime=mtime,
+            is_file=entry.is_file(),
+            is_dir=is_dir,
+            is_symlink=entry.is_symlink(),
+        )
+
+    def with_name(self, name: str) -> Path:
+        return self.path.with_name(name)
+
+
+@dataclass
+class DirectorySnapshot:
+    """
+    The contents of one folder, listed and stat'ed exactly once.
+    Operations read names and metadata from here instead of hitting the disk again.
+    """
+    path: Path
+    entries: list[FileEntry] = field(default_factory=list)
+
+    @classmethod
+    def scan(cls, path: Path) -> "DirectorySnapshot":
+        path = Path(path)
+        with metrics.span("scan"), os.scandir(path) as it:
+            entries = [FileEntry.from_dir_entry(path, entry) for entry in it]
+        entries.sort(key=lambda e: e.name)
+        metrics.count("scan.entries", len(entries))
+        return cls(path=path, entries=entries)
+
+    @cached_property
+    def paths(self) -> set[Path]:
+        return {e.path for e in self.entries}
+
+    def files(self) -> list[FileEntry]:
+        return [e for e in self.entries if e.is_file]
+
+    def videos(self) -> list[FileEntry]:
+        return [e for e in self.entries if e.is_file and e.suffix.lower() in VIDEO_EXTENSIONS]
+
+    def images(self) -> list[FileEntry]:
+        return [e for e in self.entries if e.is_file and e.suffix.lower() in IMAGE_EXTENSIONS]
+
+    def subfolders(self) -> list[FileEntry]:
+        return [e for e in self.entries if e.is_dir]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# Case sensitivity per device (st_dev): one probe per mount, not per folder
+_case_insensitive_devices: dict[int, bool] = {}
+
+
+def _probe_case_insensitive(folder: Path) -> bool:
+    # A name that differs only in case resolving to the same file means the mount folds case
+    candidates = [folder] + [folder / name for name in islice(os.listdir(folder), 64)]
+    for path in candidates:
+        swapped = path.with_name(path.name.swapcase())
+        if swapped.name == path.name:
+            continue
+        try:
+            return os.path.samefile(path, swapped)
+        except OSError:
+            return False
+    # Nothing with letters to compare: create a short-lived probe file
+    probe = folder / f".refiled-case-{uuid.uuid4().hex[:8]}"
+    try:
+        probe.touch()
+        return os.path.exists(probe.with_name(probe.name.upper()))
+    except OSError:
+        return False
+    finally:
+        probe.unlink(missing_ok=True)
+
+
+def is_case_insensitive(folder: Path) -> bool:
+    """
+    Whether `folder` lives on a case-insensitive mount (macOS, Windows, SMB, exFAT...).
+    REFILED_CASE_INSENSITIVE=1/0 overrides the probe.
+    """
+    override = os.environ.get("REFILED_CASE_INSENSITIVE")
+    if override in ("0", "1"):
+        return override == "1"
+    try:
+        device = os.stat(folder).st_dev
+    except OSError:
+        return False
+    if device not in _case_insensitive_devices:
+        _case_insensitive_devices[device] = _probe_case_insensitive(Path(folder))
+    return _case_insensitive_devices[device]
+
+
+# Folders refiled creates itself are never descended into
+SKIPPED_FOLDERS = {"[indexed]"}
+
+
+def walk_snapshots(root: Path):
+    """
+    Yield a DirectorySnapshot for `root` and every folder below it, depth-first.
+    Only folders still waiting to be visited are kept in memory, never their files.
+    Symlinked folders, hidden folders and refiled's own [indexed] folders are skipped.
+    """
+    stack = [Path(root)]
+    while stack:
+        folder = stack.pop()
+        try:
+            snapshot = DirectorySnapshot.scan(folder)
+        except OSError:
+            continue
+        yield snapshot
+        stack.extend(
+            e.path for e in reversed(snapshot.subfolders())
+            if not e.is_symlink and not e.name.startswith(".") and e.name not in SKIPPED_FOLDERS
+        )
+
+
+async def stream_snapshots(root: Path):
+    """
+    Async version of walk_snapshots: the next folder is scanned off-loop while the caller
+    is still renaming inside the current one.
+    """
+    loop = asyncio.get_running_loop()
+    walker = walk_snapshots(root)
+    pending = loop.run_in_executor(None, next, walker, None)
+    while (snapshot := await pending) is not None:
+        pending = loop.run_in_executor(None, next, walker, None)
+        yield snapshot
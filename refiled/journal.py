@@ -0,0 +1,261 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from refiled import metrics
+
+DEFAULT_JOURNAL = Path(os.environ.get("REFILED_JOURNAL", Path.home() / ".refiled" / "journal.db"))
+
+# Completed renames are written in groups of this size instead of one transaction per file
+FLUSH_EVERY = 512
+
+# Batches kept in the journal; older finished ones are pruned whenever it is opened
+JOURNAL_KEEP = int(os.environ.get("REFILED_JOURNAL_KEEP", 1000))
+
+# Batch statuses undo still has work left in; a partly undone batch is retried by the next undo
+UNDOABLE = ("applied", "partially_undone")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    created_dirs TEXT NOT NULL DEFAULT '[]',
+    run_id TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    batch_id INTEGER NOT NULL REFERENCES batches(id),
+    seq INTEGER NOT NULL,
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (batch_id, seq)
+);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def compose_steps(steps: list[tuple[Path, Path]]) -> list[tuple[Path, Path]]:
+    """
+    Collapse physical rename steps (including hops through temporary names) into
+    logical (old_path, new_path) pairs.
+    """
+    origin_of = {}
+    for src, dst in steps:
+        origin_of[dst] = origin_of.pop(src, src)
+    return [(origin, final) for final, origin in origin_of.items() if origin != final]
+
+
+class Journal:
+    """
+    Append-only, on-disk record of every rename batch (SQLite in WAL mode).
+    Steps are written as planned before anything is renamed and flagged done in groups
+    afterwards, so a crash mid-batch can be rolled back and undo survives restarts.
+    """
+
+    def __init__(self, path: Path = DEFAULT_JOURNAL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Journals written before runs existed lack the column
+        if "run_id" not in {row[1] for row in self.conn.execute("PRAGMA table_info(batches)")}:
+            self.conn.execute("ALTER TABLE batches ADD COLUMN run_id TEXT")
+        # Batches begun while a run is open share its id, so undo reverts them together
+        self.run_id = None
+        self.prune()
+        # The last apply batch this process began, so a session can undo its own changes by id
+        self.last_batch = None
+
+    @contextmanager
+    def run(self):
+        """
+        Group every batch begun inside the block into one run, e.g. all folders of a --recursive command.
+        """
+        outer = self.run_id
+        self.run_id = self.run_id or uuid.uuid4().hex
+        try:
+            yield self.run_id
+        finally:
+            self.run_id = outer
+
+    def begin(self, steps: list[tuple[Path, Path]], kind: str = "apply", created_dirs=()) -> int:
+        """
+        Record a batch and all of its planned steps in one transaction before any rename happens.
+        """
+        with metrics.span("journal", op="begin"), self.conn:
+            self.conn.execute("BEGIN")
+            cur = self.conn.execute(
+                "INSERT INTO batches (created, kind, status, host, pid, created_dirs, run_id) VALUES (?, ?, 'pending', ?, ?, ?, ?)",
+                (time.time(), kind, socket.gethostname(), os.getpid(), json.dumps([str(d) for d in created_dirs]),
+                 self.run_id if kind == "apply" else None),
+            )
+            batch_id = cur.lastrowid
+            if kind == "apply":
+                self.last_batch = batch_id
+            self.conn.executemany(
+                "INSERT INTO steps (batch_id, seq, src, dst) VALUES (?, ?, ?, ?)",
+                ((batch_id, seq, str(src), str(dst)) for seq, (src, dst) in enumerate(steps)),
+            )
+        return batch_id
+
+    def extend(self, batch_id: int, steps: list[tuple[Path, Path]]) -> list[int]:
+        """
+        Append steps to a batch already begun, e.g. the restores of a cycle left half-done. Returns their seqs.
+        """
+        with metrics.span("journal", op="extend"), self.conn:
+            self.conn.execute("BEGIN")
+            (first,) = self.conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM steps WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+            self.conn.executemany(
+                "INSERT INTO steps (batch_id, seq, src, dst) VALUES (?, ?, ?, ?)",
+                ((batch_id, first + i, str(src), str(dst)) for i, (src, dst) in enumerate(steps)),
+            )
+        return list(range(first, first + len(steps)))
+
+    def mark_done(self, batch_id: int, seqs: list[int]):
+        if not seqs:
+            return
+        with metrics.span("journal", op="mark_done"), self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "UPDATE steps SET done = 1 WHERE batch_id = ? AND seq = ?",
+                ((batch_id, seq) for seq in seqs),
+            )
+
+    def set_status(self, batch_id: int, status: str):
+        self.conn.execute("UPDATE batches SET status = ? WHERE id = ?", (status, batch_id))
+
+    def steps(self, batch_id: int, done_only: bool = True) -> list[tuple[Path, Path]]:
+        query = "SELECT src, dst FROM steps WHERE batch_id = ?" + (" AND done = 1" if done_only else "") + " ORDER BY seq"
+        return [(Path(src), Path(dst)) for src, dst in self.conn.execute(query, (batch_id,))]
+
+    def created_dirs(self, batch_id: int) -> list[Path]:
+        row = self.conn.execute("SELECT created_dirs FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return [Path(d) for d in json.loads(row[0])] if row else []
+
+    def last_applied(self) -> int | None:
+        row = self.conn.execute(
+            f"SELECT id FROM batches WHERE kind = 'apply' AND status IN {UNDOABLE} ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def run_batches(self, batch_id: int) -> list[int]:
+        """
+        The still-applied batches of the run `batch_id` belongs to, newest first (just `batch_id` outside a run).
+        """
+        row = self.conn.execute("SELECT run_id, status FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if not row or row[0] is None:
+            return [batch_id] if row and row[1] in UNDOABLE else []
+        return [b for (b,) in self.conn.execute(
+            f"SELECT id FROM batches WHERE run_id = ? AND kind = 'apply' AND status IN {UNDOABLE} ORDER BY id DESC",
+            (row[0],),
+        )]
+
+    def history(self, limit: int = 20) -> list[tuple[int, float, str, str, int]]:
+        return self.conn.execute(
+            "SELECT b.id, b.created, b.kind, b.status, COUNT(s.seq) FROM batches b "
+            "LEFT JOIN steps s ON s.batch_id = b.id GROUP BY b.id ORDER BY b.id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    def stale_batches(self) -> list[int]:
+        """
+        Pending batches whose process on this host is gone, i.e. interrupted by a crash or Ctrl-C.
+        """
+        host = socket.gethostname()
+        rows = self.conn.execute("SELECT id, host, pid FROM batches WHERE status = 'pending' ORDER BY id DESC")
+        return [batch_id for batch_id, h, pid in rows if h == host and not _pid_alive(pid)]
+
+    def rollback(self, batch_id: int) -> int:
+        """
+        Revert the renames of an interrupted batch, newest first.
+        Steps not yet flagged done are checked on disk, since flags are written in groups.
+        """
+        reverted = 0
+        for src, dst in reversed(self.steps(batch_id, done_only=False)):
+            if src.exists() or not dst.exists():
+                continue
+            try:
+                os.rename(dst, src)
+                reverted += 1
+            except OSError as e:
+                print(f"⚠️ Failed to roll back {dst} -> {src}: {e}")
+        for folder in self.created_dirs(batch_id):
+            remove_empty_tree(folder)
+        self.set_status(batch_id, "rolled_back")
+        return reverted
+
+    def prune(self, keep: int = JOURNAL_KEEP) -> int:
+        """
+        Delete every batch but the newest `keep`, with its steps. Pending batches stay until recovered.
+        Returns the number of batches deleted.
+        """
+        with metrics.span("journal", op="prune"), self.conn:
+            self.conn.execute("BEGIN")
+            old = [(b,) for (b,) in self.conn.execute(
+                "SELECT id FROM batches WHERE status != 'pending' AND id NOT IN "
+                "(SELECT id FROM batches ORDER BY id DESC LIMIT ?)",
+                (keep,),
+            )]
+            self.conn.executemany("DELETE FROM steps WHERE batch_id = ?", old)
+            self.conn.executemany("DELETE FROM batches WHERE id = ?", old)
+        return len(old)
+
+    def close(self):
+        self.conn.close()
+
+
+def remove_empty_tree(folder: Path):
+    """
+    Remove `folder` and its subfolders, bottom-up, as long as they hold no files.
+    """
+    if not folder.is_dir():
+        return
+    for sub in sorted((p for p in folder.rglob("*") if p.is_dir()), reverse=True):
+        try:
+            sub.rmdir()
+        except OSError:
+            pass
+    try:
+        folder.rmdir()
+    except OSError:
+        pass
+
+
+_journal = None
+
+
+def get_journal() -> Journal:
+    global _journal
+    if _journal is None:
+        _journal = Journal()
+    return _journal
+
+
+def recover() -> int:
+    """
+    Roll back every batch left half-applied by a previous run. Returns the number of renames reverted.
+    """
+    journal = get_journal()
+    return sum(journal.rollback(batch_id) for batch_id in journal.stale_batches())
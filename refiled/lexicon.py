@@ -0,0 +1,127 @@
+import importlib.util
+import os
+import pickle
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent / "data"
+STOPWORDS_FILE = DATA_DIR / "stopwords_en.txt"
+CACHE_FILE = Path(os.environ.get("REFILED_LEXICON_CACHE", Path.home() / ".refiled" / "lexicon.pickle"))
+
+# Longest multi-word profanity entry, in words
+PHRASE_WORDS_MAX = 4
+
+# Bump when the compiled layout changes so stale caches get rebuilt
+LEXICON_VERSION = 2
+
+# better_profanity's one-way variants: a letter of a listed word may also be written as these ("5h1t", "fvck"),
+# but not the other way round, so "slut" is never read as "siut". Filenames are normalised to [a-z0-9]
+# before lookup, so symbol variants ("@", "$", "*") never reach here.
+VARIANTS = {"a": "4", "i": "l1", "o": "0", "u": "v", "v": "u", "l": "1", "e": "3", "s": "5", "t": "7"}
+
+# Lossy key shared by a word and all of its variants; it only buckets candidates, is_variant() decides
+LOOKALIKES = str.maketrans({"4": "a", "0": "o", "3": "e", "5": "s", "7": "t", "v": "u", "1": "l", "i": "l"})
+
+
+def fold(text: str) -> str:
+    return text.lower().translate(LOOKALIKES)
+
+
+def is_variant(written: str, word: str) -> bool:
+    # `written` spells `word`, letter for letter or through one of the word letter's variants
+    return len(written) == len(word) and all(c == w or c in VARIANTS.get(w, "") for c, w in zip(written, word))
+
+
+@dataclass(frozen=True)
+class Lexicon:
+    """
+    Stopwords and profanity compiled into plain sets and dicts.
+    Profanity entries are grouped by their folded key, so one dict lookup and a check of the few
+    entries sharing that key replace better_profanity's variant scan.
+    """
+    stopwords: frozenset[str]
+    profane_tokens: dict[str, tuple[str, ...]]
+    profane_phrases: dict[str, tuple[str, ...]]
+
+    def _listed(self, entries: dict[str, tuple[str, ...]], written: str) -> bool:
+        return any(is_variant(written, word) for word in entries.get(fold(written), ()))
+
+    def is_profane_token(self, token: str) -> bool:
+        return self._listed(self.profane_tokens, token.lower())
+
+    def is_profane(self, text: str) -> bool:
+        tokens = text.lower().split()
+        if any(self._listed(self.profane_tokens, token) for token in tokens):
+            return True
+        # Multi-word entries may sit anywhere inside the text
+        return any(
+            self._listed(self.profane_phrases, " ".join(tokens[i:j]))
+            for i in range(len(tokens))
+            for j in range(i + 2, min(len(tokens), i + PHRASE_WORDS_MAX) + 1)
+        )
+
+
+def _profanity_source() -> Path | None:
+    # better_profanity ships its word list inside the wheel; locate it without importing the package
+    spec = importlib.util.find_spec("better_profanity")
+    if spec is None or spec.origin is None:
+        return None
+    return Path(spec.origin).parent / "profanity_wordlist.txt"
+
+
+def _signature() -> tuple:
+    sources = [STOPWORDS_FILE, _profanity_source()]
+    return (LEXICON_VERSION,) + tuple(
+        (str(p), p.stat().st_mtime_ns, p.stat().st_size) if p and p.exists() else None for p in sources
+    )
+
+
+def build_lexicon() -> Lexicon:
+    """
+    Compile the bundled stopword list and better_profanity's word list (if installed).
+    """
+    stopwords = frozenset(w for w in STOPWORDS_FILE.read_text(encoding="utf-8").split() if w)
+    words = []
+    source = _profanity_source()
+    if source and source.exists():
+        words = [w.strip().lower() for w in source.read_text(encoding="utf-8").splitlines() if w.strip()]
+    return Lexicon(
+        stopwords=stopwords,
+        profane_tokens=group_by_key(w for w in words if " " not in w),
+        profane_phrases=group_by_key(w for w in words if " " in w),
+    )
+
+
+def group_by_key(words) -> dict[str, tuple[str, ...]]:
+    groups = {}
+    for word in words:
+        groups.setdefault(fold(word), set()).add(word)
+    return {key: tuple(sorted(group)) for key, group in groups.items()}
+
+
+@lru_cache(maxsize=None)
+def load_lexicon() -> Lexicon:
+    """
+    Return the compiled lexicon, unpickled from CACHE_FILE when it matches the current sources
+    and rebuilt (then cached) otherwise. Never touches the network.
+    """
+    signature = _signature()
+    try:
+        with open(CACHE_FILE, "rb") as fh:
+            cached_signature, lexicon = pickle.load(fh)
+        if cached_signature == signature:
+            return lexicon
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+        pass
+
+    lexicon = build_lexicon()
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump((signature, lexicon), fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, CACHE_FILE)
+    except OSError:
+        pass
+    return lexicon
@@ -0,0 +1,132 @@
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+FORMS = ("NFC", "NFKC")
+# Unicode normalisation applied to terms and names before matching: "NFC", "NFKC" or None
+# (REFILED_NORMALIZE or --normalize). NFKC also folds compatibility forms, e.g. full-width "ＢｌｕＲａｙ".
+NORMALIZATION = os.environ.get("REFILED_NORMALIZE", "").upper()
+NORMALIZATION = NORMALIZATION if NORMALIZATION in FORMS else None
+# Characters that separate words in names, as in "Movie.x264.1080p" or "Show_S01-E02"
+SEPARATORS = r"\s._-"
+
+
+def normalize(text: str, form: str | None = None) -> str:
+    form = form or NORMALIZATION
+    return unicodedata.normalize(form, text) if form else text
+
+
+def fold(text: str, form: str | None = None) -> str:
+    # Comparison key for one name: normalised, then case-folded ("Straße" -> "strasse")
+    return normalize(text, form).casefold()
+
+
+def _fold_map(text: str) -> tuple[str, list[int] | None]:
+    """
+    fold() of an already normalised name, plus the index in `text` of every folded character.
+    Folding can change the length ("ß" -> "ss", "İ" -> "i̇"); ASCII names fold one to one and need no map.
+    """
+    if text.isascii():
+        return text.lower(), None
+    folded, origin = [], []
+    for i, ch in enumerate(text):
+        f = ch.casefold()
+        folded.append(f)
+        origin.extend([i] * len(f))
+    return "".join(folded), origin
+
+
+class TextMatcher:
+    """
+    A term compiled once into a regex over case-folded text, so every name costs one fold and one search,
+    and a name matches exactly when contains() says so, "STRASSE" in "Die straße" included.
+    Spans found in the folded name are mapped back to the original; a match covering only part of
+    one character's fold (the "s" of "ß" -> "ss") is not a match there.
+    With `words`, the term only matches as whole tokens separated by whitespace, ".", "_" or "-", and any
+    run of separators inside the term matches any run in the name. Names are normalised like the term
+    before matching, and the results of sub() and friends are in that normal form.
+    """
+
+    def __init__(self, text: str, words: bool = False, form: str | None = None):
+        self.form = form or NORMALIZATION
+        self.text = normalize(text, self.form)
+        # Folded term for yes/no tests: a substring check on fold(name) beats a regex search
+        self.key = fold(self.text, self.form)
+        if words:
+            tokens = [t for t in re.split(rf"[{SEPARATORS}]+", self.key) if t]
+            body = rf"[{SEPARATORS}]+".join(map(re.escape, tokens))
+            body = rf"(?<![^{SEPARATORS}]){body}(?![^{SEPARATORS}])"
+        else:
+            body = re.escape(self.key)
+        self.pattern = re.compile(body)
+        # Anchored variants for prefixes: at the start followed by whitespace, or at the end
+        self._leading = re.compile(rf"\A{re.escape(self.key.strip())}\s+")
+        self._trailing = re.compile(rf"\s*{re.escape(self.key.strip())}\Z")
+
+    def prepare(self, name: str) -> str:
+        return unicodedata.normalize(self.form, name) if self.form else name
+
+    def _spans(self, pattern: re.Pattern, name: str, count: int = 0) -> list[tuple[int, int]]:
+        folded, origin = _fold_map(name)
+        spans = []
+        for match in pattern.finditer(folded):
+            start, end = match.span()
+            if origin is not None:
+                # Both ends must fall between the folds of two original characters
+                if 0 < start < len(origin) and origin[start - 1] == origin[start]:
+                    continue
+                if 0 < end < len(origin) and origin[end - 1] == origin[end]:
+                    continue
+                start = origin[start] if start < len(origin) else len(name)
+                end = origin[end - 1] + 1 if end > match.start() else start
+            if spans and start < spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(end, spans[-1][1]))
+                continue
+            spans.append((start, end))
+            if len(spans) == count:
+                break
+        return spans
+
+    def find(self, name: str) -> tuple[str, int, int] | None:
+        # First match as (normalised name, start, end)
+        name = self.prepare(name)
+        spans = self._spans(self.pattern, name, count=1)
+        return (name, *spans[0]) if spans else None
+
+    def contains(self, name: str) -> bool:
+        return self.key in fold(name, self.form)
+
+    def _sub(self, pattern: re.Pattern, replacement: str, name: str, count: int = 0) -> str:
+        # Names without a match come back untouched, not merely re-normalised
+        prepared = self.prepare(name)
+        spans = self._spans(pattern, prepared, count)
+        if not spans:
+            return name
+        pieces, last = [], 0
+        for start, end in spans:
+            pieces += [prepared[last:start], replacement]
+            last = end
+        pieces.append(prepared[last:])
+        return "".join(pieces)
+
+    def sub(self, replacement: str, name: str) -> str:
+        return self._sub(self.pattern, replacement, name)
+
+    def strip_prefix(self, name: str) -> str:
+        return self._sub(self._leading, "", name, count=1)
+
+    def strip_suffix(self, name: str) -> str:
+        return self._sub(self._trailing, "", name, count=1)
+
+
+@lru_cache(maxsize=256)
+def _compiled(text: str, words: bool, form: str | None) -> TextMatcher:
+    return TextMatcher(text, words=words, form=form)
+
+
+def compile_matcher(text: str, words: bool = False, form: str | None = None) -> TextMatcher:
+    """
+    Shared, cached TextMatcher for `text`: operations call this per file and compile only once per batch.
+    """
+    return _compiled(text, words, form or NORMALIZATION)
@@ -0,0 +1,169 @@
+import atexit
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Callables receiving every metric event as a dict; nothing is measured while this is empty
+_hooks = []
+
+
+def add_hook(hook):
+    """
+    Register `hook(event)` for every span, counter and gauge. An event is a dict with
+    type ("span", "counter" or "gauge"), name, value (ms for spans), labels and ts.
+    """
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def enabled() -> bool:
+    return bool(_hooks)
+
+
+def _emit(kind: str, name: str, value: float, labels: dict):
+    event = {"type": kind, "name": name, "value": value, "labels": labels, "ts": time.time()}
+    for hook in list(_hooks):
+        hook(event)
+
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    Time the enclosed block and report it in ms, e.g. `with metrics.span("scan", folder=str(path)):`.
+    """
+    if not _hooks:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit("span", name, (time.perf_counter() - start) * 1000, labels)
+
+
+def observe(name: str, ms: float, **labels):
+    # A span measured by the caller, e.g. the indexer's per-stage timings
+    if _hooks:
+        _emit("span", name, ms, labels)
+
+
+def count(name: str, value: int = 1, **labels):
+    if _hooks and value:
+        _emit("counter", name, value, labels)
+
+
+def gauge(name: str, value: float, **labels):
+    if _hooks:
+        _emit("gauge", name, value, labels)
+
+
+class JsonLinesSink:
+    """
+    Append every event to a file as one JSON object per line.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def __call__(self, event: dict):
+        self._fh.write(json.dumps(event) + "\n")
+
+    def flush(self):
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+def _metric_name(name: str) -> str:
+    return "refiled_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_text(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels)
+    return "{" + ",".join(pairs) + "}"
+
+
+class PrometheusTextfile:
+    """
+    Aggregate events and write them in the Prometheus text format, for node_exporter's textfile collector.
+    Spans become <name>_seconds_sum/_count, counters <name>_total, gauges keep their last value.
+    The file is replaced atomically on flush().
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.spans = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def __call__(self, event: dict):
+        key = (event["name"], tuple(sorted(event["labels"].items())))
+        if event["type"] == "span":
+            total, calls = self.spans.get(key, (0.0, 0))
+            self.spans[key] = (total + event["value"] / 1000, calls + 1)
+        elif event["type"] == "counter":
+            self.counters[key] = self.counters.get(key, 0) + event["value"]
+        else:
+            self.gauges[key] = event["value"]
+
+    def lines(self):
+        for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+            for name in sorted({name for name, _ in series}):
+                metric = _metric_name(name) + ("_total" if kind == "counter" else "")
+                yield f"# TYPE {metric} {kind}"
+                for (n, labels), value in sorted(series.items(), key=str):
+                    if n == name:
+                        yield f"{metric}{_label_text(labels)} {value}"
+        for name in sorted({name for name, _ in self.spans}):
+            metric = _metric_name(name) + "_seconds"
+            yield f"# TYPE {metric} summary"
+            for (n, labels), (total, calls) in sorted(self.spans.items(), key=str):
+                if n == name:
+                    yield f"{metric}_sum{_label_text(labels)} {total:.6f}"
+                    yield f"{metric}_count{_label_text(labels)} {calls}"
+
+    def flush(self):
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text("\n".join(self.lines()) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def close(self):
+        self.flush()
+
+
+_sinks = []
+
+
+def configure(jsonl: Path | None = None, prometheus: Path | None = None):
+    """
+    Attach the file sinks, e.g. from --metrics-jsonl / --metrics-prom or
+    REFILED_METRICS_JSONL / REFILED_METRICS_PROM. Sinks are flushed and closed at exit.
+    """
+    jsonl = jsonl or os.environ.get("REFILED_METRICS_JSONL")
+    prometheus = prometheus or os.environ.get("REFILED_METRICS_PROM")
+    for sink_type, path in ((JsonLinesSink, jsonl), (PrometheusTextfile, prometheus)):
+        if path:
+            if not _sinks:
+                atexit.register(close)
+            _sinks.append(add_hook(sink_type(path)))
+
+
+def close():
+    while _sinks:
+        sink = _sinks.pop()
+        remove_hook(sink)
+        sink.close()
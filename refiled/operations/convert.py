@@ -1,27 +1,17 @@
 
 
-import asyncio
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
-from refiled.utilities import safe_rename
+from refiled.filesystem.snapshot import DirectorySnapshot, FileEntry
+from refiled.planner import plan_renames, apply_plan
 
 VIDEO_EXTENSIONS = {".mp4", ".mkv"}
 
-def _convert_extension(file: Path, to_ext: str) -> Path:
+def _convert_extension(file: FileEntry, to_ext: str) -> Path:
     new_name = file.stem + to_ext
     return file.with_name(new_name)
 
-async def _process_file(file: Path, to_ext: str) -> tuple[Path, Path]:
-    new_path = _convert_extension(file, to_ext)
-    if new_path.exists():
-        return None
-    success = await safe_rename(file, new_path)
-    if success:
-        return (file, new_path)
-    return None
-
-async def convert_files(files, to_ext: str):
+async def convert_files(snapshot: DirectorySnapshot, to_ext: str, dry_run=False):
     """
     Convert files with .mp4 or .mkv extension to the other format.
     """
@@ -31,14 +21,7 @@ async def convert_files(files, to_ext: str):
 
     from_ext = ".mkv" if to_ext == ".mp4" else ".mp4"
 
-    filtered_files = [f for f in files if f.suffix.lower() == from_ext]
-
-    results = []
-    loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor() as executor:
-        tasks = [loop.create_task(_process_file(file, to_ext)) for file in filtered_files]
-        for task in asyncio.as_completed(tasks):
-            res = await task
-            if res:
-                results.append(res)
-    return results
\ No newline at end of file
+    filtered_files = [f for f in snapshot.files() if f.suffix.lower() == from_ext]
+
+    plan = plan_renames(((f.path, _convert_extension(f, to_ext)) for f in filtered_files), snapshot.paths)
+    return await apply_plan(plan, dry_run=dry_run)
@@ -1,137 +1,342 @@
-import asyncio
 from pathlib import Path
-from collections import defaultdict
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
+import asyncio
+import os
 import re
+import time
 
-import nltk
-from nltk.corpus import stopwords
+from refiled import metrics
+from refiled.utilities import is_probable_name
+from refiled.filesystem.index import best_effort
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled.lexicon import load_lexicon
+from refiled.planner import plan_renames, apply_plan, list_existing
 
-from better_profanity import profanity
-profanity.load_censor_words()
+# Stopwords and profanity come from the bundled, precompiled lexicon: no nltk download,
+# no better_profanity variant scan, and nothing is loaded until the indexer first needs it.
 
-import wordninja
-from refiled.utilities import is_probable_name
-from refiled.utilities import safe_rename, is_video_file
+def get_stopwords() -> frozenset[str]:
+    return load_lexicon().stopwords
 
-try:
-    STOPWORDS = set(stopwords.words("english"))
-except LookupError:
-    nltk.download("stopwords")
-    STOPWORDS = set(stopwords.words("english"))
+def get_profane_phrases() -> frozenset[str]:
+    # Multi-word entries ("blow job") can only be caught on whole phrases; everything else is checked per token
+    return frozenset(phrase for group in load_lexicon().profane_phrases.values() for phrase in group)
+
+def __getattr__(name):
+    # Keep `indexer.STOPWORDS` / `indexer.PROFANE_PHRASES` working without loading them at import time
+    if name == "STOPWORDS":
+        return get_stopwords()
+    if name == "PROFANE_PHRASES":
+        return get_profane_phrases()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def is_forbidden_phrase(phrase):
-    return profanity.contains_profanity(phrase)
+    return load_lexicon().is_profane(phrase)
+
+@lru_cache(maxsize=None)
+def _is_blocked_token(token: str) -> bool:
+    # A stopword, a bare number or a swear word can never be part of an indexed phrase
+    lexicon = load_lexicon()
+    return token in lexicon.stopwords or token.isdigit() or lexicon.is_profane_token(token)
+
+# Longest phrase, in words, and how many files must share a phrase before it becomes a group
+MAX_NGRAM = 3
+MIN_SUPPORT = 2
+
+# Fuzzy grouping: shortest word that may be respelt, and the rapidfuzz ratio two spellings need
+FUZZY_MIN_LENGTH = 4
+FUZZY_THRESHOLD = 80
+
+# Worker processes for phrase extraction, and the fewest uncached names worth starting them for
+DEFAULT_PROCESSES = int(os.environ.get("REFILED_INDEX_PROCESSES", "1"))
+PARALLEL_MIN_NAMES = 5_000
+
+# Stored next to cached phrases; bump when extraction rules change so old rows are recomputed
+PHRASES_VERSION = 1
+
+NON_WORD_PATTERN = re.compile(r'[^a-zA-Z0-9\s]')
+SPACES_PATTERN = re.compile(r'\s+')
 
 def normalize_name(name):
     # Remove extension, lowercase, replace punctuation with space, collapse spaces
     name = Path(name).stem
-    name = re.sub(r'[^a-zA-Z0-9\s]', ' ', name)
-    name = re.sub(r'\s+', ' ', name)
+    name = NON_WORD_PATTERN.sub(' ', name)
+    name = SPACES_PATTERN.sub(' ', name)
     return name.strip().lower()
 
-def generate_phrases(tokens):
+def generate_phrases(tokens, max_n: int = MAX_NGRAM):
     phrases = set()
     length = len(tokens)
-    # 2-word, 3-word phrases only
-    for n in [2, 3]:
+    # 2-word up to max_n-word phrases
+    for n in range(2, max_n + 1):
         for i in range(length - n + 1):
             phrase = " ".join(tokens[i:i + n])
             phrases.add(phrase)
     return phrases
 
-async def index_repeated_keywords(directory: Path, fuzzy: bool = False):
+def extract_phrases(name: str, max_n: int = MAX_NGRAM) -> set[str]:
+    """
+    Return the indexable 2 to max_n word phrases of a filename.
+    Blocked tokens split the name into runs, so phrases are only generated where every word qualifies.
+    """
+    phrases = set()
+    run = []
+    for token in normalize_name(name).split() + [""]:
+        if token and not _is_blocked_token(token):
+            run.append(token)
+            continue
+        if len(run) >= 2:
+            phrases.update(
+                p for p in generate_phrases(run, max_n)
+                if is_probable_name(p) and not is_forbidden_phrase(p)
+            )
+        run = []
+    return phrases
+
+def _reversed_pair(phrase: str) -> str | None:
+    tokens = phrase.split()
+    return f"{tokens[1]} {tokens[0]}" if len(tokens) == 2 else None
+
+def mine_phrases(file_phrases, existing=frozenset(), min_support: int = MIN_SUPPORT) -> dict[str, array]:
+    """
+    Group files (identified by their position in `file_phrases`) by shared phrase.
+    Words are counted first: a phrase can only reach `min_support` files if every word of it does,
+    so phrases with a rarer word never get an ID or a slot in the per-file rows.
+    The remaining phrases are interned and counted, and postings (arrays of file IDs) are only built
+    for those found in at least `min_support` files or naming an existing group, so memory follows
+    the repeated phrases rather than every phrase. Reversed two-word phrases share one entry,
+    spelled like the existing group when there is one.
+    """
+    # Number of files using each word, counted in C over one set of words per file
+    support = Counter(chain.from_iterable(set(" ".join(phrases).split()) for phrases in file_phrases))
+
+    # Existing groups stay candidates whatever the support of their words, in either word order for pairs
+    kept_anyway = set(existing) | {rev for rev in map(_reversed_pair, existing) if rev}
+
+    ids = {}  # phrase (either word order for pairs) -> phrase id
+    spelling = []  # phrase id -> folder name
+    counts = array("I")
+    flat = array("I")  # candidate phrase ids of every file, back to back
+    ends = array("Q")  # end offset of each file in `flat`
+    for phrases in file_phrases:
+        row = set()
+        for phrase in phrases:
+            pid = ids.get(phrase)
+            if pid is None:
+                if phrase not in kept_anyway and any(support[w] < min_support for w in phrase.split()):
+                    continue
+                rev = _reversed_pair(phrase)
+                pid = ids.get(rev) if rev else None
+                if pid is None:
+                    pid = len(spelling)
+                    spelling.append(rev if rev in existing and phrase not in existing else phrase)
+                    counts.append(0)
+                ids[phrase] = pid
+            row.add(pid)
+        for pid in row:
+            counts[pid] += 1
+        flat.extend(row)
+        ends.append(len(flat))
+
+    keep = {pid: array("I") for pid, count in enumerate(counts) if count >= min_support or spelling[pid] in existing}
+    start = 0
+    for file_id, end in enumerate(ends):
+        for pid in flat[start:end]:
+            postings = keep.get(pid)
+            if postings is not None:
+                postings.append(file_id)
+        start = end
+    return {spelling[pid]: postings for pid, postings in keep.items()}
+
+def _record(timings: dict | None, stage: str, start: float):
+    ms = (time.perf_counter() - start) * 1000
+    metrics.observe(f"index.{stage}", ms)
+    if timings is not None:
+        timings[stage] = ms
+
+def _deletions(token: str) -> set[str]:
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+def fuzzy_token_map(file_phrases, threshold: float = FUZZY_THRESHOLD, preferred=frozenset()) -> dict[str, str]:
     """
-    Index repeated 2-3 word phrases in filenames under directory,
-    move grouped files into [indexed]/phrase_name/ folders asynchronously,
+    Map misspelt or variant words ("planit", "colour") onto the spelling most files use,
+    or onto a `preferred` spelling (words of existing group names) when there is one.
+    Candidates are blocked by single-character deletions, so only words within about one edit
+    of each other are ever compared, and each pair is confirmed with rapidfuzz's ratio.
+    """
+    from rapidfuzz import fuzz
+
+    frequency = {}
+    for phrases in file_phrases:
+        for word in {w for p in phrases for w in p.split()}:
+            frequency[word] = frequency.get(word, 0) + 1
+    for word in preferred:
+        frequency[word] = frequency.get(word, 0) + len(file_phrases)
+
+    # Words with digits (s01e02, x264) carry meaning in every character and are never respelt
+    words = [w for w in frequency if len(w) >= FUZZY_MIN_LENGTH and w.isalpha()]
+    blocks = {}
+    for word in words:
+        for key in _deletions(word):
+            blocks.setdefault(key, []).append(word)
+
+    # Most frequent spellings become canonical first; a rarer word joins the most common one it resembles.
+    # Requiring the same first letter keeps apart pairs like "night" / "knight".
+    canonical = {}
+    for word in sorted(words, key=lambda w: (-frequency[w], w)):
+        candidates = {
+            c for key in _deletions(word) for c in blocks[key]
+            if c[0] == word[0] and canonical.get(c) == c
+        }
+        best = max(
+            (c for c in candidates if c != word and fuzz.ratio(word, c, score_cutoff=threshold)),
+            key=lambda c: (frequency[c], c),
+            default=word,
+        )
+        canonical[word] = best
+    return {word: target for word, target in canonical.items() if word != target}
+
+def _canonical_phrases(file_phrases, token_map: dict[str, str]) -> list[set[str]]:
+    if not token_map:
+        return file_phrases
+    return [
+        {" ".join(token_map.get(w, w) for w in phrase.split()) for phrase in phrases}
+        for phrases in file_phrases
+    ]
+
+def _extract_shard(names: list[str], max_n: int) -> list[set[str]]:
+    # Runs inside a worker process; the lexicon is loaded there from its pickle cache
+    return [extract_phrases(name, max_n) for name in names]
+
+async def extract_all(names: list[str], max_n: int = MAX_NGRAM, processes: int = DEFAULT_PROCESSES) -> list[set[str]]:
+    """
+    Extract the phrases of many names off the event loop: in a worker thread, or sharded
+    over `processes` worker processes when there are enough names to pay for starting them.
+    """
+    loop = asyncio.get_running_loop()
+    if processes <= 1 or len(names) < PARALLEL_MIN_NAMES:
+        return await loop.run_in_executor(None, _extract_shard, names, max_n)
+    # A few shards per process keeps every worker busy when names differ in length
+    size = -(-len(names) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        shards = await asyncio.gather(*(
+            loop.run_in_executor(pool, _extract_shard, names[i:i + size], max_n)
+            for i in range(0, len(names), size)
+        ))
+    return [phrases for shard in shards for phrases in shard]
+
+async def _phrases_by_file(snapshot: DirectorySnapshot, files, max_n: int = MAX_NGRAM, processes: int = DEFAULT_PROCESSES) -> list:
+    """
+    Phrases of every file, reusing what earlier runs stored in the filename index for unchanged
+    (name, mtime) pairs, so only new or renamed files are tokenised again.
+    """
+    key = f"{PHRASES_VERSION}:{max_n}"
+    known = best_effort("cached_phrases", snapshot.path, key, default={})
+    by_file = []
+    missing = []
+    for i, file in enumerate(files):
+        hit = known.pop(file.name, None)
+        if hit is not None and hit[0] == file.mtime:
+            by_file.append(hit[1])
+        else:
+            by_file.append(None)
+            missing.append(i)
+
+    extracted = await extract_all([files[i].name for i in missing], max_n, processes)
+    fresh = {}
+    for i, phrases in zip(missing, extracted):
+        by_file[i] = phrases
+        fresh[files[i].name] = (files[i].mtime, phrases)
+    # Whatever is left was moved, renamed or deleted since the last run
+    best_effort("store_phrases", snapshot.path, key, fresh, removed=known.keys())
+    return by_file
+
+def _existing_groups(indexed_dir: Path) -> set[str]:
+    if not indexed_dir.is_dir():
+        return set()
+    return {folder.name.replace("_", " ") for folder in DirectorySnapshot.scan(indexed_dir).subfolders()}
+
+async def index_repeated_keywords(
+    snapshot: DirectorySnapshot,
+    fuzzy: bool = False,
+    timings: dict | None = None,
+    max_n: int = MAX_NGRAM,
+    min_support: int = MIN_SUPPORT,
+    processes: int = DEFAULT_PROCESSES,
+    dry_run: bool = False,
+):
+    """
+    Index repeated 2 to max_n word phrases in the filenames of a directory snapshot,
+    move groups of at least `min_support` files into [indexed]/phrase_name/ folders asynchronously,
     and return list of (old_path, new_path) tuples for undo.
+    Runs are incremental: unchanged files are not re-tokenised, and a single new file joins
+    an [indexed]/ folder that already exists for one of its phrases.
+    With `fuzzy`, spelling variants of a word are folded together first, so typos land in the same group.
+    Phrase extraction runs off the event loop, sharded over `processes` worker processes if above 1.
+    Pass a dict as `timings` to get per-stage durations in ms (tokenise, group, plan, move).
+    With `dry_run`, the planned moves are returned and no folder is created.
     """
-    path = directory
-    files = [f for f in path.iterdir() if f.is_file() and is_video_file(f.name)]
-
-    phrase_map = defaultdict(set)  # phrase -> set of files
-
-    # Build phrase map
-    for file in files:
-        norm_name = normalize_name(file.name)
-        norm_tokens = norm_name.split()
-        # Use wordninja to split original stem for probable names
-        orig_name = Path(file.name).stem
-        orig_tokens = wordninja.split(orig_name)
-        phrases_norm = generate_phrases(norm_tokens)
-        for phrase in phrases_norm:
-            words = phrase.split()
-            score = 0
-            if len(words) >= 2:
-                score += 1
-            if all(w.istitle() for w in words):
-                score += 1
-            if all(w.lower() not in STOPWORDS for w in words):
-                score += 1
-            if not is_forbidden_phrase(phrase.replace("_", " ")):
-                score += 1
-            if any(word.isdigit() for word in words):
-                continue
-            # Use is_probable_name to filter probable phrases
-            if not is_probable_name(phrase):
-                continue
-            if score < 3:
-                continue
-            phrase_map[phrase].add(file)
-
-    # Merge reversed two-word phrases into one key
-    for phrase in list(phrase_map.keys()):
-        tokens = phrase.split()
-        if len(tokens) == 2:
-            rev = f"{tokens[1]} {tokens[0]}"
-            if rev in phrase_map:
-                phrase_map[phrase] |= phrase_map[rev]
-                del phrase_map[rev]
-
-    # Filter phrases that appear in at least two unique files
-    valid_phrases = {p: fs for p, fs in phrase_map.items() if len(fs) >= 2 and len({f.name for f in fs}) >= 2}
+    path = snapshot.path
+    files = snapshot.videos()
+    indexed_dir = path / "[indexed]"
+
+    stage_start = time.perf_counter()
+    file_phrases = await _phrases_by_file(snapshot, files, max_n, processes)
+    _record(timings, "tokenise", stage_start)
+
+    stage_start = time.perf_counter()
+    existing = _existing_groups(indexed_dir)
+    if fuzzy:
+        preferred = {w for group in existing for w in group.split()}
+        file_phrases = _canonical_phrases(file_phrases, fuzzy_token_map(file_phrases, preferred=preferred))
+    valid_phrases = mine_phrases(file_phrases, existing, min_support)
+    _record(timings, "group", stage_start)
     if not valid_phrases:
         return []
 
-    # Sort phrases by length descending (prioritize longer phrases)
-    sorted_phrases = sorted(valid_phrases.items(), key=lambda x: -len(x[0].split()))
-
-    indexed_dir = path / "[indexed]"
-    indexed_dir.mkdir(exist_ok=True)
+    stage_start = time.perf_counter()
+    # Sort phrases by length descending (prioritize longer phrases), then existing folders first
+    sorted_phrases = sorted(valid_phrases.items(), key=lambda x: (-len(x[0].split()), x[0] not in existing))
 
-    changes = []
-    assigned_files = set()
+    created_dirs = []
+    if not indexed_dir.exists() and not dry_run:
+        indexed_dir.mkdir()
+        created_dirs.append(indexed_dir)
 
-    loop = asyncio.get_running_loop()
+    pairs = []
+    assigned = bytearray(len(files))
 
-    async def move_file_async(file: Path, target_dir: Path):
-        target_dir.mkdir(exist_ok=True)
-        target = target_dir / file.name
-        try:
-            await safe_rename(file, target)
-            return (file, target)
-        except Exception as e:
-            print(f"[ERROR] Failed to move {file} to {target}: {e}")
-            return None
-
-    for phrase, files_set in sorted_phrases:
-        unique_files = [f for f in files_set if f not in assigned_files]
-        if len(unique_files) < 2:
+    for phrase, file_ids in sorted_phrases:
+        unique_ids = [i for i in file_ids if not assigned[i]]
+        if len(unique_ids) < (1 if phrase in existing else min_support):
             continue
 
         subfolder = indexed_dir / phrase.replace(" ", "_")
-        # Schedule moves concurrently
-        move_tasks = [move_file_async(file, subfolder) for file in unique_files]
-        results = await asyncio.gather(*move_tasks)
-        for res in results:
-            if res:
-                old_file, new_file = res
-                assigned_files.add(old_file)
-                changes.append((old_file, new_file))
-
-    # Track indexed_dir for deletion if undo is triggered
-    if changes:
-        changes.append(("__DELETE_IF_UNDONE__", indexed_dir))
+        for i in unique_ids:
+            assigned[i] = 1
+            pairs.append((files[i].path, subfolder / files[i].name))
+
+    # Plan every move up front, then create the target folders and apply in one pass
+    plan = plan_renames(pairs, list_existing(target for _, target in pairs))
+    if dry_run:
+        return await apply_plan(plan, dry_run=True)
+    for folder in {target.parent for _, target in plan.changes}:
+        if not folder.exists():
+            folder.mkdir()
+            if indexed_dir not in created_dirs:
+                created_dirs.append(folder)
+    # Undo removes the folders this run created once they have been emptied
+    plan.created_dirs.extend(created_dirs)
+    _record(timings, "plan", stage_start)
+
+    stage_start = time.perf_counter()
+    changes = await apply_plan(plan)
+    _record(timings, "move", stage_start)
     return changes
 
 
@@ -1,8 +1,8 @@
 
 
-import asyncio
 from pathlib import Path
-from refiled.utilities import is_video_file, safe_rename
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled.planner import plan_renames, apply_plan
 
 
 def _transform_name(name: str, mode: str) -> str:
@@ -25,41 +25,29 @@ def _transform_name(name: str, mode: str) -> str:
     return f"{new_stem}{ext}"
 
 
-async def convert_to_all_caps(files: list[Path]) -> list[tuple[Path, Path]]:
+async def convert_to_all_caps(snapshot: DirectorySnapshot, dry_run=False) -> list[tuple[Path, Path]]:
     """
     Converts filenames to full uppercase (excluding extension), preserving special characters.
     Only operates on video files.
     Returns a list of (old_path, new_path) pairs for successful renames.
     """
-    results = []
-    for file in files:
-        if not is_video_file(file.name):
-            continue
-        new_name = _transform_name(file.name, mode="upper")
-        target = file.with_name(new_name)
-        if target == file:
-            continue
-        success = await safe_rename(file, target)
-        if success:
-            results.append((file, target))
-    return results
+    files = snapshot.videos()
+    plan = plan_renames(
+        ((f.path, f.with_name(_transform_name(f.name, mode="upper"))) for f in files),
+        snapshot.paths,
+    )
+    return await apply_plan(plan, dry_run=dry_run)
 
 
-async def convert_to_all_lower(files: list[Path]) -> list[tuple[Path, Path]]:
+async def convert_to_all_lower(snapshot: DirectorySnapshot, dry_run=False) -> list[tuple[Path, Path]]:
     """
     Converts filenames to lowercase (excluding extension), preserving extension casing and special characters.
     Only operates on video files.
     Returns a list of (old_path, new_path) pairs for successful renames.
     """
-    results = []
-    for file in files:
-        if not is_video_file(file.name):
-            continue
-        new_name = _transform_name(file.name, mode="lower")
-        target = file.with_name(new_name)
-        if target == file:
-            continue
-        success = await safe_rename(file, target)
-        if success:
-            results.append((file, target))
-    return results
\ No newline at end of file
+    files = snapshot.videos()
+    plan = plan_renames(
+        ((f.path, f.with_name(_transform_name(f.name, mode="lower"))) for f in files),
+        snapshot.paths,
+    )
+    return await apply_plan(plan, dry_run=dry_run)
\ No newline at end of file
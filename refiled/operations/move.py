@@ -1,67 +1,46 @@
 
 
-import asyncio
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
 from refiled.operations.search import filter_files
-from refiled.utilities import safe_rename, is_video_file, clean_string
+from refiled.filesystem.snapshot import DirectorySnapshot, FileEntry
+from refiled.matcher import compile_matcher
+from refiled.planner import plan_renames, apply_plan
+from refiled.utilities import clean_string
 
 VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov"}
+SEPARATOR_CHARS = " ._-"
 
 def _move_text_in_name(name: str, text: str, position: str) -> str:
     """
-    Move the first occurrence of `text` (case-insensitive) in `name` to the given position.
-    Returns the modified name. If text not found, returns original.
+    Move the first occurrence of `text` (case-insensitive, as whole words) in `name` to the given position.
+    Words may be separated by spaces, ".", "_" or "-"; the separator next to the moved text goes with it,
+    so "Movie.x264.1080p" becomes "x264.Movie.1080p". Returns the modified name. If text not found, returns original.
     """
-    # Normalize and split into tokens
-    tokens = name.split()
-    text_tokens = text.split()
-
-    # Lowercase version for matching
-    lower_tokens = [t.lower() for t in tokens]
-    lower_text_tokens = [t.lower() for t in text_tokens]
-    text_len = len(text_tokens)
-
-    # Search for exact match of the sequence
-    for i in range(len(tokens) - text_len + 1):
-        if lower_tokens[i:i + text_len] == lower_text_tokens:
-            matched = tokens[i:i + text_len]
-            rest = tokens[:i] + tokens[i + text_len:]
-            if position == "start":
-                new_tokens = matched + rest
-            elif position == "end":
-                new_tokens = rest + matched
-            else:
-                return name
-            return " ".join(new_tokens)
-    
-    return name  # text not found
-
-async def _process_file(file: Path, text: str, position: str) -> tuple[Path, Path]:
-    stem = file.stem
-    ext = file.suffix
-    new_stem = _move_text_in_name(stem, text, position)
-    new_stem = clean_string(new_stem)
-    new_name = new_stem + ext
-    new_path = file.with_name(new_name)
-    if new_path.exists() or new_name == file.name:
-        return None
-    success = await safe_rename(file, new_path)
-    if success:
-        return (file, new_path)
-    return None
-
-async def move_text(files, text, position, fuzzy=False, reversed=False, filter_mode="all", filter_term=None):
-    files = [f for f in files if is_video_file(f.name)]
+    if not text.strip(SEPARATOR_CHARS) or position not in ("start", "end"):
+        return name
+    found = compile_matcher(text, words=True).find(name)
+    if found is None:
+        return name  # text not found
+    name, start, end = found
+    matched = name[start:end]
+    if end < len(name) and name[end] in SEPARATOR_CHARS:
+        separator, rest = name[end], name[:start] + name[end + 1:]
+    elif start > 0 and name[start - 1] in SEPARATOR_CHARS:
+        separator, rest = name[start - 1], name[:start - 1] + name[end:]
+    else:
+        separator, rest = " ", name[:start] + name[end:]
+    separator = " " if separator.isspace() else separator
+    new_name = matched + separator + rest if position == "start" else rest + separator + matched
+    return " ".join(new_name.split())
+
+def _target_move(file: FileEntry, text: str, position: str) -> Path:
+    new_stem = clean_string(_move_text_in_name(file.stem, text, position))
+    return file.with_name(new_stem + file.suffix)
+
+async def move_text(snapshot: DirectorySnapshot, text, position, fuzzy=False, reversed=False, filter_mode="all", filter_term=None, dry_run=False):
+    files = snapshot.videos()
     if filter_mode == "specific" and filter_term:
         files = await filter_files(files, filter_term, fuzzy=fuzzy, reversed=reversed)
-    results = []
-    loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor() as executor:
-        tasks = [loop.create_task(_process_file(file, text, position)) for file in files]
-        for task in asyncio.as_completed(tasks):
-            res = await task
-            if res:
-                results.append(res)
-    return results
\ No newline at end of file
+    plan = plan_renames(((f.path, _target_move(f, text, position)) for f in files), snapshot.paths)
+    return await apply_plan(plan, dry_run=dry_run)
@@ -0,0 +1,133 @@
+import json
+import os
+import shlex
+from pathlib import Path
+
+from refiled.operations.add_remove import _add_text_to_name, _remove_text_from_name
+from refiled.operations.move import _move_text_in_name
+from refiled.operations.pirate import _normalize_format, _pirate_capitalized_format, _pirate_format
+from refiled.operations.prefix import _add_prefix, _remove_prefix
+from refiled.operations.remove_brackets import _remove_brackets_from_name
+from refiled.operations.rules import compile_rules, load_rules
+from refiled.operations.search import filter_files
+from refiled.filesystem.snapshot import DirectorySnapshot, FileEntry
+from refiled.planner import plan_renames, apply_plan
+from refiled.utilities import clean_string
+
+PIPELINES_FILE = Path(os.environ.get("REFILED_PIPELINES", Path.home() / ".refiled" / "pipelines.json"))
+
+
+def _caps(stem: str, mode: str = "lower") -> str:
+    # low_caps._transform_name applied to the stem alone, so dots inside the stem are not taken for an extension
+    return stem.upper() if mode == "upper" else stem.lower()
+
+
+# op -> (name transform on the stem, parameters it accepts, whether the result goes through clean_string
+# like the standalone operation does)
+STEPS = {
+    "add": (_add_text_to_name, ("text", "position"), True),
+    "remove": (_remove_text_from_name, ("text",), True),
+    "move": (_move_text_in_name, ("text", "position"), True),
+    "prefix": (_add_prefix, ("prefix", "position"), True),
+    "unprefix": (_remove_prefix, ("prefix", "position"), True),
+    "brackets": (_remove_brackets_from_name, (), True),
+    "pirate": (lambda name, capitalized=False: _pirate_capitalized_format(name) if capitalized else _pirate_format(name),
+               ("capitalized",), True),
+    "normalize": (_normalize_format, (), True),
+    "caps": (_caps, ("mode",), False),
+    # Compiled once in compile_pipeline(); `rules` is a list of rules or the path of a rules file
+    "rules": (None, ("rules",), False),
+}
+
+# Parameters without a default in the transforms above
+REQUIRED = {"add": ("text", "position"), "remove": ("text",), "move": ("text", "position"),
+            "prefix": ("prefix",), "unprefix": ("prefix",), "rules": ("rules",)}
+
+
+def compile_pipeline(steps: list[dict]):
+    """
+    Compose steps such as [{"op": "brackets"}, {"op": "normalize"}, {"op": "prefix", "prefix": "NEW"}]
+    into one stem -> stem function. Steps are validated here, once, not per file.
+    """
+    compiled = []
+    for step in steps:
+        op = step.get("op")
+        if op not in STEPS:
+            raise ValueError(f"Unknown pipeline step: {op!r} (expected one of {', '.join(STEPS)})")
+        transform, accepted, clean = STEPS[op]
+        params = {k: v for k, v in step.items() if k != "op"}
+        unknown = set(params) - set(accepted)
+        if unknown:
+            raise ValueError(f"Step {op!r} does not take {', '.join(sorted(unknown))}")
+        missing = [p for p in REQUIRED.get(op, ()) if p not in params]
+        if missing:
+            raise ValueError(f"Step {op!r} needs {', '.join(missing)}")
+        if op == "rules":
+            rules = params["rules"]
+            transform, params = compile_rules(load_rules(rules) if isinstance(rules, str) else rules), {}
+        compiled.append((transform, params, clean))
+
+    def run(stem: str) -> str:
+        for transform, params, clean in compiled:
+            stem = transform(stem, **params)
+            if clean:
+                stem = clean_string(stem)
+        return stem
+
+    return run
+
+
+def parse_step(spec: str) -> dict:
+    """
+    Parse a command-line step such as `brackets`, `prefix prefix=NEW position=end` or `pirate capitalized=1`.
+    """
+    op, *pairs = shlex.split(spec)
+    step = {"op": op}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected key=value in step {spec!r}, got {pair!r}")
+        step[key] = value.lower() in {"1", "true", "yes"} if key == "capitalized" else value
+    return step
+
+
+def describe(steps: list[dict]) -> str:
+    return " → ".join(
+        " ".join([step["op"]] + [f"{k}={v}" for k, v in step.items() if k != "op"]) for step in steps
+    )
+
+
+def load_pipelines(path: Path = None) -> dict[str, list[dict]]:
+    path = Path(path or PIPELINES_FILE)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_pipeline(name: str, steps: list[dict], path: Path = None):
+    compile_pipeline(steps)
+    path = Path(path or PIPELINES_FILE)
+    pipelines = load_pipelines(path)
+    pipelines[name] = steps
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(pipelines, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _target_pipeline(file: FileEntry, transform) -> Path:
+    return file.with_name(transform(file.stem) + file.suffix)
+
+
+async def run_pipeline(snapshot: DirectorySnapshot, steps, fuzzy=False, reversed=False, filter_mode="all", filter_term=None, dry_run=False):
+    """
+    Apply every step to each video name in memory and rename each file once, to its final name,
+    in a single journaled batch (one undo reverts the whole pipeline).
+    `steps` may also be the result of compile_pipeline(), to compile once for many folders.
+    """
+    transform = steps if callable(steps) else compile_pipeline(steps)
+    files = snapshot.videos()
+    if filter_mode == "specific" and filter_term:
+        files = await filter_files(files, filter_term, fuzzy=fuzzy, reversed=reversed)
+    plan = plan_renames(((f.path, _target_pipeline(f, transform)) for f in files), snapshot.paths)
+    return await apply_plan(plan, dry_run=dry_run)
@@ -1,9 +1,10 @@
-import asyncio
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
 from refiled.operations.search import filter_files
-from refiled.utilities import safe_rename, is_video_file, clean_string
+from refiled.filesystem.snapshot import DirectorySnapshot, FileEntry
+from refiled.matcher import compile_matcher
+from refiled.planner import plan_renames, apply_plan
+from refiled.utilities import clean_string
 
 VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov"}
 
@@ -18,71 +19,34 @@ def _add_prefix(name: str, prefix: str, position: str = "start") -> str:
         return name
 
 def _remove_prefix(name: str, prefix: str, position: str = "start") -> str:
-    if not prefix.endswith(" "):
-        prefix += " "
+    # Case-insensitive: "new ", "NEW " and "New " are all removed by prefix "NEW"
+    if not prefix.strip():
+        return name
     if position == "start":
-        if name.startswith(prefix):
-            return name[len(prefix):]
+        return compile_matcher(prefix).strip_prefix(name)
     elif position == "end":
-        if name.endswith(prefix.strip()):
-            # Remove prefix at end, including preceding space if any
-            if name.endswith(" " + prefix.strip()):
-                return name[:-(len(prefix) + 1)]
-            return name[:-len(prefix)]
+        # Remove prefix at end, including preceding space if any
+        return compile_matcher(prefix).strip_suffix(name)
     return name
 
-async def _process_add_prefix(file: Path, prefix: str, position: str = "start") -> tuple[Path, Path]:
-    stem = file.stem
-    ext = file.suffix
-    new_stem = _add_prefix(stem, prefix, position)
-    new_name = clean_string(new_stem) + ext
-    new_path = file.with_name(new_name)
-    if new_path.exists():
-        return None
-    success = await safe_rename(file, new_path)
-    if success:
-        return (file, new_path)
-    return None
+def _target_add_prefix(file: FileEntry, prefix: str, position: str = "start") -> Path:
+    new_stem = _add_prefix(file.stem, prefix, position)
+    return file.with_name(clean_string(new_stem) + file.suffix)
 
-async def _process_remove_prefix(file: Path, prefix: str, position: str = "start") -> tuple[Path, Path]:
-    stem = file.stem
-    ext = file.suffix
-    new_stem = _remove_prefix(stem, prefix, position)
-    new_name = clean_string(new_stem) + ext
-    new_path = file.with_name(new_name)
-    if new_path.exists():
-        return None
-    success = await safe_rename(file, new_path)
-    if success:
-        return (file, new_path)
-    return None
+def _target_remove_prefix(file: FileEntry, prefix: str, position: str = "start") -> Path:
+    new_stem = _remove_prefix(file.stem, prefix, position)
+    return file.with_name(clean_string(new_stem) + file.suffix)
 
-async def add_prefix(files, prefix, position: str = "start", filter_mode="all", filter_term=None):
+async def add_prefix(snapshot: DirectorySnapshot, prefix, position: str = "start", filter_mode="all", filter_term=None, dry_run=False):
+    files = snapshot.videos()
     if filter_mode == "specific" and filter_term:
         files = await filter_files(files, filter_term, fuzzy=True, reversed=False)
-    else:
-        files = [f for f in files if is_video_file(f.name)]
-    results = []
-    loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor() as executor:
-        tasks = [loop.create_task(_process_add_prefix(file, prefix, position)) for file in files]
-        for task in asyncio.as_completed(tasks):
-            res = await task
-            if res:
-                results.append(res)
-    return results
+    plan = plan_renames(((f.path, _target_add_prefix(f, prefix, position)) for f in files), snapshot.paths)
+    return await apply_plan(plan, dry_run=dry_run)
 
-async def remove_prefix(files, prefix, position: str = "start", filter_mode="all", filter_term=None):
+async def remove_prefix(snapshot: DirectorySnapshot, prefix, position: str = "start", filter_mode="all", filter_term=None, dry_run=False):
+    files = snapshot.videos()
     if filter_mode == "specific" and filter_term:
         files = await filter_files(files, filter_term, fuzzy=True, reversed=False)
-    else:
-        files = [f for f in files if is_video_file(f.name)]
-    results = []
-    loop = asyncio.get_running_loop()
-    with ThreadPoolExecutor() as executor:
-        tasks = [loop.create_task(_process_remove_prefix(file, prefix, position)) for file in files]
-        for task in asyncio.as_completed(tasks):
-            res = await task
-            if res:
-                results.append(res)
-    return results
\ No newline at end of file
+    plan = plan_renames(((f.path, _target_remove_prefix(f, prefix, position)) for f in files), snapshot.paths)
+    return await apply_plan(plan, dry_run=dry_run)
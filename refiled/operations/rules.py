@@ -0,0 +1,130 @@
+import json
+import re
+from pathlib import Path
+
+from refiled.operations.search import filter_files
+from refiled.filesystem.snapshot import DirectorySnapshot, FileEntry
+from refiled.planner import plan_renames, apply_plan
+from refiled.utilities import clean_string
+
+TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+# Bracket pairs left empty when an optional template field did not match, e.g. "Title (1999) []"
+EMPTY_BRACKETS = re.compile(r"\(\s*\)|\[\s*\]|\{\s*\}")
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """
+    One regex for many literals, factored as a trie ("x264|x265|xvid" -> "x(?:26[45]|vid)"),
+    so the engine tries each position once instead of once per literal. Longer literals win.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def walk(node: dict) -> str | None:
+        if len(node) == 1 and "" in node:
+            return None
+        branches, chars = [], []
+        for ch in sorted(k for k in node if k):
+            rest = walk(node[ch])
+            if rest is None:
+                chars.append(re.escape(ch))
+            else:
+                branches.append(re.escape(ch) + rest)
+        if chars:
+            branches.append(chars[0] if len(chars) == 1 else "[" + "".join(chars) + "]")
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            pattern = (pattern if len(branches) > 1 else f"(?:{pattern})") + "?"
+        return pattern
+
+    return walk(trie) or ""
+
+
+def compile_removals(words: list[str], ignore_case: bool = True, whole_words: bool = False) -> re.Pattern | None:
+    words = [w for w in words if w]
+    if not words:
+        return None
+    if ignore_case:
+        words = list({w.lower(): w for w in words})
+    pattern = _trie_pattern(words)
+    if whole_words:
+        pattern = rf"(?<!\w)(?:{pattern})(?!\w)"
+    return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+
+def _template_sub(template: str):
+    def replace(match: re.Match) -> str:
+        values = match.groupdict()
+        filled = TEMPLATE_FIELD.sub(lambda m: (values[m.group(1)] or "").strip(), template)
+        return EMPTY_BRACKETS.sub("", filled)
+
+    return replace
+
+
+def _compile_rule(rule: dict):
+    flags = re.IGNORECASE if rule.get("ignore_case", True) else 0
+    if "remove" in rule:
+        pattern = compile_removals(rule["remove"], rule.get("ignore_case", True), rule.get("whole_words", False))
+        return (pattern, "") if pattern is not None else None
+    if "pattern" not in rule:
+        raise ValueError(f"A rule needs 'remove' or 'pattern': {rule}")
+    try:
+        pattern = re.compile(rule["pattern"], flags)
+    except re.error as e:
+        raise ValueError(f"Invalid pattern {rule['pattern']!r}: {e}") from None
+    if "template" in rule:
+        missing = set(TEMPLATE_FIELD.findall(rule["template"])) - set(pattern.groupindex)
+        if missing:
+            raise ValueError(f"Template fields {sorted(missing)} have no named group in {rule['pattern']!r}")
+        return pattern, _template_sub(rule["template"])
+    return pattern, rule.get("replace", "")
+
+
+class RuleSet:
+    """
+    Rules compiled once and applied to every name of a batch, in order:
+    {"remove": [...]} deletes any of many literals in a single scan (optionally "whole_words"),
+    {"pattern": ..., "replace": r"\\2 \\1"} is a regex substitution with backreferences,
+    {"pattern": "(?P<title>.+?)...", "template": "{title} ({year}) [{res}]"} rebuilds the name from named groups.
+    Matching ignores case unless a rule sets "ignore_case": false.
+    """
+
+    def __init__(self, rules: list[dict]):
+        self.rules = rules
+        self._compiled = [c for c in map(_compile_rule, rules) if c is not None]
+
+    def apply(self, name: str) -> str:
+        for pattern, replacement in self._compiled:
+            name = pattern.sub(replacement, name)
+        return clean_string(name)
+
+    __call__ = apply
+
+
+def compile_rules(rules: list[dict]) -> RuleSet:
+    return RuleSet(rules)
+
+
+def load_rules(path: Path) -> list[dict]:
+    # A rules file is a JSON list of rules, or {"rules": [...]}
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return data["rules"] if isinstance(data, dict) else data
+
+
+def _target_rules(file: FileEntry, ruleset: RuleSet) -> Path:
+    new_stem = ruleset(file.stem)
+    # A rule that strips the whole name leaves the file alone
+    return file.with_name(new_stem + file.suffix) if new_stem else file.path
+
+
+async def apply_rules(snapshot: DirectorySnapshot, rules: list[dict] | RuleSet, fuzzy=False, reversed=False, filter_mode="all", filter_term=None, dry_run=False):
+    ruleset = rules if isinstance(rules, RuleSet) else compile_rules(rules)
+    files = snapshot.videos()
+    if filter_mode == "specific" and filter_term:
+        files = await filter_files(files, filter_term, fuzzy=fuzzy, reversed=reversed)
+    plan = plan_renames(((f.path, _target_rules(f, ruleset)) for f in files), snapshot.paths)
+    return await apply_plan(plan, dry_run=dry_run)
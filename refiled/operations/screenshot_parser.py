@@ -1,43 +1,152 @@
-import asyncio
+import bisect
+import re
+import time
+from collections import defaultdict
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
-from refiled.utilities import safe_rename
+from refiled import metrics
+from refiled.filesystem.snapshot import DirectorySnapshot, FileEntry
+from refiled.matcher import fold
+from refiled.planner import plan_renames, apply_plan
 
-IMAGE_EXTS = {".png", ".jpg", ".jpeg"}
-VIDEO_EXTS = {".mp4", ".mkv", ".avi", ".mov"}
+# rapidfuzz token_set_ratio a screenshot needs to be named after a video
+STEM_THRESHOLD = 85
+# Candidates are the videos sharing the screenshot's rarest tokens, narrowed until at most this many remain
+MAX_CANDIDATES = 50
+# A capture time in the screenshot's name pairs it with the video modified closest to it, within this many seconds
+TIME_TOLERANCE = 120
 
-def _is_image(file: Path) -> bool:
-    return file.suffix.lower() in IMAGE_EXTS and file.is_file()
+TOKEN = re.compile(r"[^\W_]+")
+# Capture times as written by macOS, Windows, VLC, mpv and most recorders:
+# "2024-01-02 at 12.34.56", "vlcsnap-2024-01-02-12h34m56s789", "20240102_123456"
+CAPTURE_TIME = re.compile(
+    r"(?<!\d)((?:19|20)\d\d)[-_.]?(\d\d)[-_.]?(\d\d)[ _T-]*(?:at[ _]+)?(\d\d)[h:._-]?(\d\d)[m:._-]?(\d\d)(?!\d\d)"
+)
+# Noise around the video name in screenshot names: tool names and playback times
+NOISE = re.compile(
+    r"(?i)(?<![^\W_])(?:screen ?shot|snapshot|vlcsnap|mpv-shot\d*|frame|thumb(?:nail)?)(?![^\W_])"
+    r"|(?<!\d)\d{1,2}[.:_h]\d\d[.:_m]\d\d(?:[.:_s]\d+)?(?!\d)"
+)
 
-def _is_video(file: Path) -> bool:
-    return file.suffix.lower() in VIDEO_EXTS and file.is_file()
 
-async def match_and_rename(video_folder: Path, screenshot_folder: Path) -> list[tuple[Path, Path]]:
-    videos = sorted([f for f in video_folder.iterdir() if _is_video(f)], key=lambda f: f.name.lower())
-    screenshots = sorted([f for f in screenshot_folder.iterdir() if _is_image(f)], key=lambda f: f.name.lower())
+def _tokens(text: str) -> list[str]:
+    return TOKEN.findall(fold(text))
 
-    pair_count = min(len(videos), len(screenshots))
-    pairs = zip(screenshots[:pair_count], videos[:pair_count])
 
-    loop = asyncio.get_running_loop()
-    results = []
+def capture_time(name: str) -> float | None:
+    match = CAPTURE_TIME.search(name)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second = map(int, match.groups())
+    try:
+        return time.mktime((year, month, day, hour, minute, second, 0, 0, -1))
+    except (OverflowError, ValueError):
+        return None
+
+
+class VideoIndex:
+    """
+    Blocked lookup over the videos of a folder, built once: exact name keys, an inverted index from name
+    tokens to videos, and the videos sorted by mtime. A screenshot is only compared with the few videos
+    sharing its rarest tokens, or found by bisecting on its capture time, so pairing never compares every
+    screenshot with every video. The extension is a token too, so "Movie.mkv_snapshot" prefers Movie.mkv.
+    """
 
-    async def rename_pair(screenshot: Path, video: Path):
-        new_name = video.stem + screenshot.suffix.lower()
-        target = screenshot.with_name(new_name)
-        if target.exists():
+    def __init__(self, videos: list[FileEntry]):
+        self.videos = videos
+        self.keys = [" ".join(_tokens(v.name)) for v in videos]
+        self.exact = {}
+        self.postings = defaultdict(set)
+        for i, key in enumerate(self.keys):
+            self.exact.setdefault(key, i)
+            self.exact.setdefault(" ".join(_tokens(videos[i].stem)), i)
+            for token in key.split():
+                self.postings[token].add(i)
+        self._time_order = sorted(range(len(videos)), key=lambda i: videos[i].mtime)
+        self.times = [videos[i].mtime for i in self._time_order]
+
+    def by_stem(self, stem: str) -> int | None:
+        query = " ".join(_tokens(NOISE.sub(" ", CAPTURE_TIME.sub(" ", stem))))
+        if query in self.exact:
+            return self.exact[query]
+        tokens = sorted({t for t in query.split() if t in self.postings}, key=lambda t: len(self.postings[t]))
+        if not tokens:
             return None
-        success = await safe_rename(screenshot, target)
-        if success:
-            return (screenshot, target)
-        return None
+        # Intersect postings from the rarest token on while that keeps any candidate
+        candidates = self.postings[tokens[0]]
+        for token in tokens[1:]:
+            if len(candidates) <= MAX_CANDIDATES:
+                break
+            narrowed = candidates & self.postings[token]
+            if narrowed:
+                candidates = narrowed
+        return self._best(query, sorted(candidates)[:MAX_CANDIDATES])
+
+    def _best(self, query: str, candidates: list[int]) -> int | None:
+        from rapidfuzz import fuzz, process
+
+        keys = [self.keys[i] for i in candidates]
+        scored = process.extract(query, keys, scorer=fuzz.token_set_ratio, score_cutoff=STEM_THRESHOLD, limit=None)
+        if not scored:
+            return None
+        # token_set_ratio forgives words missing on either side; plain ratio breaks ties
+        top = scored[0][1]
+        best = max((pos for _, score, pos in scored if score == top), key=lambda pos: fuzz.ratio(query, keys[pos]))
+        return candidates[best]
+
+    def by_time(self, moment: float) -> int | None:
+        pos = bisect.bisect_left(self.times, moment)
+        nearest = min(
+            (p for p in (pos - 1, pos) if 0 <= p < len(self.times)),
+            key=lambda p: abs(self.times[p] - moment),
+            default=None,
+        )
+        if nearest is None or abs(self.times[nearest] - moment) > TIME_TOLERANCE:
+            return None
+        return self._time_order[nearest]
+
+
+def pair_screenshots(videos: list[FileEntry], screenshots):
+    """
+    Yield (screenshot, video) pairs: by fuzzy name similarity first, then by the capture time
+    embedded in the name. Once every screenshot was looked up, leftovers are paired
+    alphabetically, as before, but only when exactly as many screenshots as videos remain
+    unpaired, so one missing screenshot no longer shifts every name after it.
+    """
+    index = VideoIndex(videos)
+    paired = set()
+    leftovers = []
+    for shot in screenshots:
+        i = index.by_stem(shot.stem)
+        if i is None and (moment := capture_time(shot.name)) is not None:
+            i = index.by_time(moment)
+        if i is None:
+            leftovers.append(shot)
+            continue
+        paired.add(i)
+        yield shot, videos[i]
+    unpaired = [v for i, v in enumerate(videos) if i not in paired]
+    metrics.count("screenshots.unmatched", len(leftovers))
+    if leftovers and len(leftovers) == len(unpaired):
+        leftovers.sort(key=lambda f: f.name.lower())
+        unpaired.sort(key=lambda f: f.name.lower())
+        yield from zip(leftovers, unpaired)
+
+
+def _targets(pairs):
+    # Several screenshots of one video become "Name.png", "Name (2).png", ...
+    seen = defaultdict(int)
+    for shot, video in pairs:
+        seen[video.path] += 1
+        count = seen[video.path]
+        stem = video.stem if count == 1 else f"{video.stem} ({count})"
+        yield shot.path, shot.with_name(stem + shot.suffix.lower())
 
-    with ThreadPoolExecutor() as executor:
-        tasks = [loop.create_task(rename_pair(s, v)) for s, v in pairs]
-        for task in asyncio.as_completed(tasks):
-            result = await task
-            if result:
-                results.append(result)
 
-    return results
\ No newline at end of file
+async def match_and_rename(video_snapshot: DirectorySnapshot, screenshot_snapshot: DirectorySnapshot, dry_run=False) -> list[tuple[Path, Path]]:
+    # Sorted so ties and " (2)" numbering never depend on directory order; the planner takes the whole batch anyway
+    videos = sorted(video_snapshot.videos(), key=lambda f: f.name.lower())
+    screenshots = sorted(screenshot_snapshot.images(), key=lambda f: f.name.lower())
+    with metrics.span("screenshots.pair"):
+        plan = plan_renames(_targets(pair_screenshots(videos, screenshots)), screenshot_snapshot.paths)
+    return await apply_plan(plan, dry_run=dry_run)
@@ -1,36 +1,54 @@
 
 
-import asyncio
 from pathlib import Path
 
-undo_stack = []
+from refiled.journal import compose_steps, get_journal, remove_empty_tree
+from refiled.planner import plan_renames, apply_plan, list_existing
 
-def add_change_set(changes: list[tuple[Path, Path]]):
+async def undo_last_change_set() -> list[tuple[Path, Path]]:
     """
-    Add a list of (old_path, new_path) tuples to the undo stack.
+    Undo the most recent change still applied, according to the on-disk journal: the last batch,
+    or every batch of the last run when one command renamed several folders (e.g. --recursive).
+    Works across sessions; call repeatedly for multi-level undo.
+    Returns the list of reverted changes.
     """
-    if changes:
-        undo_stack.append(changes)
+    batch_id = get_journal().last_applied()
+    if batch_id is None:
+        return []
+    return await undo_change_set(batch_id)
 
-async def undo_last_change_set() -> list[tuple[Path, Path]]:
+async def undo_change_set(batch_id: int | None) -> list[tuple[Path, Path]]:
     """
-    Undo the last batch of changes by renaming new_path back to old_path asynchronously.
+    Undo one batch by id, with the rest of its run, leaving batches applied since by other sessions alone.
     Returns the list of reverted changes.
     """
-    if not undo_stack:
+    if batch_id is None:
         return []
+    journal = get_journal()
+    results = []
+    for run_batch_id in journal.run_batches(batch_id):
+        results += await _undo_batch(journal, run_batch_id)
+    return results
 
-    last_changes = undo_stack.pop()
-    loop = asyncio.get_running_loop()
-
-    async def revert_change(old_path: Path, new_path: Path):
-        try:
-            await loop.run_in_executor(None, new_path.rename, old_path)
-            return (new_path, old_path)
-        except Exception as e:
-            print(f"⚠️ Failed to undo rename {new_path} -> {old_path}: {e}")
-            return None
-
-    tasks = [revert_change(old, new) for old, new in last_changes]
-    results = await asyncio.gather(*tasks)
-    return [res for res in results if res is not None]
\ No newline at end of file
+async def undo_own_change_set() -> list[tuple[Path, Path]]:
+    """
+    Undo the batch this session applied last, e.g. right after an operation asked whether to undo it.
+    """
+    return await undo_change_set(get_journal().last_batch)
+
+async def _undo_batch(journal, batch_id: int) -> list[tuple[Path, Path]]:
+    last_changes = compose_steps(journal.steps(batch_id))
+    # A partly undone batch only has the changes left that are not back in place yet
+    reverted = [(new, old) for old, new in last_changes if new.exists() or not old.exists()]
+
+    # Plan the reverse batch so swaps and chains are undone in a safe order
+    plan = plan_renames(reverted, list_existing(old for _, old in reverted))
+    results = await apply_plan(plan, kind="undo")
+    if len(results) == len(reverted):
+        journal.set_status(batch_id, "undone")
+        for folder in journal.created_dirs(batch_id):
+            remove_empty_tree(folder)
+    elif results:
+        journal.set_status(batch_id, "partially_undone")
+        print(f"⚠️ Undid {len(results)} of {len(reverted)} changes; run undo again once the rest can be reverted.")
+    return results
@@ -0,0 +1,281 @@
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from refiled import metrics
+from refiled.executor import get_executor
+from refiled.filesystem.snapshot import is_case_insensitive
+from refiled.journal import FLUSH_EVERY, get_journal
+
+# Apply every batch all-or-nothing through temporary names (REFILED_TRANSACTIONAL=1 or --transactional)
+TRANSACTIONAL = os.environ.get("REFILED_TRANSACTIONAL") == "1"
+
+
+@dataclass
+class RenamePlan:
+    """
+    A fully resolved batch of renames.
+    `stages` run one after another; the renames inside a stage never depend on each other.
+    `changes` holds the logical (old_path, new_path) pairs, `skipped` the ones dropped because of collisions.
+    `created_dirs` lists folders made for this batch, removed again on undo if left empty.
+    """
+    stages: list[list[tuple[Path, Path]]] = field(default_factory=list)
+    changes: list[tuple[Path, Path]] = field(default_factory=list)
+    skipped: list[tuple[Path, Path]] = field(default_factory=list)
+    origins: dict[Path, Path] = field(default_factory=dict)
+    created_dirs: list[Path] = field(default_factory=list)
+
+    @property
+    def steps(self) -> list[tuple[Path, Path]]:
+        return [step for stage in self.stages for step in stage]
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+
+def list_existing(files) -> set[Path]:
+    """
+    List every parent folder of `files` once and return the set of paths found there.
+    """
+    existing = set()
+    for folder in {Path(f).parent for f in files}:
+        try:
+            existing.update(folder / name for name in os.listdir(folder))
+        except OSError:
+            continue
+    return existing
+
+
+def _temp_path(path: Path) -> Path:
+    return path.with_name(f".refiled-{uuid.uuid4().hex[:12]}-{path.name}")
+
+
+def _collision_key():
+    """
+    Return a function mapping a path to the key collisions are checked on:
+    the path itself, or its case-folded form for folders on case-insensitive mounts.
+    """
+    folded = {}
+
+    def key(path: Path):
+        folder = path.parent
+        if folder not in folded:
+            folded[folder] = is_case_insensitive(folder)
+        return str(path).casefold() if folded[folder] else path
+
+    return key
+
+
+def plan_renames(pairs, existing: set[Path]) -> RenamePlan:
+    """
+    Build a RenamePlan from (old_path, new_path) pairs without touching the disk.
+    Targets already claimed by another file, or occupied by a file that is not moving away,
+    are skipped. Chains (A->B, B->C) are ordered into stages and cycles (A->B, B->A) are
+    broken through a temporary name. On case-insensitive mounts names are compared
+    case-folded, so "Foo" and "foo" collide and a case-only rename is routed through a temporary name.
+    """
+    t0 = time.perf_counter()
+    plan = RenamePlan()
+    key = _collision_key()
+    moves = {}
+    claimed = {}  # key of target -> source claiming it
+    sources = {}  # key of source -> source
+
+    for src, dst in sorted(pairs, key=lambda p: str(p[0])):
+        if dst is None or dst == src:
+            continue
+        if key(dst) in claimed or src in moves:
+            plan.skipped.append((src, dst))
+            continue
+        moves[src] = dst
+        claimed[key(dst)] = src
+        sources[key(src)] = src
+
+    # Drop moves onto occupied targets; a dropped source stays put and may block its own claimant
+    occupied = {key(p) for p in existing}
+    blocked = [src for src, dst in moves.items() if key(dst) in occupied and key(dst) not in sources]
+    while blocked:
+        src = blocked.pop()
+        dst = moves.pop(src, None)
+        if dst is None:
+            continue
+        del claimed[key(dst)]
+        del sources[key(src)]
+        plan.skipped.append((src, dst))
+        upstream = claimed.get(key(src))
+        if upstream is not None:
+            blocked.append(upstream)
+
+    depth = {}
+
+    def _walk_upstream(src: Path, level: int):
+        # Every target has exactly one claimant, so each chain is a simple path
+        while src is not None and src not in depth:
+            depth[src] = level
+            level += 1
+            src = claimed.get(key(src))
+
+    for src, dst in moves.items():
+        if key(dst) not in sources:
+            _walk_upstream(src, 0)
+
+    steps = [(src, moves[src], depth[src]) for src in moves if src in depth]
+
+    # Whatever is left sits on a cycle: park one member under a temporary name first
+    for start in sorted(src for src in moves if src not in depth):
+        if start in depth:
+            continue
+        temp = _temp_path(start)
+        plan.origins[temp] = start
+        depth[start] = 0
+        steps.append((start, temp, 0))
+        level = 1
+        src = claimed.get(key(start))
+        while src != start:
+            depth[src] = level
+            steps.append((src, moves[src], level))
+            level += 1
+            src = claimed.get(key(src))
+        steps.append((temp, moves[start], level))
+
+    for src, dst, level in sorted(steps, key=lambda s: (s[2], str(s[0]))):
+        while len(plan.stages) <= level:
+            plan.stages.append([])
+        plan.stages[level].append((src, dst))
+
+    plan.changes = sorted(moves.items(), key=lambda c: str(c[0]))
+    metrics.observe("plan", (time.perf_counter() - t0) * 1000)
+    metrics.count("plan.skipped", len(plan.skipped))
+    return plan
+
+
+def two_phase(plan: RenamePlan) -> RenamePlan:
+    """
+    Rewrite a plan so every file first moves to a unique temporary name (phase one) and only then
+    to its final name (phase two). No final name is written while any source still holds its old one,
+    which makes swaps and case-only renames safe and lets a failed batch be rolled back completely.
+    """
+    if not plan.changes:
+        return plan
+    parked = [(src, _temp_path(src), dst) for src, dst in plan.changes]
+    return RenamePlan(
+        stages=[[(src, temp) for src, temp, _ in parked], [(temp, dst) for _, temp, dst in parked]],
+        changes=list(plan.changes),
+        skipped=list(plan.skipped),
+        origins={temp: src for src, temp, _ in parked},
+        created_dirs=list(plan.created_dirs),
+    )
+
+
+def _restore_steps(plan: RenamePlan, moved: dict[Path, Path], left: set[Path]) -> list[tuple[Path, Path]]:
+    """
+    Steps putting back every file left under a temporary name because its final rename was skipped or failed.
+    `moved` maps the target of each completed step to its source, `left` holds the sources of completed steps.
+    A cycle member's origin may already hold the next member, so the cycle is walked back from its last
+    completed step first, then the parked file returns to its origin.
+    """
+    steps = []
+    for temp, origin in plan.origins.items():
+        if moved.get(temp) != origin or temp in left:
+            continue
+        back, path, seen = [], origin, {temp}
+        while path in moved and path not in seen:
+            seen.add(path)
+            back.append((path, moved[path]))
+            path = moved[path]
+        steps += reversed(back)
+        steps.append((temp, origin))
+    return steps
+
+
+async def _restore(journal, batch_id: int, steps: list[tuple[Path, Path]]) -> list[tuple[Path, Path]]:
+    """
+    Run restore steps one by one, journaled in the same batch; each may free the path the next one needs.
+    Returns the steps that completed.
+    """
+    restored = []
+    for seq, step in zip(journal.extend(batch_id, steps), steps):
+        async for src, dst, success in get_executor().stream([step]):
+            if success:
+                journal.mark_done(batch_id, [seq])
+                restored.append(step)
+        if not restored or restored[-1] != step:
+            print(f"⚠️ Could not restore {step[0]} -> {step[1]}; the file is left under its temporary name.")
+            break
+    return restored
+
+
+async def apply_plan(plan: RenamePlan, kind: str = "apply", dry_run: bool = False, transactional: bool | None = None) -> list[tuple[Path, Path]]:
+    """
+    Execute a RenamePlan stage by stage on the shared rename executor.
+    Every step is journaled before it runs and flagged done afterwards, in groups.
+    Returns the logical (old_path, new_path) pairs that were renamed successfully,
+    or with `dry_run` the pairs that would be, without touching the disk or the journal.
+    When a cycle cannot be completed, its files are renamed back to where they started and left out of the result.
+    A `transactional` apply (default: TRANSACTIONAL) goes through two_phase() and is all-or-nothing:
+    if any rename fails, everything already renamed is rolled back and [] is returned.
+    """
+    if dry_run:
+        return list(plan.changes)
+    if transactional is None:
+        transactional = TRANSACTIONAL
+    if transactional:
+        plan = two_phase(plan)
+    if not plan.stages:
+        return []
+    journal = get_journal()
+    steps = plan.steps
+    seq_of = {step: seq for seq, step in enumerate(steps)}
+    batch_id = journal.begin(steps, kind=kind, created_dirs=plan.created_dirs)
+
+    results = []
+    done = []
+    renamed = 0
+    moved = {}  # target -> source of every completed step
+    # Sources whose rename failed are still on disk; nothing may be moved onto them
+    stuck = set()
+    start = time.perf_counter()
+    for stage in plan.stages:
+        runnable = []
+        for src, dst in stage:
+            if dst in stuck:
+                stuck.add(src)
+            else:
+                runnable.append((src, dst))
+        async for src, dst, success in get_executor().stream(runnable):
+            if not success:
+                stuck.add(src)
+                continue
+            done.append(seq_of[(src, dst)])
+            moved[dst] = src
+            renamed += 1
+            if len(done) >= FLUSH_EVERY:
+                journal.mark_done(batch_id, done)
+                done = []
+            if dst not in plan.origins:
+                results.append((plan.origins.get(src, src), dst))
+        if transactional and stuck:
+            break
+    journal.mark_done(batch_id, done)
+    metrics.observe("rename", (time.perf_counter() - start) * 1000, kind=kind)
+    metrics.count("rename.done", renamed, kind=kind)
+    metrics.count("rename.failed", len(stuck), kind=kind)
+    if transactional and stuck:
+        reverted = journal.rollback(batch_id)
+        print(f"⚠️ {len(stuck)} renames failed; rolled back {reverted} renames, nothing was changed.")
+        return []
+    restore = _restore_steps(plan, moved, set(moved.values()))
+    restored = await _restore(journal, batch_id, restore) if restore else []
+    if restored:
+        parked = sum(1 for _, dst in restored if dst in plan.origins.values())
+        print(f"⚠️ {parked} renames through a temporary name could not be completed; their files were put back.")
+        undone = {(dst, src) for src, dst in restored}
+        results = [change for change in results if change not in undone]
+    # A file still parked under a temporary name keeps the batch undoable
+    journal.set_status(batch_id, "applied" if results or len(restored) < len(restore) else "failed")
+    return results
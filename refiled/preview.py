@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+from itertools import islice
+from pathlib import Path
+
+from refiled.planner import apply_plan, list_existing, plan_renames
+
+PLAN_VERSION = 1
+PAGE_SIZE = 50
+
+
+def diff_lines(changes):
+    """
+    Yield a unified-diff style view of (old_path, new_path) pairs, one line at a time,
+    with a header whenever the folder changes. Nothing is buffered, so 100k-entry plans stream.
+    """
+    folder = None
+    for old, new in changes:
+        old, new = Path(old), Path(new)
+        if old.parent != folder:
+            folder = old.parent
+            yield f"--- {folder}"
+        yield f"- {old.name}"
+        yield f"+ {new.name if new.parent == folder else os.path.relpath(new, folder)}"
+
+
+def pages(changes, page_size: int = PAGE_SIZE):
+    """
+    Group the diff of `changes` into pages of `page_size` renames, lazily.
+    """
+    it = iter(changes)
+    while page := list(islice(it, page_size)):
+        yield list(diff_lines(page))
+
+
+class PlanWriter:
+    """
+    Streams (old_path, new_path) pairs to a .json or .csv file as they are planned,
+    so a plan can be reviewed and applied later with `apply_file`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.format = "csv" if self.path.suffix.lower() == ".csv" else "json"
+        self.count = 0
+        self._fh = None
+        self._csv = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "w", encoding="utf-8", newline="")
+        if self.format == "csv":
+            self._csv = csv.writer(self._fh)
+            self._csv.writerow(["old", "new"])
+        else:
+            self._fh.write(f'{{"version": {PLAN_VERSION}, "changes": [')
+        return self
+
+    def write(self, changes):
+        for old, new in changes:
+            if self._csv is not None:
+                self._csv.writerow([str(old), str(new)])
+            else:
+                self._fh.write(("," if self.count else "") + "\n  " + json.dumps({"old": str(old), "new": str(new)}))
+            self.count += 1
+
+    def __exit__(self, *exc):
+        if self.format == "json":
+            self._fh.write("\n]}\n")
+        self._fh.close()
+
+
+def load_plan(path: Path) -> list[tuple[Path, Path]]:
+    path = Path(path)
+    with open(path, encoding="utf-8", newline="") as fh:
+        if path.suffix.lower() == ".csv":
+            return [(Path(row["old"]), Path(row["new"])) for row in csv.DictReader(fh)]
+        data = json.load(fh)
+    if data.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version in {path}: {data.get('version')}")
+    return [(Path(c["old"]), Path(c["new"])) for c in data["changes"]]
+
+
+def _missing_ancestor(folder: Path) -> Path | None:
+    # Topmost folder on the way to `folder` that does not exist yet
+    missing = None
+    while not folder.exists():
+        missing = folder
+        folder = folder.parent
+    return missing
+
+
+async def apply_changes(changes, dry_run: bool = False) -> list[tuple[Path, Path]]:
+    """
+    Apply an exported list of (old_path, new_path) pairs as-is. Sources that are gone and
+    targets that became occupied since the export are skipped; target folders (e.g. [indexed]/)
+    are created and, like any other batch, removed again on undo once empty.
+    """
+    changes = [(old, new) for old, new in changes if old.exists()]
+    plan = plan_renames(changes, list_existing(new for _, new in changes))
+    if dry_run:
+        return await apply_plan(plan, dry_run=True)
+    for folder in {new.parent for _, new in plan.changes}:
+        missing = _missing_ancestor(folder)
+        if missing is not None:
+            folder.mkdir(parents=True)
+            if missing not in plan.created_dirs:
+                plan.created_dirs.append(missing)
+    return await apply_plan(plan)
+
+
+async def apply_file(path: Path, dry_run: bool = False) -> list[tuple[Path, Path]]:
+    return await apply_changes(load_plan(path), dry_run=dry_run)
@@ -1,6 +1,5 @@
 
 
-import asyncio
 from pathlib import Path
 
 VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov"}
@@ -16,20 +15,6 @@ def capwords(text: str) -> str:
     # Capitalizes each word properly
     return " ".join(word.capitalize() for word in text.split())
 
-async def safe_rename(old_path: Path, new_path: Path) -> bool:
-    """
-    Rename a file asynchronously and safely.
-    Returns True if rename succeeded, False otherwise.
-    """
-    loop = asyncio.get_running_loop()
-    try:
-        await loop.run_in_executor(None, old_path.rename, new_path)
-        return True
-    except Exception as e:
-        print(f"⚠️ Failed to rename {old_path} -> {new_path}: {e}")
-        return False
-
-
 # Utility to check if a string is a probable "natural" name (not a slug/hash/etc)
 def is_probable_name(text: str) -> bool:
     """
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# State file paths (journal, index, caches, saved pipelines) are read at import time: point them at a throwaway folder before refiled loads
+_state = tempfile.mkdtemp(prefix="refiled-tests-")
+os.environ.setdefault("REFILED_JOURNAL", os.path.join(_state, "journal.db"))
+os.environ.setdefault("REFILED_INDEX", os.path.join(_state, "index.db"))
+os.environ.setdefault("REFILED_LEXICON_CACHE", os.path.join(_state, "lexicon.pickle"))
+os.environ.setdefault("REFILED_PIPELINES", os.path.join(_state, "pipelines.json"))
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+
+from refiled import batch
+
+
+def test_batch_command_renames_every_folder(tmp_path, capsys):
+    first, second = tmp_path / "one", tmp_path / "two"
+    for folder in (first, second):
+        folder.mkdir()
+        (folder / "movie.mp4").touch()
+
+    status = batch.main(["caps", "upper", "--dir", str(first), "--dir", str(second), "-v"])
+
+    assert status == 0
+    assert [p.name for p in first.iterdir()] == [p.name for p in second.iterdir()] == ["MOVIE.mp4"]
+    out = capsys.readouterr().out
+    assert f"{first / 'movie.mp4'} -> {first / 'MOVIE.mp4'}" in out
+    assert f"{second}: 1 renamed" in out
+
+
+def test_invalid_folder_fails_without_stopping_the_others(tmp_path, capsys):
+    (tmp_path / "a b.mp4").touch()
+
+    status = batch.main(["pirate", "--dir", str(tmp_path / "missing"), "--dir", str(tmp_path)])
+
+    assert status == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["a.b.mp4"]
+    assert "missing" in capsys.readouterr().err
+
+
+def test_batch_mode_never_loads_the_menus():
+    code = "import sys, refiled.batch; sys.exit('InquirerPy' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_recursive_batch_walks_the_tree(tmp_path, capsys):
+    (tmp_path / "season 1").mkdir()
+    (tmp_path / "season 1" / "episode one.mkv").touch()
+    (tmp_path / "top level.mp4").touch()
+
+    assert batch.main(["pirate", "--dir", str(tmp_path), "-r"]) == 0
+
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.m*")) == [
+        "season 1/episode.one.mkv", "top.level.mp4",
+    ]
+    assert "✅ 2 renamed" in capsys.readouterr().out
+
+
+def test_indexed_filter_only_visits_matching_folders(tmp_path, monkeypatch, capsys):
+    from refiled.filesystem import index
+
+    monkeypatch.setattr(index, "_index", index.FilenameIndex(tmp_path / "index.db"))
+    for folder in ("a", "b"):
+        (tmp_path / "lib" / folder).mkdir(parents=True)
+    (tmp_path / "lib" / "a" / "x 1080p.mp4").touch()
+    (tmp_path / "lib" / "b" / "y.mp4").touch()
+    assert batch.main(["search", "1080p", "--dir", str(tmp_path / "lib"), "--refresh"]) == 0
+    assert str(tmp_path / "lib" / "a" / "x 1080p.mp4") in capsys.readouterr().out
+    assert batch.main(["text", "remove", "--text", "1080p", "--filter", "p0801", "--reversed", "--dir", str(tmp_path / "lib"), "-r", "--indexed", "-n"]) == 0
+    assert "- x 1080p" in capsys.readouterr().out
+
+    assert batch.main(["text", "remove", "--text", "1080p", "--filter", "1080p", "--dir", str(tmp_path / "lib"), "-r", "--indexed", "-v"]) == 0
+
+    out = capsys.readouterr().out
+    assert str(tmp_path / "lib" / "b") not in out
+    assert (tmp_path / "lib" / "a" / "x.mp4").exists()
+    assert index.get_index().search("1080p") == []
@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from benchmarks import bench_operations
+
+
+def test_operation_benchmark_runs_isolated(monkeypatch):
+    monkeypatch.chdir(Path(__file__).parents[1])
+
+    result = bench_operations.run_isolated("pirate", 50)
+
+    assert (result["operation"], result["size"]) == ("pirate", 50)
+    assert 0 < result["renamed"] <= 50
+    assert result["events"]["os.scandir"] >= 1
+    assert result["total_ms"] > 0
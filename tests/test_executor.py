@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+from refiled import executor
+from refiled.executor import RenameExecutor
+
+
+def test_renames_in_batches_and_reports_failures(tmp_path, monkeypatch):
+    sizes = []
+    rename_batch = executor._rename_batch
+    monkeypatch.setattr(executor, "_rename_batch", lambda batch: sizes.append(len(batch)) or rename_batch(batch))
+    pairs = []
+    for i in range(5):
+        (tmp_path / f"{i}.mp4").touch()
+        pairs.append((tmp_path / f"{i}.mp4", tmp_path / f"{i}.mkv"))
+    pairs.append((tmp_path / "missing.mp4", tmp_path / "missing.mkv"))
+
+    outcomes = asyncio.run(RenameExecutor(max_workers=2, batch_size=4).rename_all(pairs))
+
+    assert sorted(sizes) == [2, 4]
+    assert sorted(outcomes) == sorted((src, dst, src.name != "missing.mp4") for src, dst in pairs)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{i}.mkv" for i in range(5)]
+
+
+def test_pulls_pairs_only_as_batches_finish(monkeypatch):
+    lock = threading.Lock()
+    running = peak = 0
+    pulled = 0
+
+    def slow_batch(batch):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return [True] * len(batch)
+
+    def pairs():
+        nonlocal pulled
+        for i in range(40):
+            pulled += 1
+            yield i, i
+
+    monkeypatch.setattr(executor, "_rename_batch", slow_batch)
+
+    async def consume():
+        seen = 0
+        async for _ in RenameExecutor(max_workers=4, batch_size=2, max_pending=2).stream(pairs()):
+            seen += 1
+            # Never more than max_pending batches (plus the one being formed) ahead of the consumer
+            assert pulled - seen <= 3 * 2
+        return seen
+
+    assert asyncio.run(consume()) == 40
+    assert peak <= 2
+
+
+def test_batch_sharing_a_folder_renames_by_bare_name(tmp_path, monkeypatch):
+    calls = []
+    rename = executor.os.rename
+    monkeypatch.setattr(executor.os, "rename", lambda src, dst, **kw: calls.append((src, dst, kw)) or rename(src, dst, **kw))
+    batch = []
+    for i in range(8):
+        (tmp_path / f"{i}.mp4").touch()
+        batch.append((tmp_path / f"{i}.mp4", tmp_path / f"{i}.mkv"))
+    batch.append((tmp_path / "missing.mp4", tmp_path / "missing.mkv"))
+
+    assert executor._rename_batch(batch) == [True] * 8 + [False]
+
+    if executor.USE_DIR_FD:
+        assert all(src == f"{i}.mp4" and "src_dir_fd" in kw for i, (src, _, kw) in enumerate(calls[:8]))
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{i}.mkv" for i in range(8)]
+
+
+
+def test_batch_fanning_out_keeps_full_paths(tmp_path, monkeypatch):
+    calls = []
+    rename = executor.os.rename
+    monkeypatch.setattr(executor.os, "rename", lambda src, dst, **kw: calls.append(kw) or rename(src, dst, **kw))
+    (tmp_path / "a.mp4").touch()
+    (tmp_path / "x").mkdir()
+
+    assert executor._rename_batch([(tmp_path / "a.mp4", tmp_path / "x" / "a.mp4")]) == [True]
+    assert calls == [{}]
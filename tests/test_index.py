@@ -0,0 +1,119 @@
+from refiled.filesystem.index import FilenameIndex
+from refiled.filesystem.snapshot import DirectorySnapshot
+
+
+def _stems(index: FilenameIndex) -> list[tuple[int, str]]:
+    return sorted(index.conn.execute("SELECT rowid, stem FROM stems"))
+
+
+def test_rename_onto_indexed_path_keeps_tables_in_step(tmp_path):
+    index = FilenameIndex(tmp_path / "index.db")
+    folder = tmp_path / "media"
+    folder.mkdir()
+    (folder / "old.mp4").touch()
+    (folder / "stale.mp4").touch()
+    index.update(DirectorySnapshot.scan(folder))
+
+    # stale.mp4 disappears behind refiled's back, then old.mp4 is renamed onto its indexed path
+    (folder / "stale.mp4").unlink()
+    (folder / "old.mp4").rename(folder / "stale.mp4")
+    index.record_renames([(folder / "old.mp4", folder / "stale.mp4")])
+    (folder / "new.mp4").touch()
+    index.update(DirectorySnapshot.scan(folder))
+
+    files = sorted(index.conn.execute("SELECT id, stem FROM files"))
+    assert files == _stems(index)
+    assert sorted(stem for _, stem in files) == ["new", "stale"]
+
+
+def test_swap_is_followed(tmp_path):
+    index = FilenameIndex(tmp_path / "index.db")
+    folder = tmp_path / "media"
+    folder.mkdir()
+    (folder / "a.mp4").write_text("a")
+    (folder / "b.mp4").write_text("bb")
+    index.update(DirectorySnapshot.scan(folder))
+
+    index.record_renames([(folder / "a.mp4", folder / "b.mp4"), (folder / "b.mp4", folder / "a.mp4")])
+
+    assert dict(index.conn.execute("SELECT name, size FROM files")) == {"b.mp4": 1, "a.mp4": 2}
+    assert sorted(index.conn.execute("SELECT id, stem FROM files")) == _stems(index)
+
+
+def _library(tmp_path):
+    for folder, names in {"movies": ["The Office S01.mkv", "Planet Earth.mp4"], "shows/uk": ["The Office UK.mkv", "Top Gear.mp4"]}.items():
+        (tmp_path / folder).mkdir(parents=True)
+        for name in names:
+            (tmp_path / folder / name).touch()
+    index = FilenameIndex(tmp_path / "index.db")
+    for folder in ("movies", "shows/uk"):
+        index.update(DirectorySnapshot.scan(tmp_path / folder))
+    return index
+
+
+def test_update_only_writes_what_changed(tmp_path):
+    index = _library(tmp_path)
+    folder = tmp_path / "movies"
+
+    assert index.update(DirectorySnapshot.scan(folder)) == (0, 0)
+    (folder / "Planet Earth.mp4").unlink()
+    (folder / "Blue Planet.mp4").touch()
+    assert index.update(DirectorySnapshot.scan(folder)) == (1, 1)
+
+
+def test_search_answers_from_the_index(tmp_path):
+    index = _library(tmp_path)
+
+    assert index.search("OFFICE") == [tmp_path / "movies" / "The Office S01.mkv", tmp_path / "shows/uk" / "The Office UK.mkv"]
+    assert index.search("uk", roots=[tmp_path / "shows"]) == [tmp_path / "shows/uk" / "The Office UK.mkv"]
+    assert index.search("office", roots=[tmp_path / "movies"], limit=5) == [tmp_path / "movies" / "The Office S01.mkv"]
+    assert index.search("plannet earth", fuzzy=True) == [tmp_path / "movies" / "Planet Earth.mp4"]
+    assert index.folders_matching("office", roots=[tmp_path]) == [tmp_path / "movies", tmp_path / "shows/uk"]
+
+
+def test_renames_are_followed_without_a_rescan(tmp_path):
+    index = _library(tmp_path)
+    old, new = tmp_path / "movies" / "Planet Earth.mp4", tmp_path / "movies" / "Planet Earth II.mp4"
+
+    index.record_renames([(old, new)])
+
+    assert index.search("earth") == [new]
+
+
+def test_search_without_trigram_support(tmp_path, monkeypatch):
+    from refiled.filesystem import index as index_module
+
+    monkeypatch.setattr(index_module, "STEMS", "CREATE VIRTUAL TABLE IF NOT EXISTS stems USING no_such_module(stem)")
+    index = FilenameIndex(tmp_path / "index.db")
+    folder = tmp_path / "media"
+    folder.mkdir()
+    for name in ("Movie 1080p.mp4", "Clip.mp4"):
+        (folder / name).touch()
+    index.update(DirectorySnapshot.scan(folder))
+    index.record_renames([(folder / "Clip.mp4", folder / "Clip 1080P.mp4")])
+
+    assert not index.trigram
+    assert index.search("1080p") == [folder / "Clip 1080P.mp4", folder / "Movie 1080p.mp4"]
+    assert index.search("p0801", reversed=True) == [folder / "Clip 1080P.mp4", folder / "Movie 1080p.mp4"]
+
+
+def test_index_failures_do_not_stop_renames(tmp_path, monkeypatch, capsys):
+    import sqlite3
+
+    from refiled import batch
+    from refiled.filesystem import index as index_module
+
+    class LockedIndex:
+        def __getattr__(self, name):
+            def locked(*args, **kwargs):
+                raise sqlite3.OperationalError("database is locked")
+            return locked
+
+    monkeypatch.setattr(index_module, "_index", LockedIndex())
+    monkeypatch.setattr(index_module, "_failed", None)
+    (tmp_path / "a 1080p.mp4").touch()
+
+    assert batch.main(["text", "remove", "--text", " 1080p", "--dir", str(tmp_path), "--indexed", "--filter", "1080p"]) == 0
+
+    assert [p.name for p in tmp_path.iterdir()] == ["a.mp4"]
+    assert capsys.readouterr().err.count("Filename index unavailable") == 1
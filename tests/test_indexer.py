@@ -0,0 +1,123 @@
+import asyncio
+
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled.operations import indexer
+
+
+def test_extract_phrases_skips_stopwords_and_numbers():
+    assert indexer.extract_phrases("The Office Season 1 Episode.mp4") == {"office season"}
+    assert indexer.extract_phrases("Planet Earth Frozen Worlds.mkv") == {
+        "planet earth", "earth frozen", "frozen worlds", "planet earth frozen", "earth frozen worlds",
+    }
+
+
+def test_groups_files_sharing_a_phrase(tmp_path):
+    for name in ("Planet Earth 01.mp4", "Planet Earth 02.mp4", "Blue Planet 01.mp4", "notes.txt"):
+        (tmp_path / name).touch()
+    timings = {}
+
+    changes = asyncio.run(indexer.index_repeated_keywords(DirectorySnapshot.scan(tmp_path), timings=timings))
+
+    folder = tmp_path / "[indexed]" / "planet_earth"
+    assert sorted(changes) == [
+        (tmp_path / "Planet Earth 01.mp4", folder / "Planet Earth 01.mp4"),
+        (tmp_path / "Planet Earth 02.mp4", folder / "Planet Earth 02.mp4"),
+    ]
+    assert sorted(p.name for p in folder.iterdir()) == ["Planet Earth 01.mp4", "Planet Earth 02.mp4"]
+    assert set(timings) == {"tokenise", "group", "plan", "move"}
+
+
+def test_nothing_repeated_leaves_the_folder_alone(tmp_path):
+    for name in ("Planet Earth.mp4", "Blue Planet.mp4"):
+        (tmp_path / name).touch()
+
+    assert asyncio.run(indexer.index_repeated_keywords(DirectorySnapshot.scan(tmp_path))) == []
+    assert not (tmp_path / "[indexed]").exists()
+
+
+def test_later_runs_only_tokenise_new_files(tmp_path, monkeypatch):
+    from refiled.filesystem import index
+
+    monkeypatch.setattr(index, "_index", index.FilenameIndex(tmp_path / "index.db"))
+    media = tmp_path / "media"
+    media.mkdir()
+    for name in ("Planet Earth 01.mp4", "Planet Earth 02.mp4", "Blue Planet 01.mp4"):
+        (media / name).touch()
+    asyncio.run(indexer.index_repeated_keywords(DirectorySnapshot.scan(media)))
+
+    tokenised = []
+    extract = indexer.extract_phrases
+    monkeypatch.setattr(indexer, "extract_phrases", lambda name, *args: tokenised.append(name) or extract(name, *args))
+    (media / "Planet Earth 03.mp4").touch()
+    changes = asyncio.run(indexer.index_repeated_keywords(DirectorySnapshot.scan(media)))
+
+    # Only the new download is tokenised, and alone it still joins the existing folder
+    assert tokenised == ["Planet Earth 03.mp4"]
+    assert changes == [(media / "Planet Earth 03.mp4", media / "[indexed]" / "planet_earth" / "Planet Earth 03.mp4")]
+
+
+def _mined(*args, **kwargs) -> dict[str, list[int]]:
+    return {phrase: list(ids) for phrase, ids in indexer.mine_phrases(*args, **kwargs).items()}
+
+
+def test_mining_keeps_only_supported_phrases():
+    files = [{"planet earth", "earth frozen"}, {"planet earth"}, {"earth planet", "blue planet"}, {"blue planet"}]
+
+    assert _mined(files) == {"planet earth": [0, 1, 2], "blue planet": [2, 3]}
+    assert _mined(files, min_support=3) == {"planet earth": [0, 1, 2]}
+
+
+def test_mining_keeps_existing_groups_and_their_spelling():
+    files = [{"earth planet", "earth frozen"}, {"planet earth"}]
+
+    assert _mined(files, existing={"planet earth", "earth frozen"}) == {"planet earth": [0, 1], "earth frozen": [0]}
+
+
+def test_phrases_with_a_rare_word_are_pruned_unless_they_name_a_group():
+    files = [{"blue planet", "frozen planet", "blue frozen planet"}, {"blue planet", "planet frozen"}, {"blue planet"}]
+
+    assert _mined(files) == {"blue planet": [0, 1, 2], "frozen planet": [0, 1]}
+    assert _mined(files, min_support=3) == {"blue planet": [0, 1, 2]}
+    assert _mined(files, existing={"planet frozen"}, min_support=3) == {"blue planet": [0, 1, 2], "planet frozen": [0, 1]}
+
+
+def test_min_support_and_max_ngram_reach_the_grouping(tmp_path):
+    for name in ("Planet Earth Frozen 01.mp4", "Planet Earth Frozen 02.mp4", "Planet Earth 03.mp4"):
+        (tmp_path / name).touch()
+
+    changes = asyncio.run(indexer.index_repeated_keywords(DirectorySnapshot.scan(tmp_path), max_n=2, min_support=3))
+
+    assert {new.parent.name for _, new in changes} == {"planet_earth"}
+    assert len(changes) == 3
+
+
+def test_sharded_extraction_matches_serial(monkeypatch):
+    names = [f"Planet Earth Part {i}.mp4" for i in range(20)] + ["The Office S01.mkv", "Blue Planet.mp4"]
+    monkeypatch.setattr(indexer, "PARALLEL_MIN_NAMES", 1)
+
+    sharded = asyncio.run(indexer.extract_all(names, processes=2))
+
+    assert sharded == [indexer.extract_phrases(name) for name in names]
+
+
+def test_fuzzy_token_map_folds_typos_onto_the_common_spelling():
+    files = [{"planet earth"}, {"planet earth"}, {"planit earth"}, {"plannet earth"}, {"night shift"}, {"knight shift"}]
+
+    token_map = indexer.fuzzy_token_map(files)
+
+    assert token_map == {"planit": "planet", "plannet": "planet"}
+    assert indexer.fuzzy_token_map(files, preferred={"plannet"})["planet"] == "plannet"
+
+
+def test_fuzzy_grouping_moves_typos_into_one_folder(tmp_path):
+    for name in ("Planet Earth 01.mp4", "Planit Earth 02.mp4", "Plannet Earth 03.mp4"):
+        (tmp_path / name).touch()
+
+    assert asyncio.run(indexer.index_repeated_keywords(DirectorySnapshot.scan(tmp_path))) == []
+    changes = asyncio.run(indexer.index_repeated_keywords(DirectorySnapshot.scan(tmp_path), fuzzy=True))
+
+    assert sorted(new.relative_to(tmp_path).as_posix() for _, new in changes) == [
+        "[indexed]/planet_earth/Planet Earth 01.mp4",
+        "[indexed]/planet_earth/Planit Earth 02.mp4",
+        "[indexed]/planet_earth/Plannet Earth 03.mp4",
+    ]
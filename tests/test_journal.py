@@ -0,0 +1,116 @@
+import asyncio
+import subprocess
+import sys
+
+from refiled import journal
+from refiled.journal import Journal, compose_steps
+from refiled.operations import undo
+from refiled.planner import apply_plan, plan_renames
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_compose_steps_hides_temporary_hops(tmp_path):
+    a, b, temp = tmp_path / "a", tmp_path / "b", tmp_path / ".refiled-x-a"
+
+    assert sorted(compose_steps([(a, temp), (b, a), (temp, b)])) == sorted([(a, b), (b, a)])
+
+
+def test_recover_rolls_back_an_interrupted_batch(tmp_path, monkeypatch):
+    state = Journal(tmp_path / "journal.db")
+    monkeypatch.setattr(journal, "_journal", state)
+    a, b, c = (tmp_path / f"{n}.mp4" for n in "abc")
+    a.write_text("a")
+    b.write_text("b")
+    batch_id = state.begin([(a, c), (b, a)])
+    # Crashed after both renames, before their done flags were written
+    a.rename(c)
+    b.rename(a)
+    state.conn.execute("UPDATE batches SET pid = ? WHERE id = ?", (_dead_pid(), batch_id))
+
+    assert journal.recover() == 2
+    assert {p.name: p.read_text() for p in tmp_path.glob("*.mp4")} == {"a.mp4": "a", "b.mp4": "b"}
+    assert state.history()[0][3] == "rolled_back"
+    assert journal.recover() == 0
+
+
+def test_live_pending_batch_is_left_alone(tmp_path):
+    state = Journal(tmp_path / "journal.db")
+    state.begin([(tmp_path / "a", tmp_path / "b")])
+
+    assert state.stale_batches() == []
+
+
+def test_undo_survives_a_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "_journal", Journal(tmp_path / "journal.db"))
+    a, b = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    a.touch()
+    asyncio.run(apply_plan(plan_renames([(a, b)], {a})))
+    journal.get_journal().close()
+
+    # A new process opens the same journal file
+    monkeypatch.setattr(journal, "_journal", Journal(tmp_path / "journal.db"))
+    assert asyncio.run(undo.undo_last_change_set()) == [(b, a)]
+    assert a.exists() and not b.exists()
+    assert asyncio.run(undo.undo_last_change_set()) == []
+
+
+def test_undo_removes_folders_the_batch_created(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "_journal", Journal(tmp_path / "state" / "journal.db"))
+    media = tmp_path / "media"
+    folder = media / "[indexed]" / "Show"
+    folder.mkdir(parents=True)
+    src = media / "Show 1.mp4"
+    src.touch()
+    plan = plan_renames([(src, folder / src.name)], {src})
+    plan.created_dirs = [media / "[indexed]"]
+    asyncio.run(apply_plan(plan))
+
+    asyncio.run(undo.undo_last_change_set())
+
+    assert [p.name for p in media.iterdir()] == ["Show 1.mp4"]
+
+
+def test_session_undo_leaves_other_sessions_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "_journal", Journal(tmp_path / "journal.db"))
+    a, b, c = (tmp_path / f"{n}.mp4" for n in "abc")
+    a.touch()
+    asyncio.run(apply_plan(plan_renames([(a, b)], {a})))
+    # Another process (e.g. a cron job) journals a batch afterwards
+    other = Journal(tmp_path / "journal.db")
+    other.set_status(other.begin([(tmp_path / "x.mp4", c)]), "applied")
+
+    assert asyncio.run(undo.undo_own_change_set()) == [(b, a)]
+    assert journal.get_journal().last_applied() == journal.get_journal().last_batch + 1
+    assert asyncio.run(undo.undo_own_change_set()) == []
+
+
+def test_partial_undo_is_retried(tmp_path, monkeypatch):
+    state = Journal(tmp_path / "journal.db")
+    monkeypatch.setattr(journal, "_journal", state)
+    a, b, c, d = (tmp_path / f"{n}.mp4" for n in "abcd")
+    a.touch()
+    c.touch()
+    asyncio.run(apply_plan(plan_renames([(a, b), (c, d)], {a, c})))
+    a.write_text("new")
+
+    assert asyncio.run(undo.undo_last_change_set()) == [(d, c)]
+    assert state.history()[1][3] == "partially_undone"
+    a.unlink()
+    assert asyncio.run(undo.undo_last_change_set()) == [(b, a)]
+    assert state.history()[2][3] == "undone"
+
+
+def test_prune_keeps_the_newest_and_pending_batches(tmp_path):
+    state = Journal(tmp_path / "journal.db")
+    pending = state.begin([(tmp_path / "a", tmp_path / "b")])
+    for _ in range(3):
+        state.set_status(state.begin([(tmp_path / "a", tmp_path / "b")]), "applied")
+
+    assert state.prune(keep=2) == 1
+    assert [row[0] for row in state.history()] == [4, 3, pending]
+    assert state.steps(2, done_only=False) == []
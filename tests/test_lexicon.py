@@ -0,0 +1,43 @@
+from refiled import lexicon
+from refiled.lexicon import Lexicon, build_lexicon, group_by_key
+
+
+def test_bundled_stopwords_need_no_download():
+    stopwords = build_lexicon().stopwords
+    assert {"the", "and", "of"} <= stopwords
+    assert "planet" not in stopwords
+
+
+def test_profanity_matches_tokens_phrases_and_lookalikes():
+    words = Lexicon(stopwords=frozenset(), profane_tokens=group_by_key(["shit"]), profane_phrases=group_by_key(["blow job"]))
+
+    assert words.is_profane("holy SHIT")
+    assert words.is_profane("5h1t happens")
+    assert words.is_profane("the blow job scene")
+    assert not words.is_profane("blow the job")
+    assert not words.is_profane("planet earth")
+
+
+def test_lookalikes_only_apply_to_the_name():
+    words = Lexicon(stopwords=frozenset(), profane_tokens=group_by_key(["slut", "fuck"]), profane_phrases={})
+
+    assert words.is_profane_token("SLUT") and words.is_profane_token("s1ut") and words.is_profane_token("fvck")
+    # "i" may stand for "l" in better_profanity's variants of words with an "i", not the other way round
+    assert not words.is_profane_token("siut")
+    assert not build_lexicon().is_profane("siut")
+
+
+def test_compiled_lexicon_is_cached_until_a_source_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexicon, "CACHE_FILE", tmp_path / "lexicon.pickle")
+    lexicon.load_lexicon.cache_clear()
+    built = lexicon.load_lexicon()
+    assert (tmp_path / "lexicon.pickle").exists()
+
+    lexicon.load_lexicon.cache_clear()
+    monkeypatch.setattr(lexicon, "build_lexicon", lambda: None)
+    assert lexicon.load_lexicon() == built
+
+    lexicon.load_lexicon.cache_clear()
+    monkeypatch.setattr(lexicon, "LEXICON_VERSION", lexicon.LEXICON_VERSION + 1)
+    assert lexicon.load_lexicon() is None
+    lexicon.load_lexicon.cache_clear()
@@ -0,0 +1,35 @@
+from refiled.matcher import compile_matcher
+from refiled.operations.add_remove import _remove_text_from_name
+from refiled.operations.move import _move_text_in_name
+
+
+def test_removal_agrees_with_filter_on_multi_character_folds():
+    assert compile_matcher("STRASSE").contains("Die straße Film")
+    assert _remove_text_from_name("Die straße Film", "STRASSE") == "Die  Film"
+    assert _remove_text_from_name("Die STRASSE Film", "straße") == "Die  Film"
+    assert _remove_text_from_name("Große Straße", "SS") == "Groe Strae"
+
+
+def test_ascii_names_keep_mixed_case_removal():
+    assert _remove_text_from_name("Movie WeB-dL 1080p", "web-dl") == "Movie  1080p"
+    assert _remove_text_from_name("Movie 1080p", "web-dl") == "Movie 1080p"
+
+
+def test_move_and_prefix_fold_both_ways():
+    assert _move_text_in_name("Die Straße Film", "STRASSE", "end") == "Die Film Straße"
+    assert _move_text_in_name("İstanbul Trip", "i̇stanbul", "end") == "Trip İstanbul"
+    assert compile_matcher("MASSE").strip_prefix("Maße Film") == "Film"
+    assert compile_matcher("masse").strip_suffix("Film MASSE") == "Film"
+
+
+def test_partial_folds_do_not_match():
+    assert _remove_text_from_name("Große Film", "s") == "Große Film"
+    assert compile_matcher("s").sub("X", "Große Maus") == "Große MauX"
+    assert compile_matcher("i").sub("", "İstanbul idea") == "İstanbul dea"
+
+
+def test_move_splits_words_on_dots_underscores_and_dashes():
+    assert _move_text_in_name("Movie.x264.1080p", "x264", "start") == "x264.Movie.1080p"
+    assert _move_text_in_name("Movie.x264.1080p", "X264", "end") == "Movie.1080p.x264"
+    assert _move_text_in_name("Show_Part-One_S01", "part one", "end") == "Show_S01_Part-One"
+    assert _move_text_in_name("Movie.x2645", "x264", "start") == "Movie.x2645"
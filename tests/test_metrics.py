@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from refiled import batch, metrics
+from refiled.planner import apply_plan, plan_renames
+
+
+def test_hooks_see_plan_rename_and_counters(tmp_path):
+    a, b = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    a.touch()
+    b.touch()
+    events = []
+    hook = metrics.add_hook(events.append)
+    try:
+        asyncio.run(apply_plan(plan_renames([(a, b), (b, a)], {a, b})))
+    finally:
+        metrics.remove_hook(hook)
+
+    spans = {e["name"] for e in events if e["type"] == "span"}
+    assert {"plan", "rename", "journal"} <= spans
+    assert {"name": "rename.done", "value": 3} in [{"name": e["name"], "value": e["value"]} for e in events if e["type"] == "counter"]
+    assert not metrics.enabled()
+
+
+def test_prometheus_textfile_aggregates_events(tmp_path):
+    sink = metrics.PrometheusTextfile(tmp_path / "refiled.prom")
+    sink({"type": "span", "name": "scan", "value": 1500, "labels": {"folder": 'a"b'}})
+    sink({"type": "span", "name": "scan", "value": 500, "labels": {"folder": 'a"b'}})
+    sink({"type": "counter", "name": "rename.done", "value": 3, "labels": {}})
+    sink({"type": "gauge", "name": "executor.queue_depth", "value": 2, "labels": {}})
+    sink.flush()
+
+    assert (tmp_path / "refiled.prom").read_text().splitlines() == [
+        "# TYPE refiled_rename_done_total counter",
+        "refiled_rename_done_total 3",
+        "# TYPE refiled_executor_queue_depth gauge",
+        "refiled_executor_queue_depth 2",
+        "# TYPE refiled_scan_seconds summary",
+        'refiled_scan_seconds_sum{folder="a\\"b"} 2.000000',
+        'refiled_scan_seconds_count{folder="a\\"b"} 2',
+    ]
+
+
+def test_batch_writes_json_lines(tmp_path):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "a b.mp4").touch()
+
+    assert batch.main(["pirate", "--dir", str(media), "--metrics-jsonl", str(tmp_path / "m.jsonl")]) == 0
+    metrics.close()
+
+    names = {json.loads(line)["name"] for line in (tmp_path / "m.jsonl").read_text().splitlines()}
+    assert {"scan", "plan", "rename", "rename.done"} <= names
@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+from refiled.filesystem import navigator
+
+
+def test_listing_is_sorted_filtered_and_cached_until_the_folder_changes(tmp_path):
+    for name in ("b", "A", "2nd", ".git", "Downloads", ".Desktop"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "file.mp4").touch()
+    navigator._listings.clear()
+
+    first = navigator._read_subfolders(str(tmp_path))
+    assert first == ["2nd", "A", "b", "Downloads"]
+    assert navigator._read_subfolders(str(tmp_path)) is first
+
+    (tmp_path / "c").mkdir()
+    os.utime(tmp_path, ns=(0, os.stat(tmp_path).st_mtime_ns + 1))
+    assert navigator._read_subfolders(str(tmp_path)) == ["2nd", "A", "b", "c", "Downloads"]
+
+
+def test_list_subfolders_runs_off_loop(tmp_path):
+    (tmp_path / "x").mkdir()
+
+    assert asyncio.run(navigator.list_subfolders(tmp_path)) == [tmp_path / "x"]
+    assert navigator._read_subfolders(str(tmp_path / "missing")) == []
+
+
+def test_folder_choices_are_paged(tmp_path, monkeypatch):
+    monkeypatch.setattr(navigator, "PAGE_SIZE", 2)
+    subfolders = [tmp_path / n for n in "abcde"]
+
+    first = [c["value"] for c in navigator.build_folder_choices(tmp_path, subfolders, page=0)]
+    last = [c["value"] for c in navigator.build_folder_choices(tmp_path, subfolders, page=2)]
+
+    assert first == [tmp_path.parent, tmp_path, tmp_path / "a", tmp_path / "b", "__NEXT__"]
+    assert last == [tmp_path.parent, tmp_path, "__PREV__", tmp_path / "e"]
@@ -0,0 +1,46 @@
+import asyncio
+
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled.operations import add_remove, prefix
+
+
+def test_operations_rename_from_the_snapshot(tmp_path):
+    (tmp_path / "Movie WEB-DL.mp4").touch()
+    (tmp_path / "Notes WEB-DL.txt").touch()
+
+    changes = asyncio.run(add_remove.remove_text(DirectorySnapshot.scan(tmp_path), "WEB-DL"))
+
+    assert changes == [(tmp_path / "Movie WEB-DL.mp4", tmp_path / "Movie.mp4")]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Movie.mp4", "Notes WEB-DL.txt"]
+
+
+def test_filtered_prefix_only_renames_videos(tmp_path):
+    for name in ("sub.srt", "NEW sub2.srt", "sub.mkv"):
+        (tmp_path / name).touch()
+
+    changes = asyncio.run(prefix.add_prefix(
+        DirectorySnapshot.scan(tmp_path), "X", filter_mode="specific", filter_term="sub",
+    ))
+
+    assert changes == [(tmp_path / "sub.mkv", tmp_path / "X sub.mkv")]
+
+
+def test_undo_reverts_every_folder_of_a_run(tmp_path):
+    from refiled import journal
+    from refiled.filesystem.snapshot import walk_snapshots
+    from refiled.operations import pirate, undo
+
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    for path in (tmp_path / "x.y.mp4", tmp_path / "a" / "p.q.mp4", tmp_path / "a" / "b" / "r.s.mkv"):
+        path.touch()
+    before = sorted(p.relative_to(tmp_path) for p in tmp_path.rglob("*.m*"))
+
+    async def normalize_tree():
+        with journal.get_journal().run():
+            for snapshot in walk_snapshots(tmp_path):
+                await pirate.normalize_format(snapshot)
+
+    asyncio.run(normalize_tree())
+    assert sorted(p.relative_to(tmp_path) for p in tmp_path.rglob("*.m*")) != before
+    assert len(asyncio.run(undo.undo_last_change_set())) == 3
+    assert sorted(p.relative_to(tmp_path) for p in tmp_path.rglob("*.m*")) == before
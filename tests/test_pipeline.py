@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from refiled import batch
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled.operations import pipeline, undo
+
+
+def test_steps_compose_into_one_transform():
+    transform = pipeline.compile_pipeline([
+        {"op": "brackets"}, {"op": "normalize"}, {"op": "remove", "text": "1080p"}, {"op": "remove", "text": "Rarbg"}, {"op": "prefix", "prefix": "NEW"},
+    ])
+
+    assert transform("the.office.1080p [RARBG]") == "NEW The Office"
+
+
+@pytest.mark.parametrize("steps, message", [
+    ([{"op": "shout"}], "Unknown pipeline step"),
+    ([{"op": "brackets", "text": "x"}], "does not take text"),
+    ([{"op": "add", "text": "x"}], "needs position"),
+])
+def test_invalid_steps_are_rejected_up_front(steps, message):
+    with pytest.raises(ValueError, match=message):
+        pipeline.compile_pipeline(steps)
+
+
+def test_parse_step_and_saved_pipelines(tmp_path):
+    steps = [pipeline.parse_step("brackets"), pipeline.parse_step("pirate capitalized=1"), pipeline.parse_step("add 'text=Part One' position=end")]
+
+    assert steps == [{"op": "brackets"}, {"op": "pirate", "capitalized": True}, {"op": "add", "text": "Part One", "position": "end"}]
+    with pytest.raises(ValueError, match="key=value"):
+        pipeline.parse_step("prefix NEW")
+    pipeline.save_pipeline("tidy", steps, tmp_path / "pipelines.json")
+    assert pipeline.load_pipelines(tmp_path / "pipelines.json") == {"tidy": steps}
+
+
+def test_each_file_is_renamed_once_and_undone_together(tmp_path):
+    (tmp_path / "the.office [x].mp4").touch()
+    (tmp_path / "notes [x].txt").touch()
+
+    changes = asyncio.run(pipeline.run_pipeline(DirectorySnapshot.scan(tmp_path), [{"op": "brackets"}, {"op": "normalize"}, {"op": "caps", "mode": "upper"}]))
+
+    assert changes == [(tmp_path / "the.office [x].mp4", tmp_path / "THE OFFICE X.mp4")]
+    asyncio.run(undo.undo_last_change_set())
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["notes [x].txt", "the.office [x].mp4"]
+
+
+def test_batch_pipeline_saves_and_reuses_steps(tmp_path):
+    (tmp_path / "a.b [x].mp4").touch()
+
+    assert batch.main(["pipeline", "--dir", str(tmp_path), "--step", "brackets", "--step", "normalize", "--save", "tidy", "-n"]) == 0
+    assert (tmp_path / "a.b [x].mp4").exists()
+    assert batch.main(["pipeline", "--dir", str(tmp_path), "--name", "tidy"]) == 0
+    assert [p.name for p in tmp_path.iterdir()] == ["A B X.mp4"]
@@ -0,0 +1,132 @@
+import asyncio
+
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled import planner
+from refiled.executor import get_executor
+from refiled.operations import low_caps, undo
+from refiled.planner import apply_plan, plan_renames, two_phase
+
+
+def _contents(folder) -> dict[str, str]:
+    return {p.name: p.read_text() for p in folder.iterdir()}
+
+
+def test_swap_is_applied_and_undone(tmp_path):
+    a, b = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    a.write_text("A")
+    b.write_text("B")
+
+    plan = plan_renames([(a, b), (b, a)], {a, b})
+    changes = asyncio.run(apply_plan(plan))
+
+    assert sorted(changes) == sorted([(a, b), (b, a)])
+    assert _contents(tmp_path) == {"a.mp4": "B", "b.mp4": "A"}
+    asyncio.run(undo.undo_last_change_set())
+    assert _contents(tmp_path) == {"a.mp4": "A", "b.mp4": "B"}
+
+
+def test_three_file_cycle(tmp_path):
+    a, b, c = (tmp_path / f"{n}.mp4" for n in "abc")
+    for path in (a, b, c):
+        path.write_text(path.stem)
+
+    asyncio.run(apply_plan(plan_renames([(a, b), (b, c), (c, a)], {a, b, c})))
+
+    assert _contents(tmp_path) == {"a.mp4": "c", "b.mp4": "a", "c.mp4": "b"}
+
+
+class _FailingExecutor:
+    # Reports `fail(src, dst)` steps as failed without renaming them
+    def __init__(self, fail):
+        self.fail = fail
+
+    async def stream(self, pairs):
+        pairs = list(pairs)
+        async for src, dst, success in get_executor().stream(p for p in pairs if not self.fail(*p)):
+            yield src, dst, success
+        for src, dst in pairs:
+            if self.fail(src, dst):
+                yield src, dst, False
+
+
+def test_unfinished_cycle_is_put_back(tmp_path, monkeypatch, capsys):
+    a, b, c = (tmp_path / f"{n}.mp4" for n in "abc")
+    for path in (a, b, c):
+        path.write_text(path.stem)
+    # b -> c fails after a was parked and c moved onto a.mp4, so the parked file cannot reach b.mp4
+    monkeypatch.setattr(planner, "get_executor", lambda: _FailingExecutor(lambda src, dst: src == b))
+
+    changes = asyncio.run(apply_plan(plan_renames([(a, b), (b, c), (c, a)], {a, b, c})))
+
+    assert changes == []
+    assert _contents(tmp_path) == {"a.mp4": "a", "b.mp4": "b", "c.mp4": "c"}
+    assert "were put back" in capsys.readouterr().out
+    assert planner.get_journal().history(1)[0][3] == "failed"
+
+
+def test_chain_is_ordered_into_stages(tmp_path):
+    a, b, c = (tmp_path / f"{n}.mp4" for n in "abc")
+
+    plan = plan_renames([(a, b), (b, c)], {a, b})
+
+    assert plan.stages == [[(b, c)], [(a, b)]]
+
+
+def test_collisions_are_skipped(tmp_path):
+    a, b, taken, target = (tmp_path / f"{n}.mp4" for n in ("a", "b", "taken", "target"))
+
+    plan = plan_renames([(a, target), (b, target), (taken, taken), (tmp_path / "c.mp4", taken)], {a, b, taken})
+
+    assert plan.changes == [(a, target)]
+    assert sorted(plan.skipped) == sorted([(b, target), (tmp_path / "c.mp4", taken)])
+
+
+def test_blocked_source_blocks_its_claimant(tmp_path):
+    # b cannot move onto the occupied c.mp4, so a cannot move onto b.mp4 either
+    a, b, c = (tmp_path / f"{n}.mp4" for n in "abc")
+
+    plan = plan_renames([(a, b), (b, c)], {a, b, c})
+
+    assert not plan
+    assert sorted(plan.skipped) == sorted([(a, b), (b, c)])
+
+
+def test_case_only_rename_on_case_insensitive_mount(tmp_path, monkeypatch):
+    monkeypatch.setenv("REFILED_CASE_INSENSITIVE", "1")
+    (tmp_path / "movie.mp4").write_text("M")
+
+    changes = asyncio.run(low_caps.convert_to_all_caps(DirectorySnapshot.scan(tmp_path)))
+
+    assert changes == [(tmp_path / "movie.mp4", tmp_path / "MOVIE.mp4")]
+    assert _contents(tmp_path) == {"MOVIE.mp4": "M"}
+
+
+def test_case_folded_collisions_on_case_insensitive_mount(tmp_path, monkeypatch):
+    monkeypatch.setenv("REFILED_CASE_INSENSITIVE", "1")
+    a, b, taken = tmp_path / "a.mp4", tmp_path / "b.mp4", tmp_path / "Taken.mp4"
+
+    plan = plan_renames([(a, tmp_path / "X.mp4"), (b, tmp_path / "x.mp4"), (tmp_path / "c.mp4", tmp_path / "taken.mp4")], {a, b, taken})
+
+    assert plan.changes == [(a, tmp_path / "X.mp4")]
+    assert len(plan.skipped) == 2
+
+
+def test_two_phase_parks_every_file_first(tmp_path):
+    a, b = tmp_path / "a.mp4", tmp_path / "b.mp4"
+
+    plan = two_phase(plan_renames([(a, b), (b, a)], {a, b}))
+
+    assert [len(stage) for stage in plan.stages] == [2, 2]
+    assert {plan.origins[temp] for _, temp in plan.stages[0]} == {a, b}
+
+
+def test_transactional_apply_rolls_back_on_failure(tmp_path):
+    a, b = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    a.write_text("A")
+    b.write_text("B")
+
+    # b's target folder does not exist, so its second phase fails
+    changes = asyncio.run(apply_plan(plan_renames([(a, tmp_path / "c.mp4"), (b, tmp_path / "gone" / "b.mp4")], {a, b}), transactional=True))
+
+    assert changes == []
+    assert _contents(tmp_path) == {"a.mp4": "A", "b.mp4": "B"}
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from refiled import batch, preview
+
+
+def test_diff_lines_stream_with_folder_headers(tmp_path):
+    changes = [(tmp_path / "a" / "x.mp4", tmp_path / "a" / "y.mp4"), (tmp_path / "b" / "z.mp4", tmp_path / "b" / "[indexed]" / "z" / "z.mp4")]
+
+    assert list(preview.diff_lines(iter(changes))) == [
+        f"--- {tmp_path / 'a'}", "- x.mp4", "+ y.mp4",
+        f"--- {tmp_path / 'b'}", "- z.mp4", "+ [indexed]/z/z.mp4",
+    ]
+    assert [len(page) for page in preview.pages(changes, page_size=1)] == [3, 3]
+
+
+def test_dry_run_touches_nothing(tmp_path, capsys):
+    (tmp_path / "a b.mp4").touch()
+
+    assert batch.main(["pirate", "--dir", str(tmp_path), "-n"]) == 0
+
+    assert [p.name for p in tmp_path.iterdir()] == ["a b.mp4"]
+    assert "+ a.b.mp4" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("suffix", [".json", ".csv"])
+def test_exported_plan_applies_later_and_skips_what_changed(tmp_path, suffix):
+    media = tmp_path / "media"
+    media.mkdir()
+    for name in ("a b.mp4", "c d.mp4", "e f.mp4"):
+        (media / name).touch()
+    plan = tmp_path / f"plan{suffix}"
+
+    assert batch.main(["pirate", "--dir", str(media), "--export", str(plan)]) == 0
+    assert sorted(p.name for p in media.iterdir()) == ["a b.mp4", "c d.mp4", "e f.mp4"]
+    assert len(preview.load_plan(plan)) == 3
+
+    # Since the export, one source went away and one target got taken
+    (media / "a b.mp4").unlink()
+    (media / "c.d.mp4").touch()
+    changes = asyncio.run(preview.apply_file(plan))
+
+    assert changes == [(media / "e f.mp4", media / "e.f.mp4")]
+    assert sorted(p.name for p in media.iterdir()) == ["c d.mp4", "c.d.mp4", "e.f.mp4"]
+
+
+def test_applied_plan_creates_and_undo_removes_target_folders(tmp_path):
+    from refiled.operations import undo
+
+    (tmp_path / "x.mp4").touch()
+    target = tmp_path / "[indexed]" / "x" / "x.mp4"
+
+    assert asyncio.run(preview.apply_changes([(tmp_path / "x.mp4", target)])) == [(tmp_path / "x.mp4", target)]
+    asyncio.run(undo.undo_last_change_set())
+
+    assert [p.name for p in tmp_path.iterdir()] == ["x.mp4"]
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from refiled import batch
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled.operations import pipeline, rules
+
+
+def test_removal_literals_are_factored_into_a_trie():
+    pattern = rules._trie_pattern(["x264", "x265", "xvid"])
+
+    assert pattern == "x(?:26[45]|vid)"
+    assert re.compile(pattern).findall("a.x264.b.xvid.c.x265") == ["x264", "xvid", "x265"]
+
+
+def test_longer_literals_win_and_case_is_ignored():
+    pattern = rules.compile_removals(["web", "webrip", "WEB-DL"])
+
+    assert pattern.sub("", "Show WEBRip Web-dl web") == "Show   "
+    assert rules.compile_removals(["", ""]) is None
+    assert rules.compile_removals(["cam"], whole_words=True).sub("", "Camera cam") == "Camera "
+
+
+def test_rules_apply_in_order():
+    ruleset = rules.compile_rules([
+        {"remove": ["x264", "HDTV"]},
+        {"pattern": r"(\w+), The", "replace": r"The \1"},
+        {"pattern": r"(?P<title>.+?)\s+(?P<year>\d{4})\s*(?P<res>\d{3,4}p)?", "template": "{title} ({year}) [{res}]"},
+    ])
+
+    assert ruleset("Office, The 2005 720p x264") == "The Office (2005) [720p]"
+    # Brackets of optional fields that did not match are dropped
+    assert ruleset("Office, The 2005 HDTV") == "The Office (2005)"
+
+
+@pytest.mark.parametrize("rule, message", [
+    ({"replace": "x"}, "needs 'remove' or 'pattern'"),
+    ({"pattern": "(", "replace": ""}, "Invalid pattern"),
+    ({"pattern": r"(?P<title>.+)", "template": "{title} ({year})"}, "have no named group"),
+])
+def test_invalid_rules_are_rejected(rule, message):
+    with pytest.raises(ValueError, match=message):
+        rules.compile_rules([rule])
+
+
+def test_rules_files_and_pipeline_step(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({"rules": [{"remove": ["1080p"]}]}))
+    (tmp_path / "a 1080p.mp4").touch()
+
+    assert rules.load_rules(rules_file) == [{"remove": ["1080p"]}]
+    assert pipeline.compile_pipeline([{"op": "rules", "rules": str(rules_file)}, {"op": "caps", "mode": "upper"}])("a 1080p") == "A"
+    changes = asyncio.run(rules.apply_rules(DirectorySnapshot.scan(tmp_path), rules.load_rules(rules_file), dry_run=True))
+    assert changes == [(tmp_path / "a 1080p.mp4", tmp_path / "a.mp4")]
+
+
+def test_batch_rules_command(tmp_path):
+    (tmp_path / "Film XviD.mkv").touch()
+
+    assert batch.main(["rules", "--dir", str(tmp_path), "--remove", "xvid", "--sub", "Film", "Movie"]) == 0
+    assert [p.name for p in tmp_path.iterdir()] == ["Movie.mkv"]
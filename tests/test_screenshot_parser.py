@@ -0,0 +1,57 @@
+import asyncio
+import os
+import time
+
+from refiled.filesystem.snapshot import DirectorySnapshot
+from refiled.operations import screenshot_parser as sp
+
+
+def _videos(folder, names, mtimes=None):
+    for i, name in enumerate(names):
+        (folder / name).touch()
+        if mtimes:
+            os.utime(folder / name, (mtimes[i], mtimes[i]))
+    return sorted(DirectorySnapshot.scan(folder).videos(), key=lambda f: f.name)
+
+
+def test_screenshots_pair_by_name_despite_tool_noise(tmp_path):
+    videos = _videos(tmp_path, ["The Matrix (1999).mkv", "Heat (1995).mp4", "Heat (1995).mkv"])
+    index = sp.VideoIndex(videos)
+
+    assert videos[index.by_stem("The Matrix (1999).mkv_snapshot_00.12.34")].name == "The Matrix (1999).mkv"
+    assert videos[index.by_stem("vlcsnap-2024-01-02-12h34m56s789 heat 1995 mp4")].name == "Heat (1995).mp4"
+    assert index.by_stem("Screenshot 2024-01-02 at 12.34.56") is None
+
+
+def test_capture_times_pair_with_the_nearest_video(tmp_path):
+    moment = sp.capture_time("Screenshot 2024-01-02 at 12.34.56")
+    videos = _videos(tmp_path, ["a.mp4", "b.mp4"], [moment - 1000, moment + 30])
+    index = sp.VideoIndex(videos)
+
+    assert moment == time.mktime((2024, 1, 2, 12, 34, 56, 0, 0, -1))
+    assert sp.capture_time("20240102_123456") == moment
+    assert sp.capture_time("clip 1080p") is None
+    assert videos[index.by_time(moment)].name == "b.mp4"
+    assert index.by_time(moment + 10_000) is None
+
+
+def test_leftovers_pair_alphabetically_only_when_counts_match(tmp_path):
+    (tmp_path / "shots").mkdir()
+    videos = _videos(tmp_path, ["alpha.mp4", "beta.mp4"])
+    for name in ("x1.png", "x2.png"):
+        (tmp_path / "shots" / name).touch()
+    shots = sorted(DirectorySnapshot.scan(tmp_path / "shots").images(), key=lambda f: f.name)
+
+    assert [(s.name, v.name) for s, v in sp.pair_screenshots(videos, shots)] == [("x1.png", "alpha.mp4"), ("x2.png", "beta.mp4")]
+    assert list(sp.pair_screenshots(videos, shots[:1])) == []
+
+
+def test_several_screenshots_of_one_video_are_numbered(tmp_path):
+    (tmp_path / "shots").mkdir()
+    _videos(tmp_path, ["Heat.mp4", "Other.mp4"])
+    for name in ("Heat 00.10.00.PNG", "Heat 00.20.00.png", "Other frame.jpg"):
+        (tmp_path / "shots" / name).touch()
+
+    asyncio.run(sp.match_and_rename(DirectorySnapshot.scan(tmp_path), DirectorySnapshot.scan(tmp_path / "shots")))
+
+    assert sorted(p.name for p in (tmp_path / "shots").iterdir()) == ["Heat (2).png", "Heat.png", "Other.jpg"]
@@ -0,0 +1,21 @@
+import asyncio
+from pathlib import Path
+
+from refiled.operations.search import filter_files
+
+NAMES = [Path(n) for n in ("The Office S01.mkv", "Planet Earth.mp4", "The Ofice S02.mkv", "Blue Planet.mp4")]
+
+
+def test_plain_filter_keeps_order_and_ignores_case():
+    assert asyncio.run(filter_files(NAMES, "PLANET")) == [NAMES[1], NAMES[3]]
+    assert asyncio.run(filter_files(NAMES, "")) == NAMES
+
+
+def test_fuzzy_filter_scores_every_name_in_one_pass():
+    assert asyncio.run(filter_files(NAMES, "the office", fuzzy=True)) == [NAMES[0], NAMES[2]]
+    # With a limit the best matches come first
+    assert asyncio.run(filter_files(NAMES, "the ofice", fuzzy=True, limit=1)) == [NAMES[2]]
+
+
+def test_reversed_filter_matches_the_reversed_name():
+    assert asyncio.run(filter_files(NAMES, "htrae", reversed=True)) == [NAMES[1]]
@@ -0,0 +1,42 @@
+import asyncio
+
+from refiled.filesystem.snapshot import DirectorySnapshot, stream_snapshots, walk_snapshots
+
+
+def test_scan_lists_and_classifies_once(tmp_path):
+    (tmp_path / "b.MKV").write_text("video")
+    (tmp_path / "a.mp4").touch()
+    (tmp_path / "shot.png").touch()
+    (tmp_path / "notes.txt").touch()
+    (tmp_path / "sub").mkdir()
+
+    snapshot = DirectorySnapshot.scan(tmp_path)
+
+    assert [e.name for e in snapshot.entries] == ["a.mp4", "b.MKV", "notes.txt", "shot.png", "sub"]
+    assert [e.name for e in snapshot.videos()] == ["a.mp4", "b.MKV"]
+    assert [e.name for e in snapshot.images()] == ["shot.png"]
+    assert [e.name for e in snapshot.subfolders()] == ["sub"]
+    assert len(snapshot.files()) == 4
+    assert snapshot.paths == {tmp_path / n for n in ("a.mp4", "b.MKV", "notes.txt", "shot.png", "sub")}
+    video = snapshot.videos()[1]
+    assert (video.stem, video.suffix, video.size) == ("b", ".MKV", 5)
+    assert video.with_name("c.MKV") == tmp_path / "c.MKV"
+
+
+def test_walk_skips_hidden_symlinked_and_indexed_folders(tmp_path):
+    for folder in ("a/b", "c", ".hidden/x", "[indexed]/Phrase"):
+        (tmp_path / folder).mkdir(parents=True)
+    (tmp_path / "link").symlink_to(tmp_path / "c")
+
+    walked = [s.path.relative_to(tmp_path).as_posix() for s in walk_snapshots(tmp_path)]
+
+    assert walked == [".", "a", "a/b", "c"]
+
+
+def test_stream_matches_walk(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+
+    async def collect():
+        return [s.path async for s in stream_snapshots(tmp_path)]
+
+    assert asyncio.run(collect()) == [s.path for s in walk_snapshots(tmp_path)]
@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+
+def _loaded_after(statement: str, modules: list[str]) -> list[str]:
+    code = f"import sys; {statement}; print(' '.join(m for m in {modules!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+
+def test_heavy_dependencies_load_only_when_used():
+    heavy = ["nltk", "better_profanity", "rapidfuzz"]
+    assert _loaded_after("import refiled.operations.indexer, refiled.operations.search", heavy) == []
+    # The bundled lexicon replaces nltk and better_profanity at run time as well
+    assert _loaded_after(
+        "from refiled.operations import indexer; indexer.extract_phrases('Planet Earth.mp4')", heavy,
+    ) == []